@@ -1,19 +1,43 @@
+import json
 import functions_framework
 from google.cloud import bigquery
+from datetime import datetime, timezone
+from table_provisioning import (
+    TIMESERIES_TABLE_ID, ensure_aggregate_forecast_table, ensure_error_history_table, ensure_forecast_table,
+    ensure_timeseries_table
+)
+from drift_monitor import compute_forecast_errors, models_to_retrain
+from forecast_materialization import materialize_aggregate_forecasts, materialize_forecasts
+from job_orchestrator import failed_jobs, run_jobs_concurrently
+from model_training import (
+    AGGREGATE_MODELS, drop_stale_models, label_trained_model, list_model_shards, plan_training,
+    training_savings_report
+)
 
 @functions_framework.http
 def run_daily_snapshot_model_retrain(request):
     try:
         client = bigquery.Client()
 
-        # Step 1: Append data to time series table
+        run_date = datetime.now(timezone.utc).date()
+
+        # Step 0: Make sure the timeseries table is partitioned by day and clustered
+        ensure_timeseries_table(client)
+        ensure_forecast_table(client)
+        ensure_aggregate_forecast_table(client)
+        ensure_error_history_table(client)
+
+        # Step 1: Replace today's snapshot in the time series table, so a rerun of the same day does not
+        # append the fleet a second time and leaves the training input (and its fingerprint) unchanged
         insert_query = """
+            BEGIN TRANSACTION;
+            DELETE FROM `greenops-460813.gcp_server_details.server_metrics_timeseries` WHERE date = TIMESTAMP(@run_date);
             INSERT INTO `greenops-460813.gcp_server_details.server_metrics_timeseries` (
             date, instance_id, instance_type, region,
             cpu_util, memory_util, disk_iops, network_iops, total_carbon
             )
             SELECT
-            TIMESTAMP_TRUNC(CURRENT_TIMESTAMP(), DAY) AS date,
+            TIMESTAMP(@run_date) AS date,
             Instance_ID,
             Instance_Type,
             Region,
@@ -55,39 +79,53 @@ def run_daily_snapshot_model_retrain(request):
                 ELSE Total_Carbon_Emission_in_kg
                 END, 3) AS total_carbon
 
-            FROM `greenops-460813.gcp_server_details.server_metrics`
-            """
-        client.query(insert_query).result()
-
-
-        # Step 2: Create/Replace Forecast Models
-        model_specs = [
-            ("server_cpu_forecast_model", "cpu_util"),
-            ("server_mem_forecast_model", "memory_util"),
-            ("server_carbon_forecast_model", "total_carbon")
-        ]
-
-        for model_name, column in model_specs:
-            create_model_query = f"""
-            CREATE OR REPLACE MODEL `greenops-460813.gcp_server_details.{model_name}`
-            OPTIONS(
-            MODEL_TYPE='ARIMA_PLUS',
-            TIME_SERIES_TIMESTAMP_COL='date',
-            TIME_SERIES_ID_COL='Instance_ID',
-            TIME_SERIES_DATA_COL='{column}',
-            DATA_FREQUENCY='AUTO_FREQUENCY'
-            ) AS
-            SELECT
-            date,
-            Instance_ID,
-            {column}
-            FROM
-            `greenops-460813.gcp_server_details.server_metrics_timeseries`
-            WHERE {column} IS NOT NULL
+            FROM `greenops-460813.gcp_server_details.server_metrics`;
+            COMMIT TRANSACTION;
             """
-            client.query(create_model_query).result()
-        
+        client.query(insert_query, job_config=bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("run_date", "DATE", run_date)]
+        )).result()
+
+
+        # Step 2: Score the last days' forecasts of every model shard against the snapshots that followed
+        model_shards = list_model_shards(client)
+        forecast_errors = compute_forecast_errors(client, run_date)
+        retrain_candidates = models_to_retrain(forecast_errors, model_shards)
+        print(f"Forecast errors: {forecast_errors}, retrain candidates: {retrain_candidates}")
+
+        # Step 3: Create/Replace the drifted Forecast Models, on the training window only and only if their input changed
+        create_model_queries, skipped, fingerprints = plan_training(client, run_date, model_shards, retrain_candidates)
+
+        # All model shards and aggregate models train at the same time, each one is retried on its own
+        training_reports = run_jobs_concurrently(client, create_model_queries)
+        failed = failed_jobs(training_reports)
+        for model_name, report in training_reports.items():
+            if model_name not in failed:
+                label_trained_model(client, model_name, fingerprints[model_name]["fingerprint"], report, run_date)
+
+        training_report = training_savings_report(
+            fingerprints, skipped, training_reports, client.get_table(TIMESERIES_TABLE_ID).num_rows
+        )
+        training_report["retrain_candidates"] = retrain_candidates
+        # Stale models are only dropped once every current model trained, so a failed run keeps its fallback
+        training_report["dropped_models"] = [] if failed else drop_stale_models(client, model_shards)
+        print(f"Model training: {json.dumps(training_report)}")
+
+        # Step 4: Materialize the forecasts of the current models for the agent tools
+        available_shards = [model_shard for model_shard in model_shards if model_shard.model_name not in failed]
+        if available_shards:
+            materialize_forecasts(client, run_date, available_shards)
+
+        available_aggregates = [model for model in AGGREGATE_MODELS if model.model_name not in failed]
+        if available_aggregates:
+            materialize_aggregate_forecasts(client, run_date, available_aggregates)
+
+        if failed:
+            return "❌ Error occurred: model training failed for " + ", ".join(
+                f"{model_name} ({error})" for model_name, error in failed.items()
+            )
+
     except Exception as e:
         return "❌ Error occurred: " + str(e)
 
-    return "Success"
+    return "Success\n" + json.dumps(training_report)
@@ -0,0 +1,150 @@
+"""
+Forecast-vs-actual error monitoring that decides which models need retraining.
+
+On each snapshot the one-day-ahead forecasts of the last `ERROR_WINDOW_DAYS` days are joined with the
+metrics that landed on the following days, in one SQL pass over all models, and the error is computed per
+model shard, per metric and region, and per metric overall (region "__all__"). Pooling the days gives a
+shard with a handful of instances enough samples to be scored. Forecasts made before a model's last
+retrain are left out, so a retrained model is judged on its own forecasts only.
+
+The error is a weighted percentage error, SUM(|actual - forecast|) / SUM(|actual|), kept in the `mape`
+column: averaging the per-point ratio instead would let a few near-zero actuals (an idle server's CPU) blow
+up the error, or drop the zero ones entirely. The errors are appended to `forecast_error_history` so the
+trend can be checked, and only the model shards whose error crosses `MAPE_THRESHOLD` with at least
+`MIN_SAMPLES` samples, or that cover a region whose error does, are retrained. A shard that has too few
+samples yet keeps its model until it has them or the model ages out.
+"""
+
+import os
+from datetime import timedelta
+
+from google.cloud import bigquery
+from model_training import MODEL_SPECS, SHARD_KEY, trained_on_dates
+from table_provisioning import ERROR_HISTORY_TABLE_ID, FORECAST_TABLE_ID, TIMESERIES_TABLE_ID
+
+MAPE_THRESHOLD = float(os.environ.get("FORECAST_MAPE_THRESHOLD", 20.0))
+MIN_SAMPLES = int(os.environ.get("FORECAST_ERROR_MIN_SAMPLES", 5))
+ERROR_WINDOW_DAYS = int(os.environ.get("FORECAST_ERROR_WINDOW_DAYS", 7))
+
+ALL_REGIONS = "__all__"
+
+# timeseries column → forecast metric
+METRIC_COLUMNS = {column: metric for _, metric, column in MODEL_SPECS}
+
+
+def build_forecast_error_query() -> str:
+    unpivot_columns = ", ".join(f"{column} AS '{metric}'" for column, metric in METRIC_COLUMNS.items())
+    return f"""
+        BEGIN TRANSACTION;
+        DELETE FROM `{ERROR_HISTORY_TABLE_ID}` WHERE run_date = @run_date;
+        INSERT INTO `{ERROR_HISTORY_TABLE_ID}` (
+            run_date, forecast_run_date, metric, region, model_name, sample_count, mape, threshold, drifted
+        )
+        WITH actuals AS (
+            SELECT instance_id, region, date, metric, actual_value
+            FROM `{TIMESERIES_TABLE_ID}`
+            UNPIVOT (actual_value FOR metric IN ({unpivot_columns}))
+            WHERE date >= TIMESTAMP(DATE_ADD(@forecast_run_date, INTERVAL 1 DAY))
+            AND date < TIMESTAMP(DATE_ADD(@run_date, INTERVAL 1 DAY))
+        ),
+        trained AS (
+            SELECT model_name, @trained_on_dates[OFFSET(i)] AS trained_on
+            FROM UNNEST(@trained_models) AS model_name WITH OFFSET i
+        ),
+        errors AS (
+            SELECT
+                forecast.metric,
+                COALESCE(forecast.region, actuals.region) AS region,
+                forecast.model_name,
+                ABS(actuals.actual_value - forecast.forecast_value) AS abs_error,
+                ABS(actuals.actual_value) AS abs_actual
+            FROM `{FORECAST_TABLE_ID}` AS forecast
+            JOIN actuals
+            ON forecast.Instance_ID = actuals.instance_id
+            AND forecast.metric = actuals.metric
+            AND forecast.forecast_timestamp = actuals.date
+            AND forecast.run_date = DATE_SUB(DATE(actuals.date), INTERVAL 1 DAY)
+            LEFT JOIN trained ON trained.model_name = forecast.model_name
+            WHERE forecast.run_date BETWEEN @forecast_run_date AND DATE_SUB(@run_date, INTERVAL 1 DAY)
+            AND (trained.trained_on IS NULL OR forecast.run_date >= trained.trained_on)
+        ),
+        mape AS (
+            SELECT
+                metric,
+                CASE
+                    WHEN GROUPING(region) = 0 THEN IFNULL(region, 'unknown')
+                    WHEN GROUPING(model_name) = 1 THEN '{ALL_REGIONS}'
+                END AS region,
+                IF(GROUPING(model_name) = 0, model_name, NULL) AS model_name,
+                COUNT(*) AS sample_count,
+                SAFE_DIVIDE(SUM(abs_error), SUM(abs_actual)) * 100 AS mape
+            FROM errors
+            GROUP BY GROUPING SETS ((metric, model_name), (metric, region), (metric))
+        )
+        SELECT
+            @run_date, @forecast_run_date, metric, region, model_name, sample_count, ROUND(mape, 3), @threshold,
+            sample_count >= @min_samples AND IFNULL(mape > @threshold, FALSE)
+        FROM mape;
+        COMMIT TRANSACTION;
+    """
+
+
+def compute_forecast_errors(client: bigquery.Client, run_date) -> list:
+    """
+    Scores the one-day-ahead forecasts of the last ERROR_WINDOW_DAYS days against the snapshots that
+    followed them, stores the errors in the history table and returns them as a list of dicts.
+    forecast_run_date in the history is the first forecast run of the window.
+    """
+    trained_on = trained_on_dates(client)
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ScalarQueryParameter("run_date", "DATE", run_date),
+        bigquery.ScalarQueryParameter("forecast_run_date", "DATE", run_date - timedelta(days=ERROR_WINDOW_DAYS)),
+        bigquery.ArrayQueryParameter("trained_models", "STRING", list(trained_on)),
+        bigquery.ArrayQueryParameter("trained_on_dates", "DATE", list(trained_on.values())),
+        bigquery.ScalarQueryParameter("threshold", "FLOAT64", MAPE_THRESHOLD),
+        bigquery.ScalarQueryParameter("min_samples", "INT64", MIN_SAMPLES),
+    ])
+    client.query(build_forecast_error_query(), job_config=job_config).result()
+
+    rows = client.query(
+        f"SELECT metric, region, model_name, sample_count, mape, drifted FROM `{ERROR_HISTORY_TABLE_ID}` "
+        "WHERE run_date = @run_date ORDER BY metric, region, model_name",
+        job_config=bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("run_date", "DATE", run_date)
+        ])
+    ).result()
+    return [dict(row) for row in rows]
+
+
+def covers_region(model_shard, region: str) -> bool:
+    return SHARD_KEY != "region" or model_shard.shard == region
+
+
+def models_to_retrain(errors: list, model_shards: list) -> dict:
+    """
+    Returns {model_name: reason} for the model shards that drifted, that cover a drifted region, or that
+    could not be scored at all (no forecast in the window, e.g. the first run or a new shard). A shard
+    scored on fewer than MIN_SAMPLES samples is not a candidate, its samples keep accumulating.
+    """
+    model_rows = {row["model_name"]: row for row in errors if row["model_name"]}
+    drifted_regions = {}
+    for row in errors:
+        if row["drifted"] and not row["model_name"] and row["region"] != ALL_REGIONS:
+            drifted_regions.setdefault(row["metric"], []).append(row)
+
+    reasons = {}
+    for model_shard in model_shards:
+        row = model_rows.get(model_shard.model_name)
+        region_rows = [
+            region_row for region_row in drifted_regions.get(model_shard.metric, [])
+            if covers_region(model_shard, region_row["region"])
+        ]
+        if row and row["drifted"]:
+            reasons[model_shard.model_name] = f"drift: WAPE {row['mape']}%"
+        elif region_rows:
+            reasons[model_shard.model_name] = "drift: " + ", ".join(
+                f"{region_row['region']} WAPE {region_row['mape']}%" for region_row in region_rows
+            )
+        elif not row:
+            reasons[model_shard.model_name] = "not scored"
+    return reasons
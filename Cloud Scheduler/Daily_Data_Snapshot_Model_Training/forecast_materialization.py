@@ -0,0 +1,143 @@
+"""
+Materializes the forecasts of all models into `server_forecasts` after each retrain.
+
+The models only change once a day, so the forecast is computed once at the maximum horizon and the
+agent tools slice that table by metric, instance and horizon instead of running ML.FORECAST per call.
+Re-running the job on the same day replaces that day's run.
+
+A model that was not retrained today (its input was unchanged or its forecasts are still accurate) forecasts
+from its last training date, so only the forecast steps after run_date are kept and numbered from 1.
+Every row records the model shard it came from, which the drift monitor scores per shard.
+
+The region and fleet totals of the aggregate models go to `server_aggregate_forecasts` the same way.
+"""
+
+from google.cloud import bigquery
+from table_provisioning import AGGREGATE_FORECAST_TABLE_ID, DATASET_ID, FORECAST_TABLE_ID
+from model_training import FLEET_SERIES, MAX_MODEL_AGE_DAYS
+
+MAX_FORECAST_HORIZON = 30
+CONFIDENCE_LEVEL = 0.8
+
+
+def build_model_forecast_select(metric: str, model_name: str) -> str:
+    return f"""
+    SELECT
+        @run_date AS run_date,
+        '{metric}' AS metric,
+        forecast.Instance_ID,
+        regions.Region AS region,
+        ROW_NUMBER() OVER (PARTITION BY forecast.Instance_ID ORDER BY forecast.forecast_timestamp) AS horizon_step,
+        forecast.forecast_timestamp,
+        forecast.forecast_value,
+        forecast.prediction_interval_lower_bound,
+        forecast.prediction_interval_upper_bound,
+        '{model_name}' AS model_name
+    FROM ML.FORECAST(
+        MODEL `{DATASET_ID}.{model_name}`,
+        STRUCT({MAX_FORECAST_HORIZON + MAX_MODEL_AGE_DAYS} AS horizon, {CONFIDENCE_LEVEL} AS confidence_level)
+    ) AS forecast
+    LEFT JOIN (
+        SELECT Instance_ID, ANY_VALUE(Region) AS Region
+        FROM `{DATASET_ID}.server_metrics`
+        GROUP BY Instance_ID
+    ) AS regions
+    USING (Instance_ID)
+    WHERE forecast.forecast_timestamp > TIMESTAMP(@run_date)
+    QUALIFY horizon_step <= {MAX_FORECAST_HORIZON}
+    """
+
+
+def materialize_forecasts(client: bigquery.Client, run_date, model_shards: list) -> int:
+    """
+    Replaces the rows of the given model shards in the run_date partition of the forecast table with
+    fresh forecasts. Returns the number of rows written.
+    """
+    model_names = [model_shard.model_name for model_shard in model_shards]
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ScalarQueryParameter("run_date", "DATE", run_date),
+            bigquery.ArrayQueryParameter("model_names", "STRING", model_names),
+        ]
+    )
+
+    selects = "\nUNION ALL\n".join(
+        build_model_forecast_select(model_shard.metric, model_shard.model_name) for model_shard in model_shards
+    )
+
+    client.query(f"""
+        BEGIN TRANSACTION;
+        DELETE FROM `{FORECAST_TABLE_ID}` WHERE run_date = @run_date AND model_name IN UNNEST(@model_names);
+        INSERT INTO `{FORECAST_TABLE_ID}` (
+            run_date, metric, Instance_ID, region, horizon_step, forecast_timestamp, forecast_value,
+            prediction_interval_lower_bound, prediction_interval_upper_bound, model_name
+        )
+        {selects};
+        COMMIT TRANSACTION;
+    """, job_config=job_config).result()
+
+    count_job = client.query(
+        f"SELECT COUNT(*) AS row_count FROM `{FORECAST_TABLE_ID}` WHERE run_date = @run_date AND model_name IN UNNEST(@model_names)",
+        job_config=job_config
+    )
+    return next(iter(count_job.result())).row_count
+
+
+def build_aggregate_forecast_select(metric: str, model_name: str) -> str:
+    return f"""
+    SELECT
+        @run_date AS run_date,
+        '{metric}' AS metric,
+        IF(series_id = '{FLEET_SERIES}', 'fleet', 'region') AS level,
+        NULLIF(series_id, '{FLEET_SERIES}') AS region,
+        ROW_NUMBER() OVER (PARTITION BY series_id ORDER BY forecast_timestamp) AS horizon_step,
+        forecast_timestamp,
+        forecast_value,
+        prediction_interval_lower_bound,
+        prediction_interval_upper_bound,
+        '{model_name}' AS model_name
+    FROM ML.FORECAST(
+        MODEL `{DATASET_ID}.{model_name}`,
+        STRUCT({MAX_FORECAST_HORIZON + MAX_MODEL_AGE_DAYS} AS horizon, {CONFIDENCE_LEVEL} AS confidence_level)
+    )
+    WHERE forecast_timestamp > TIMESTAMP(@run_date)
+    QUALIFY horizon_step <= {MAX_FORECAST_HORIZON}
+    """
+
+
+def materialize_aggregate_forecasts(client: bigquery.Client, run_date, aggregate_models: list) -> int:
+    """
+    Replaces the rows of the given aggregate models in the run_date partition of the aggregate forecast
+    table. Returns the number of rows written.
+    """
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ScalarQueryParameter("run_date", "DATE", run_date),
+            bigquery.ArrayQueryParameter(
+                "model_names", "STRING", [aggregate_model.model_name for aggregate_model in aggregate_models]
+            ),
+        ]
+    )
+
+    selects = "\nUNION ALL\n".join(
+        build_aggregate_forecast_select(aggregate_model.metric, aggregate_model.model_name)
+        for aggregate_model in aggregate_models
+    )
+
+    client.query(f"""
+        BEGIN TRANSACTION;
+        DELETE FROM `{AGGREGATE_FORECAST_TABLE_ID}` WHERE run_date = @run_date AND model_name IN UNNEST(@model_names);
+        INSERT INTO `{AGGREGATE_FORECAST_TABLE_ID}` (
+            run_date, metric, level, region, horizon_step, forecast_timestamp, forecast_value,
+            prediction_interval_lower_bound, prediction_interval_upper_bound, model_name
+        )
+        {selects};
+        COMMIT TRANSACTION;
+    """, job_config=job_config).result()
+
+    count_job = client.query(
+        f"SELECT COUNT(*) AS row_count FROM `{AGGREGATE_FORECAST_TABLE_ID}` "
+        "WHERE run_date = @run_date AND model_name IN UNNEST(@model_names)",
+        job_config=job_config
+    )
+    return next(iter(count_job.result())).row_count
@@ -0,0 +1 @@
+../../greenops_agent/agents/forecaster_agent/forecast_naming.py
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+Runs several BigQuery jobs at once and waits on them together.
+
+All jobs are submitted up front so BigQuery trains them in parallel and the wall time is roughly that of
+the longest job instead of the sum of all of them. Each job is retried on its own when it fails, and the
+report lists the duration, slot usage and bytes processed of every job. With one model per shard the
+number of jobs grows with the fleet, so at most `MAX_CONCURRENT_JOBS` run at a time and the rest queue.
+"""
+
+import os
+import time
+from google.cloud import bigquery
+
+MAX_JOB_RETRIES = 1
+POLL_SECONDS = 5
+JOB_TIMEOUT_SECONDS = 50 * 60
+MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", 20))
+
+
+def job_report(job: bigquery.QueryJob, attempts: int) -> dict:
+    started, ended = job.started, job.ended
+    return {
+        "job_id": job.job_id,
+        "state": "FAILED" if job.error_result else job.state,
+        "attempts": attempts,
+        "duration_seconds": round((ended - started).total_seconds(), 1) if started and ended else None,
+        "slot_millis": job.slot_millis,
+        "total_bytes_processed": job.total_bytes_processed,
+        "error": job.error_result.get("message") if job.error_result else None,
+    }
+
+
+def run_jobs_concurrently(client: bigquery.Client, queries: dict, max_retries: int = MAX_JOB_RETRIES,
+                          poll_seconds: float = POLL_SECONDS, timeout_seconds: float = JOB_TIMEOUT_SECONDS,
+                          max_concurrent: int = MAX_CONCURRENT_JOBS) -> dict:
+    """
+    Submits the {name: sql} queries, at most max_concurrent at a time, and polls them until all are done.
+    Returns {name: report}. A failed job is resubmitted up to max_retries times without affecting the others.
+    """
+    started_at = time.monotonic()
+    attempts = {name: 1 for name in queries}
+    queued = list(queries)
+    pending = {}
+    reports = {}
+
+    while queued or pending:
+        while queued and len(pending) < max_concurrent:
+            name = queued.pop(0)
+            pending[name] = client.query(queries[name])
+
+        for name, job in list(pending.items()):
+            if not job.done():
+                continue
+
+            if job.error_result and attempts[name] <= max_retries:
+                print(f"Job {name} failed ({job.error_result.get('message')}), retrying")
+                attempts[name] += 1
+                pending[name] = client.query(queries[name])
+                continue
+
+            reports[name] = job_report(job, attempts[name])
+            del pending[name]
+            print(f"Job {name} finished: {reports[name]}")
+
+        if (pending or queued) and time.monotonic() - started_at > timeout_seconds:
+            for name, job in pending.items():
+                job.cancel()
+            for name in list(pending) + queued:
+                reports[name] = {
+                    "job_id": pending[name].job_id if name in pending else None, "state": "TIMEOUT",
+                    "attempts": attempts[name], "duration_seconds": None, "slot_millis": None,
+                    "total_bytes_processed": None, "error": f"Not finished after {timeout_seconds} seconds"
+                }
+            break
+
+        if pending:
+            time.sleep(poll_seconds)
+
+    return reports
+
+
+def failed_jobs(reports: dict) -> dict:
+    return {name: report["error"] for name, report in reports.items() if report["state"] != "DONE"}
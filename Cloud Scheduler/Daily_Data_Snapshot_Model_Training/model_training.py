@@ -0,0 +1,331 @@
+"""
+Bounded, skip-if-unchanged retraining of the forecast models.
+
+Each model trains only on the last `TRAINING_WINDOW_DAYS` of `server_metrics_timeseries` (overridable per
+model, e.g. TRAINING_WINDOW_DAYS_CARBON=180), so training time and cost stay flat as history grows.
+
+Before training, the input slice of every model is fingerprinted (row count, latest date, window). The
+fingerprint of the slice a model was trained on is stored in the model's labels together with that run's
+duration and slot usage. When the fingerprint is unchanged the retrain is skipped, and the last run's
+duration and slot usage are reported as saved.
+
+The daily snapshot replaces the rows of its run_date instead of appending, so a rerun of the same day
+leaves every fingerprint unchanged and skips all retrains. On the next day the window moves and a row per
+instance lands, so every fingerprint changes; the day-to-day savings come from the drift gating below.
+The fingerprints are read from the partitions of the training window only, not the whole history.
+
+The drift monitor can narrow retraining further to the models whose forecasts are no longer accurate. A
+model that is skipped as accurate is still retrained once it is older than `MAX_MODEL_AGE_DAYS`, so its
+forecasts always reach far enough into the future.
+
+Models are sharded by `FORECAST_SHARD_KEY` (a timeseries column, "region" by default): every metric gets
+one model per shard value, e.g. `server_cpu_forecast_model__us_west1`, trained on that shard's series
+only. Shards train in parallel and a region's forecast only needs its own shard. An empty shard key
+trains the single fleet-wide model per metric. The model names and the shard key come from
+`forecast_naming`, which the forecaster tools import as well, and the models that no longer match them
+(the fleet-wide models once sharded, shards of a value or key no longer in use) are dropped.
+
+Next to them, an aggregate model forecasts the daily carbon totals per region and for the fleet (series
+"__fleet__"), trained on the pre-aggregated timeseries, so reports forecast a handful of series instead of
+summing thousands of instance forecasts. It is cheap and retrains whenever its input changes.
+"""
+
+import hashlib
+import os
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery
+from forecast_naming import (
+    AGGREGATE_MODEL_SPECS, FLEET_SERIES, MODEL_SPECS, SHARD_KEY, SHARD_KEY_LABEL, shard_model_name, shard_suffix
+)
+from table_provisioning import DATASET_ID, TIMESERIES_TABLE_ID
+
+TRAINING_WINDOW_DAYS = int(os.environ.get("TRAINING_WINDOW_DAYS", 90))
+MAX_MODEL_AGE_DAYS = int(os.environ.get("MAX_MODEL_AGE_DAYS", 7))
+
+# Models an earlier version of this job trained, dropped so they stop costing storage
+RETIRED_MODELS = ["server_cpu_aggregate_forecast_model", "server_mem_aggregate_forecast_model"]
+
+# One trained model: the shard is the value of SHARD_KEY it is trained on, None for the fleet-wide model
+ModelShard = namedtuple("ModelShard", ["model_name", "metric", "column", "shard"])
+AggregateModel = namedtuple("AggregateModel", ["model_name", "metric", "column"])
+
+AGGREGATE_MODELS = [AggregateModel(*spec) for spec in AGGREGATE_MODEL_SPECS]
+
+FINGERPRINT_LABEL = "training_fingerprint"
+DURATION_LABEL = "training_seconds"
+SLOT_MILLIS_LABEL = "training_slot_millis"
+TRAINED_ON_LABEL = "trained_on"
+
+
+def training_window_days(metric: str) -> int:
+    return int(os.environ.get(f"TRAINING_WINDOW_DAYS_{metric.upper()}", TRAINING_WINDOW_DAYS))
+
+
+def window_start(run_date, metric: str):
+    return run_date - timedelta(days=training_window_days(metric))
+
+
+def shard_filter(shard: str = None) -> str:
+    if not shard:
+        return "TRUE"
+    # CREATE MODEL does not take query parameters, the shard value is quoted as a string literal
+    escaped = shard.replace("\\", "\\\\").replace("'", "\\'")
+    return f"{SHARD_KEY} = '{escaped}'"
+
+
+def list_model_shards(client: bigquery.Client) -> list:
+    """
+    Returns a ModelShard for every metric and every shard value present in the timeseries table.
+    """
+    if not SHARD_KEY:
+        return [ModelShard(model_name, metric, column, None) for model_name, metric, column in MODEL_SPECS]
+
+    rows = client.query(
+        f"SELECT DISTINCT {SHARD_KEY} AS shard FROM `{TIMESERIES_TABLE_ID}` WHERE {SHARD_KEY} IS NOT NULL ORDER BY shard"
+    ).result()
+    shards = [row.shard for row in rows]
+
+    # Distinct shard values must not share a model name, e.g. "us-west1" and "us_west1"
+    suffixes = {}
+    for shard in shards:
+        suffixes.setdefault(shard_suffix(shard), []).append(shard)
+    collisions = {suffix: values for suffix, values in suffixes.items() if len(values) > 1 or not suffix}
+    if collisions:
+        raise ValueError(f"{SHARD_KEY} values map to the same model name: {collisions}")
+
+    return [
+        ModelShard(shard_model_name(model_name, shard), metric, column, shard)
+        for model_name, metric, column in MODEL_SPECS
+        for shard in shards
+    ]
+
+
+def build_create_model_query(model_name: str, column: str, start_date, shard: str = None) -> str:
+    return f"""
+            CREATE OR REPLACE MODEL `{DATASET_ID}.{model_name}`
+            OPTIONS(
+            MODEL_TYPE='ARIMA_PLUS',
+            TIME_SERIES_TIMESTAMP_COL='date',
+            TIME_SERIES_ID_COL='Instance_ID',
+            TIME_SERIES_DATA_COL='{column}',
+            DATA_FREQUENCY='AUTO_FREQUENCY'
+            ) AS
+            SELECT
+            date,
+            Instance_ID,
+            {column}
+            FROM
+            `{TIMESERIES_TABLE_ID}`
+            WHERE {column} IS NOT NULL AND date >= TIMESTAMP('{start_date.isoformat()}') AND {shard_filter(shard)}
+            """
+
+
+def build_create_aggregate_model_query(aggregate_model: AggregateModel, start_date) -> str:
+    model_name, _, column = aggregate_model
+    return f"""
+            CREATE OR REPLACE MODEL `{DATASET_ID}.{model_name}`
+            OPTIONS(
+            MODEL_TYPE='ARIMA_PLUS',
+            TIME_SERIES_TIMESTAMP_COL='date',
+            TIME_SERIES_ID_COL='series_id',
+            TIME_SERIES_DATA_COL='{column}',
+            DATA_FREQUENCY='AUTO_FREQUENCY'
+            ) AS
+            SELECT
+            date,
+            IF(GROUPING(region) = 1, '{FLEET_SERIES}', IFNULL(region, 'unknown')) AS series_id,
+            SUM({column}) AS {column}
+            FROM
+            `{TIMESERIES_TABLE_ID}`
+            WHERE {column} IS NOT NULL AND date >= TIMESTAMP('{start_date.isoformat()}')
+            GROUP BY GROUPING SETS ((date, region), (date))
+            """
+
+
+def fingerprint(rows: int, max_date, window_days: int) -> str:
+    return hashlib.sha1(f"{rows}|{max_date}|{window_days}".encode()).hexdigest()[:16]
+
+
+def input_fingerprints(client: bigquery.Client, run_date, model_shards: list) -> dict:
+    """
+    Returns {model_name: {"fingerprint", "rows", "max_date", "window_days"}} for every model shard and
+    aggregate model, computed in one pass over the partitions of the widest training window only.
+    """
+    selects = []
+    for model_name, metric, column in MODEL_SPECS:
+        in_window = f"{column} IS NOT NULL AND date >= TIMESTAMP('{window_start(run_date, metric).isoformat()}')"
+        selects.append(f"""
+            COUNTIF({in_window}) AS {model_name}__rows,
+            CAST(MAX(IF({in_window}, date, NULL)) AS STRING) AS {model_name}__max_date""")
+
+    earliest_start = min(window_start(run_date, metric) for _, metric, _ in MODEL_SPECS)
+    shard_column = SHARD_KEY or "CAST(NULL AS STRING)"
+    rows = client.query(
+        f"SELECT {shard_column} AS shard, {','.join(selects)} FROM `{TIMESERIES_TABLE_ID}` "
+        f"WHERE date >= TIMESTAMP('{earliest_start.isoformat()}') GROUP BY shard"
+    ).result()
+    rows_by_shard = {row["shard"]: row for row in rows}
+
+    base_models = {metric: model_name for model_name, metric, _ in MODEL_SPECS}
+    fingerprints = {}
+    for model_shard in model_shards:
+        row = rows_by_shard.get(model_shard.shard)
+        base_model = base_models[model_shard.metric]
+        rows, max_date = (row[f"{base_model}__rows"], row[f"{base_model}__max_date"]) if row else (0, None)
+        window_days = training_window_days(model_shard.metric)
+        fingerprints[model_shard.model_name] = {
+            "fingerprint": fingerprint(rows, max_date, window_days),
+            "rows": rows,
+            "max_date": max_date,
+            "window_days": window_days,
+        }
+
+    # An aggregate model is trained on the whole fleet, so its input is the sum of all shards
+    for aggregate_model in AGGREGATE_MODELS:
+        base_model = base_models[aggregate_model.metric]
+        rows = sum(row[f"{base_model}__rows"] for row in rows_by_shard.values())
+        max_date = max((row[f"{base_model}__max_date"] for row in rows_by_shard.values()
+                        if row[f"{base_model}__max_date"]), default=None)
+        window_days = training_window_days(aggregate_model.metric)
+        fingerprints[aggregate_model.model_name] = {
+            "fingerprint": fingerprint(rows, max_date, window_days),
+            "rows": rows,
+            "max_date": max_date,
+            "window_days": window_days,
+        }
+    return fingerprints
+
+
+def model_labels(client: bigquery.Client, model_name: str) -> dict:
+    try:
+        return client.get_model(f"{DATASET_ID}.{model_name}").labels or {}
+    except NotFound:
+        return {}
+
+
+def model_age_days(labels: dict, run_date):
+    trained_on = labels.get(TRAINED_ON_LABEL)
+    if not trained_on:
+        return None
+    return (run_date - datetime.strptime(trained_on, "%Y%m%d").date()).days
+
+
+def is_stale_model(model_name: str, current_models: set) -> bool:
+    """
+    A forecast model that is not current: a RETIRED_MODELS entry, the fleet-wide model of a metric once the
+    models are sharded, or a shard whose value is gone or was trained with another shard key.
+    """
+    if model_name in current_models:
+        return False
+    if model_name in RETIRED_MODELS:
+        return True
+    return any(
+        model_name == base_model or model_name.startswith(f"{base_model}__") for base_model, _, _ in MODEL_SPECS
+    )
+
+
+def drop_stale_models(client: bigquery.Client, model_shards: list) -> list:
+    """
+    Deletes the stale forecast models of the dataset (see is_stale_model) and returns their names.
+    """
+    current_models = {model_shard.model_name for model_shard in model_shards}
+    dropped = sorted(
+        model.model_id for model in client.list_models(DATASET_ID) if is_stale_model(model.model_id, current_models)
+    )
+    for model_name in dropped:
+        client.delete_model(f"{DATASET_ID}.{model_name}", not_found_ok=True)
+    return dropped
+
+
+def trained_on_dates(client: bigquery.Client) -> dict:
+    """
+    Returns {model_name: date} from the trained_on label of every model in the dataset, in one list call.
+    """
+    dates = {}
+    for model in client.list_models(DATASET_ID):
+        trained_on = (model.labels or {}).get(TRAINED_ON_LABEL)
+        if trained_on:
+            dates[model.model_id] = datetime.strptime(trained_on, "%Y%m%d").date()
+    return dates
+
+
+def label_trained_model(client: bigquery.Client, model_name: str, fingerprint: str, report: dict, run_date):
+    model = client.get_model(f"{DATASET_ID}.{model_name}")
+    model.labels = {
+        **(model.labels or {}),
+        FINGERPRINT_LABEL: fingerprint,
+        TRAINED_ON_LABEL: run_date.strftime("%Y%m%d"),
+        SHARD_KEY_LABEL: SHARD_KEY or "none",
+        DURATION_LABEL: str(int(report["duration_seconds"] or 0)),
+        SLOT_MILLIS_LABEL: str(report["slot_millis"] or 0),
+    }
+    client.update_model(model, ["labels"])
+
+
+def plan_training(client: bigquery.Client, run_date, model_shards: list, retrain_candidates: dict = None) -> tuple:
+    """
+    Returns ({model_name: create_model_sql} for the model shards and aggregate models to retrain, the skip
+    report, fingerprints).
+
+    A model is skipped when its input slice is unchanged, or, for a model shard when `retrain_candidates`
+    ({model_name: reason} from the drift monitor) is given, when it is not a candidate and not older than
+    MAX_MODEL_AGE_DAYS.
+    """
+    fingerprints = input_fingerprints(client, run_date, model_shards)
+
+    queries, skipped = {}, {}
+
+    def skip_reason(model_name: str, drift_gated: bool):
+        labels = model_labels(client, model_name)
+        age_days = model_age_days(labels, run_date)
+
+        reason = None
+        if labels.get(FINGERPRINT_LABEL) == fingerprints[model_name]["fingerprint"]:
+            reason = "unchanged input"
+        elif drift_gated and retrain_candidates is not None and model_name not in retrain_candidates \
+                and age_days is not None and age_days < MAX_MODEL_AGE_DAYS:
+            reason = "accurate forecasts"
+
+        if reason:
+            skipped[model_name] = {
+                "reason": reason,
+                "seconds_saved": int(labels.get(DURATION_LABEL, 0)),
+                "slot_millis_saved": int(labels.get(SLOT_MILLIS_LABEL, 0)),
+            }
+        return reason
+
+    for model_name, metric, column, shard in model_shards:
+        if not skip_reason(model_name, drift_gated=True):
+            queries[model_name] = build_create_model_query(model_name, column, window_start(run_date, metric), shard)
+
+    for aggregate_model in AGGREGATE_MODELS:
+        if not skip_reason(aggregate_model.model_name, drift_gated=False):
+            queries[aggregate_model.model_name] = build_create_aggregate_model_query(
+                aggregate_model, window_start(run_date, aggregate_model.metric)
+            )
+
+    return queries, skipped, fingerprints
+
+
+def training_savings_report(fingerprints: dict, skipped: dict, training_reports: dict, history_rows: int) -> dict:
+    """
+    history_rows is the row count of the whole timeseries table, read from its metadata rather than scanned,
+    next to the rows each model actually trained on.
+    """
+    return {
+        "history_rows": history_rows,
+        "trained": {
+            model_name: {
+                "duration_seconds": report["duration_seconds"],
+                "slot_millis": report["slot_millis"],
+                "rows": fingerprints[model_name]["rows"],
+            }
+            for model_name, report in training_reports.items()
+        },
+        "skipped": skipped,
+        "seconds_saved": sum(entry["seconds_saved"] for entry in skipped.values()),
+        "slot_millis_saved": sum(entry["slot_millis_saved"] for entry in skipped.values()),
+    }
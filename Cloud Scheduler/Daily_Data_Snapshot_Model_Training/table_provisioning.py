@@ -0,0 +1,217 @@
+"""
+Provisioning and migration of the `server_metrics_timeseries`, `server_forecasts` and
+`forecast_error_history` tables.
+
+`server_metrics_timeseries` is partitioned by day on `date` and clustered by region and instance_id, so
+the weekly report queries only read the partitions of the week they ask for and cost stays flat as
+history grows.
+
+A table that already exists without that layout is migrated: the history is copied into a partitioned
+and clustered table, the old table is kept as `server_metrics_timeseries__legacy_<timestamp>` and the new
+one takes its name. Delete the legacy table once the migration has been verified.
+
+`server_forecasts` holds the forecasts materialized after every retrain. It is partitioned by run_date
+and clustered by metric, region and Instance_ID, so reading one run's forecast for a metric, a region or
+an instance only touches that slice. `forecast_error_history` keeps the daily forecast error per model
+and region. `server_aggregate_forecasts` holds the forecasts of the region and fleet totals, a handful of
+series per metric. Columns and clustering added to these tables later are applied to the existing tables.
+
+Run the migration by hand with:
+    python table_provisioning.py
+"""
+
+import time
+from google.cloud import bigquery
+from google.api_core.exceptions import NotFound
+
+DATASET_ID = "greenops-460813.gcp_server_details"
+TIMESERIES_TABLE_NAME = "server_metrics_timeseries"
+TIMESERIES_TABLE_ID = f"{DATASET_ID}.{TIMESERIES_TABLE_NAME}"
+
+PARTITION_FIELD = "date"
+CLUSTERING_FIELDS = ["region", "instance_id"]
+
+FORECAST_TABLE_NAME = "server_forecasts"
+FORECAST_TABLE_ID = f"{DATASET_ID}.{FORECAST_TABLE_NAME}"
+FORECAST_PARTITION_FIELD = "run_date"
+FORECAST_CLUSTERING_FIELDS = ["metric", "region", "Instance_ID"]
+
+FORECAST_SCHEMA = [
+    bigquery.SchemaField("run_date", "DATE"),
+    bigquery.SchemaField("metric", "STRING"),
+    bigquery.SchemaField("Instance_ID", "STRING"),
+    bigquery.SchemaField("region", "STRING"),
+    bigquery.SchemaField("horizon_step", "INT64"),
+    bigquery.SchemaField("forecast_timestamp", "TIMESTAMP"),
+    bigquery.SchemaField("forecast_value", "FLOAT64"),
+    bigquery.SchemaField("prediction_interval_lower_bound", "FLOAT64"),
+    bigquery.SchemaField("prediction_interval_upper_bound", "FLOAT64"),
+    bigquery.SchemaField("model_name", "STRING"),
+]
+
+AGGREGATE_FORECAST_TABLE_NAME = "server_aggregate_forecasts"
+AGGREGATE_FORECAST_TABLE_ID = f"{DATASET_ID}.{AGGREGATE_FORECAST_TABLE_NAME}"
+
+# level is "fleet" (region NULL) or "region"
+AGGREGATE_FORECAST_SCHEMA = [
+    bigquery.SchemaField("run_date", "DATE"),
+    bigquery.SchemaField("metric", "STRING"),
+    bigquery.SchemaField("level", "STRING"),
+    bigquery.SchemaField("region", "STRING"),
+    bigquery.SchemaField("horizon_step", "INT64"),
+    bigquery.SchemaField("forecast_timestamp", "TIMESTAMP"),
+    bigquery.SchemaField("forecast_value", "FLOAT64"),
+    bigquery.SchemaField("prediction_interval_lower_bound", "FLOAT64"),
+    bigquery.SchemaField("prediction_interval_upper_bound", "FLOAT64"),
+    bigquery.SchemaField("model_name", "STRING"),
+]
+
+ERROR_HISTORY_TABLE_NAME = "forecast_error_history"
+ERROR_HISTORY_TABLE_ID = f"{DATASET_ID}.{ERROR_HISTORY_TABLE_NAME}"
+
+# `mape` keeps its original name for the existing tables but holds the weighted percentage error
+# (WAPE) of the pooled window, see drift_monitor
+ERROR_HISTORY_SCHEMA = [
+    bigquery.SchemaField("run_date", "DATE"),
+    bigquery.SchemaField("forecast_run_date", "DATE", description="First forecast run of the scored window"),
+    bigquery.SchemaField("metric", "STRING"),
+    bigquery.SchemaField("region", "STRING"),
+    bigquery.SchemaField("sample_count", "INT64", description="Forecast points scored over the window"),
+    bigquery.SchemaField(
+        "mape", "FLOAT64", description="WAPE in percent: SUM(|actual - forecast|) / SUM(|actual|) * 100"
+    ),
+    bigquery.SchemaField("threshold", "FLOAT64"),
+    bigquery.SchemaField("drifted", "BOOL"),
+    bigquery.SchemaField("model_name", "STRING"),
+]
+
+TIMESERIES_SCHEMA = [
+    bigquery.SchemaField("date", "TIMESTAMP"),
+    bigquery.SchemaField("instance_id", "STRING"),
+    bigquery.SchemaField("instance_type", "STRING"),
+    bigquery.SchemaField("region", "STRING"),
+    bigquery.SchemaField("cpu_util", "FLOAT64"),
+    bigquery.SchemaField("memory_util", "FLOAT64"),
+    bigquery.SchemaField("disk_iops", "INT64"),
+    bigquery.SchemaField("network_iops", "INT64"),
+    bigquery.SchemaField("total_carbon", "FLOAT64"),
+]
+
+
+def has_expected_layout(table: bigquery.Table) -> bool:
+    partitioning = table.time_partitioning
+    return (
+        partitioning is not None
+        and partitioning.type_ == bigquery.TimePartitioningType.DAY
+        and partitioning.field == PARTITION_FIELD
+        and list(table.clustering_fields or []) == CLUSTERING_FIELDS
+    )
+
+
+def create_timeseries_table(client: bigquery.Client, table_id: str = TIMESERIES_TABLE_ID) -> bigquery.Table:
+    table = bigquery.Table(table_id, schema=TIMESERIES_SCHEMA)
+    table.time_partitioning = bigquery.TimePartitioning(
+        type_=bigquery.TimePartitioningType.DAY, field=PARTITION_FIELD
+    )
+    table.clustering_fields = CLUSTERING_FIELDS
+    return client.create_table(table)
+
+
+def migrate_timeseries_table(client: bigquery.Client) -> str:
+    """
+    Copies the existing history into a partitioned and clustered table and swaps the names.
+    Returns the id of the legacy table that keeps the old data.
+    """
+    suffix = time.strftime("%Y%m%d%H%M%S")
+    staging_name = f"{TIMESERIES_TABLE_NAME}__migration_{suffix}"
+    legacy_name = f"{TIMESERIES_TABLE_NAME}__legacy_{suffix}"
+
+    client.query(f"""
+        CREATE TABLE `{DATASET_ID}.{staging_name}`
+        PARTITION BY DATE({PARTITION_FIELD})
+        CLUSTER BY {", ".join(CLUSTERING_FIELDS)}
+        AS SELECT * FROM `{TIMESERIES_TABLE_ID}`
+    """).result()
+
+    client.query(f"ALTER TABLE `{TIMESERIES_TABLE_ID}` RENAME TO `{legacy_name}`").result()
+    client.query(f"ALTER TABLE `{DATASET_ID}.{staging_name}` RENAME TO `{TIMESERIES_TABLE_NAME}`").result()
+
+    return f"{DATASET_ID}.{legacy_name}"
+
+
+def ensure_timeseries_table(client: bigquery.Client) -> str:
+    """
+    Makes sure the timeseries table exists with the partitioned and clustered layout.
+    Returns "exists", "created" or "migrated".
+    """
+    try:
+        table = client.get_table(TIMESERIES_TABLE_ID)
+    except NotFound:
+        create_timeseries_table(client)
+        print(f"Created {TIMESERIES_TABLE_ID} partitioned by {PARTITION_FIELD}, clustered by {CLUSTERING_FIELDS}")
+        return "created"
+
+    if has_expected_layout(table):
+        return "exists"
+
+    legacy_table_id = migrate_timeseries_table(client)
+    print(f"Migrated {TIMESERIES_TABLE_ID} to the partitioned layout, previous data kept in {legacy_table_id}")
+    return "migrated"
+
+
+def ensure_partitioned_table(client: bigquery.Client, table_id: str, schema: list, partition_field: str,
+                             clustering_fields: list) -> str:
+    """
+    Creates a day-partitioned, clustered table if it does not exist yet, or adds the missing columns and
+    updates the clustering of an existing one. Returns "exists", "updated" or "created".
+    """
+    try:
+        table = client.get_table(table_id)
+    except NotFound:
+        table = None
+
+    if table is not None:
+        existing_columns = {field.name for field in table.schema}
+        missing_columns = [field for field in schema if field.name not in existing_columns]
+        if not missing_columns and list(table.clustering_fields or []) == clustering_fields:
+            return "exists"
+
+        # New columns must be NULLABLE, new clustering only applies to data written from now on
+        table.schema = list(table.schema) + missing_columns
+        table.clustering_fields = clustering_fields
+        client.update_table(table, ["schema", "clustering_fields"])
+        print(f"Updated {table_id}: added {[field.name for field in missing_columns]}, clustered by {clustering_fields}")
+        return "updated"
+
+    table = bigquery.Table(table_id, schema=schema)
+    table.time_partitioning = bigquery.TimePartitioning(
+        type_=bigquery.TimePartitioningType.DAY, field=partition_field
+    )
+    table.clustering_fields = clustering_fields
+    client.create_table(table)
+    print(f"Created {table_id} partitioned by {partition_field}, clustered by {clustering_fields}")
+    return "created"
+
+
+def ensure_forecast_table(client: bigquery.Client) -> str:
+    return ensure_partitioned_table(
+        client, FORECAST_TABLE_ID, FORECAST_SCHEMA, FORECAST_PARTITION_FIELD, FORECAST_CLUSTERING_FIELDS
+    )
+
+
+def ensure_aggregate_forecast_table(client: bigquery.Client) -> str:
+    return ensure_partitioned_table(
+        client, AGGREGATE_FORECAST_TABLE_ID, AGGREGATE_FORECAST_SCHEMA, "run_date", ["metric", "level", "region"]
+    )
+
+
+def ensure_error_history_table(client: bigquery.Client) -> str:
+    return ensure_partitioned_table(client, ERROR_HISTORY_TABLE_ID, ERROR_HISTORY_SCHEMA, "run_date", ["metric", "region"])
+
+
+if __name__ == "__main__":
+    client = bigquery.Client()
+    print(TIMESERIES_TABLE_NAME, ensure_timeseries_table(client))
+    print(FORECAST_TABLE_NAME, ensure_forecast_table(client))
+    print(AGGREGATE_FORECAST_TABLE_NAME, ensure_aggregate_forecast_table(client))
+    print(ERROR_HISTORY_TABLE_NAME, ensure_error_history_table(client))
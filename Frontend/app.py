@@ -1,5 +1,7 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import os
 import uuid
@@ -156,6 +158,26 @@ st.markdown(
 API_BASE_URL = "https://greenops-agent-service-273345197968.us-central1.run.app"
 APP_NAME = "greenops_agent"
 
+# (connect, read) timeouts in seconds; an agent run can take several minutes
+SESSION_TIMEOUT = (3.05, 30)
+RUN_TIMEOUT = (3.05, 600)
+
+@st.cache_resource
+def get_http_session():
+    # One pooled keep-alive session per server process. Connection failures are retried for every
+    # request, 429/5xx responses only for idempotent methods, so a run is never submitted twice.
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"])
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 # Initialize session state variables
 if "user_id" not in st.session_state:
     st.session_state.user_id = f"user-{uuid.uuid4()}"
@@ -171,11 +193,16 @@ if "thinking" not in st.session_state:
 
 def create_session():
     session_id = f"session-{int(time.time())}"
-    response = requests.post(
-        f"{API_BASE_URL}/apps/{APP_NAME}/users/{st.session_state.user_id}/sessions/{session_id}",
-        headers={"Content-Type": "application/json"},
-        data=json.dumps({})
-    )
+    try:
+        response = get_http_session().post(
+            f"{API_BASE_URL}/apps/{APP_NAME}/users/{st.session_state.user_id}/sessions/{session_id}",
+            headers={"Content-Type": "application/json"},
+            data=json.dumps({}),
+            timeout=SESSION_TIMEOUT
+        )
+    except requests.RequestException as e:
+        st.error(f"Failed to create session: {e}")
+        return False
     
     if response.status_code == 200:
         st.session_state.session_id = session_id
@@ -192,19 +219,24 @@ def send_message(message):
         return None
 
     # Send message to API
-    response = requests.post(
-        f"{API_BASE_URL}/run",
-        headers={"Content-Type": "application/json"},
-        data=json.dumps({
-            "app_name": APP_NAME,
-            "user_id": st.session_state.user_id,
-            "session_id": st.session_state.session_id,
-            "new_message": {
-                "role": "user",
-                "parts": [{"text": message}]
-            }
-        })
-    )
+    try:
+        response = get_http_session().post(
+            f"{API_BASE_URL}/run",
+            headers={"Content-Type": "application/json"},
+            data=json.dumps({
+                "app_name": APP_NAME,
+                "user_id": st.session_state.user_id,
+                "session_id": st.session_state.session_id,
+                "new_message": {
+                    "role": "user",
+                    "parts": [{"text": message}]
+                }
+            }),
+            timeout=RUN_TIMEOUT
+        )
+    except requests.RequestException as e:
+        st.error(f"Error: {e}")
+        return None
 
     # st.session_state.thinking = False
 
@@ -0,0 +1,97 @@
+"""
+Benchmarks the streaming availability-table parser against the previous BeautifulSoup parse.
+
+Save a few sparecores server pages first, for example:
+    curl -A "Mozilla/5.0" -o n2-standard-8.html "https://sparecores.com/server/gcp/n2-standard-8?showDetails=true"
+
+Then run from the repository root:
+    python benchmarks/bench_availability_parser.py n2-standard-8.html e2-standard-2.html
+
+Without arguments two synthetic pages are used instead, and their numbers only bound the result for a
+real page:
+- "best case": a short prefix and a large document after the table, where stopping at the end of the
+  table skips almost everything
+- "worst case": the same content with the table at the very end, where the whole page is parsed
+
+The speedup on real sparecores pages lies in between and depends on where their table sits, so quote
+the best case only as an upper bound and measure saved pages before drawing conclusions.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "greenops_agent", "agents", "impact_calculator_agent"))
+
+from bs4 import BeautifulSoup
+from availability_parser import parse_region_prices_stream
+
+CHUNK_SIZE = 16 * 1024
+REPEAT = 20
+
+
+def parse_region_prices_soup(html: str) -> dict:
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.select_one("#availability > table")
+
+    region_prices = {}
+    for row in table.find_all("tr"):
+        cols = row.find_all("td")
+        if len(cols) >= 3:
+            region_prices[cols[0].text.strip()] = cols[2].text.strip()
+    return region_prices
+
+
+def parse_streaming(html: str) -> dict:
+    data = html.encode()
+    return parse_region_prices_stream(data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE))
+
+
+def synthetic_page(filler_before: int, filler_after: int) -> str:
+    rows = "".join(
+        f"<tr><td>region-{i} (Zone {i})</td><td>{i % 3} zones</td><td>${0.05 + i / 1000:.4f}</td></tr>"
+        for i in range(40)
+    )
+    header = "<head>" + "<script>var x = 1;</script>" * 200 + "</head>"
+    filler = "<div class='card'><p>" + "lorem ipsum " * 50 + "</p></div>"
+    return (
+        f"<html>{header}<body>{filler * filler_before}<div id='availability'><table><tr><th>Region</th>"
+        f"<th>Zones</th><th>Price</th></tr>{rows}</table></div>{filler * filler_after}</body></html>"
+    )
+
+
+SYNTHETIC_PAGES = [
+    ("synthetic best case", synthetic_page(50, 400)),
+    ("synthetic worst case", synthetic_page(450, 0)),
+]
+
+
+def measure(parse, html: str):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = parse(html)
+    elapsed_ms = (time.perf_counter() - start) / REPEAT * 1000
+
+    tracemalloc.start()
+    parse(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, elapsed_ms, peak / 1024
+
+
+def main(paths):
+    pages = [(path, open(path, encoding="utf-8").read()) for path in paths] or SYNTHETIC_PAGES
+
+    print(f"{'page':<30} {'size KB':>8} {'soup ms':>9} {'stream ms':>10} {'soup peak KB':>13} {'stream peak KB':>15}")
+    for name, html in pages:
+        soup_result, soup_ms, soup_peak = measure(parse_region_prices_soup, html)
+        stream_result, stream_ms, stream_peak = measure(parse_streaming, html)
+        assert soup_result == stream_result, f"{name}: parsers disagree"
+
+        print(f"{os.path.basename(name):<30} {len(html) / 1024:>8.0f} {soup_ms:>9.2f} {stream_ms:>10.2f} {soup_peak:>13.0f} {stream_peak:>15.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,47 @@
+"""
+Names of the forecast models, shared by the scheduler job that trains them and the forecaster tools that
+route to them, so the two can never disagree on a model name.
+
+The scheduler directory links to this file and its deploy zip carries a copy, so it only imports the
+standard library.
+"""
+
+import os
+import re
+
+# model name, metric, timeseries column
+MODEL_SPECS = [
+    ("server_cpu_forecast_model", "cpu", "cpu_util"),
+    ("server_mem_forecast_model", "memory", "memory_util"),
+    ("server_carbon_forecast_model", "carbon", "total_carbon"),
+]
+
+# model name, metric, timeseries column summed over a region or the fleet per day, the same totals the
+# forecast tools report when they sum the instance forecasts. Only carbon adds up to a meaningful total,
+# a sum of utilization percentages does not, and the reports only read the carbon totals.
+AGGREGATE_MODEL_SPECS = [
+    ("server_carbon_aggregate_forecast_model", "carbon", "total_carbon"),
+]
+
+# Series id of the fleet total in the aggregate models, next to one series per region
+FLEET_SERIES = "__fleet__"
+
+# Every metric gets one model per value of FORECAST_SHARD_KEY, empty for one fleet-wide model per metric
+SHARD_KEYS = ["region", "instance_type"]
+SHARD_KEY = os.environ.get("FORECAST_SHARD_KEY", "region")
+if SHARD_KEY and SHARD_KEY not in SHARD_KEYS:
+    raise ValueError(f"FORECAST_SHARD_KEY must be one of {SHARD_KEYS} or empty, got {SHARD_KEY!r}")
+
+# Model label holding the shard key a model was trained with, "none" for a fleet-wide model
+SHARD_KEY_LABEL = "shard_key"
+
+
+def shard_suffix(shard: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", shard.lower()).strip("_")
+
+
+def shard_model_name(model_name: str, shard: str = None) -> str:
+    """
+    'server_cpu_forecast_model', 'us-west1' → 'server_cpu_forecast_model__us_west1'
+    """
+    return f"{model_name}__{shard_suffix(shard)}" if shard else model_name
@@ -0,0 +1,227 @@
+"""
+Forecast queries that aggregate inside BigQuery.
+
+Daily fleet totals, the fleet total and the top-K instances are computed with GROUP BY and ORDER BY/LIMIT
+over the materialized forecasts, so a report transfers a few dozen numbers whatever the size of the fleet.
+Until the first forecast has been materialized the same aggregation runs over ML.FORECAST.
+
+When the carbon aggregate model's forecasts are materialized, the daily carbon totals come from its
+region and fleet series directly and only the top-K instances are read from the per-instance forecasts.
+
+The scheduler trains one model per `FORECAST_SHARD_KEY` value (region by default), named
+`<model>__<shard>` by the `forecast_naming` module both sides share. A live forecast for one region only runs ML.FORECAST on that region's shard, and the
+stored forecasts are clustered by region, so either way a region costs in proportion to its size.
+"""
+
+from cachetools import TTLCache
+from google.cloud import bigquery
+from greenops_agent.bq_query_layer import bq_client, query_arrow, to_records
+from .forecast_naming import MODEL_SPECS, SHARD_KEY, SHARD_KEY_LABEL, shard_model_name
+from .forecast_store import (
+    FORECAST_TABLE, STORED_FORECAST_FILTER, latest_run_date, read_aggregate_forecasts, stored_forecast_parameters
+)
+
+FORECAST_DATASET = "greenops-460813.gcp_server_details"
+
+FORECAST_MODELS = {metric: f"{FORECAST_DATASET}.{model_name}" for model_name, metric, _ in MODEL_SPECS}
+
+# The model list only changes with the daily retrain
+dataset_models = TTLCache(maxsize=1, ttl=300)
+
+DEFAULT_HORIZON_DAYS = 7
+CONFIDENCE_LEVEL = 0.8
+
+
+def list_dataset_models() -> dict:
+    """
+    Returns {model id: labels} of the models in the forecast dataset.
+    """
+    if "models" not in dataset_models:
+        dataset_models["models"] = {
+            f"{FORECAST_DATASET}.{model.model_id}": model.labels or {}
+            for model in bq_client.list_models(FORECAST_DATASET)
+        }
+    return dataset_models["models"]
+
+
+def check_shard_key(models: dict):
+    for name, labels in models.items():
+        trained_with = labels.get(SHARD_KEY_LABEL)
+        if trained_with and trained_with != (SHARD_KEY or "none"):
+            raise ValueError(
+                f"{name} was trained with shard key {trained_with!r}, but FORECAST_SHARD_KEY is {SHARD_KEY!r}."
+            )
+
+
+def forecast_models(metric: str, region: str = None) -> list:
+    """
+    Returns the models to forecast the metric with: the region's shard when the models are sharded by
+    region and a region is given, every shard of the metric otherwise. Only in the first case the models
+    cover exactly the region, otherwise live_forecast_source has to filter the region.
+    """
+    model = FORECAST_MODELS[metric]
+    if not SHARD_KEY:
+        return [model]
+
+    models = list_dataset_models()
+    if SHARD_KEY == "region" and region:
+        shard_model = shard_model_name(model, region)
+        if shard_model not in models:
+            raise ValueError(f"No {metric} forecast model for region {region}.")
+        check_shard_key({shard_model: models[shard_model]})
+        return [shard_model]
+
+    shard_models = {name: labels for name, labels in models.items() if name.startswith(f"{model}__")}
+    check_shard_key(shard_models)
+    return sorted(shard_models) or [model]
+
+
+def live_forecast_source(model: str, horizon: int, region_filter: bool = False) -> str:
+    """
+    ML.FORECAST over one model. With region_filter only the instances of @region are kept, for models that
+    are not sharded by region.
+    """
+    where = ""
+    if region_filter:
+        where = f"WHERE Instance_ID IN (SELECT Instance_ID FROM `{FORECAST_DATASET}.server_metrics` WHERE Region = @region)"
+    return f"""
+        SELECT Instance_ID, DATE(forecast_timestamp) AS day, forecast_value
+        FROM ML.FORECAST(
+        MODEL `{model}`,
+        STRUCT({int(horizon)} AS horizon, {CONFIDENCE_LEVEL} AS confidence_level)
+        )
+        {where}
+    """
+
+
+def stored_forecast_source() -> str:
+    return f"""
+        SELECT Instance_ID, DATE(forecast_timestamp) AS day, forecast_value
+        FROM `{FORECAST_TABLE}`
+        WHERE {STORED_FORECAST_FILTER}
+    """
+
+
+def build_aggregated_forecast_query(forecast_source: str) -> str:
+    return f"""
+    WITH forecast AS (
+        {forecast_source}
+    ),
+    daily AS (
+        SELECT 'day' AS kind, CAST(day AS STRING) AS key, SUM(forecast_value) AS value
+        FROM forecast GROUP BY day
+    ),
+    top_instances AS (
+        SELECT 'instance' AS kind, Instance_ID AS key, SUM(forecast_value) AS value
+        FROM forecast GROUP BY Instance_ID
+        ORDER BY value DESC, key
+        LIMIT @top_k
+    ),
+    fleet AS (
+        SELECT 'fleet' AS kind, CAST(NULL AS STRING) AS key, SUM(forecast_value) AS value,
+               COUNT(DISTINCT Instance_ID) AS instance_count
+        FROM forecast
+    )
+    SELECT kind, key, ROUND(value, 3) AS value, NULL AS instance_count FROM daily
+    UNION ALL
+    SELECT kind, key, ROUND(value, 3), NULL FROM top_instances
+    UNION ALL
+    SELECT kind, key, ROUND(value, 3), instance_count FROM fleet
+    """
+
+
+def build_top_instances_query() -> str:
+    # At least one row is returned so instance_count is known even for top_k = 0
+    return f"""
+    SELECT Instance_ID AS key, ROUND(SUM(forecast_value), 3) AS value, COUNT(*) OVER () AS instance_count
+    FROM `{FORECAST_TABLE}`
+    WHERE {STORED_FORECAST_FILTER}
+    GROUP BY Instance_ID
+    ORDER BY value DESC, key
+    LIMIT GREATEST(@top_k, 1)
+    """
+
+
+def aggregate_model_forecast(metric: str, horizon: int, top_k: int, region: str = None):
+    """
+    Returns the same summary as get_aggregated_forecast from the aggregate models' region and fleet series
+    (daily sums, like the per-instance path), or None if the metric has no aggregate model or it has not been
+    materialized yet.
+    """
+    rows = read_aggregate_forecasts(metric, horizon, region)
+    level = "region" if region else "fleet"
+    daily_totals = {row["day"]: row["forecast_value"] for row in rows if row["level"] == level}
+    if not daily_totals:
+        return None
+
+    region_totals = {}
+    for row in rows:
+        if row["level"] == "region":
+            region_totals[row["region"]] = round(region_totals.get(row["region"], 0.0) + row["forecast_value"], 3)
+
+    instance_rows = []
+    run_date = latest_run_date()
+    if run_date is not None:
+        query_parameters = stored_forecast_parameters(run_date, [metric], horizon, region=region) + [
+            bigquery.ScalarQueryParameter("top_k", "INT64", int(top_k))
+        ]
+        instance_rows = to_records(query_arrow(build_top_instances_query(), query_parameters))
+
+    return {
+        "metric": metric,
+        "horizon": horizon,
+        "region": region,
+        "instance_count": instance_rows[0]["instance_count"] if instance_rows else 0,
+        "fleet_total": round(sum(daily_totals.values()), 3),
+        "daily_totals": dict(sorted(daily_totals.items())),
+        "region_totals": region_totals,
+        "top_instances": [{row["key"]: row["value"]} for row in instance_rows[:top_k]],
+    }
+
+
+def get_aggregated_forecast(metric: str = "carbon", horizon: int = DEFAULT_HORIZON_DAYS, top_k: int = 2,
+                            region: str = None) -> dict:
+    """
+    Returns the daily totals, the total and the top_k instances of the metric's forecast for the fleet,
+    or for one region.
+    """
+    aggregate_forecast = aggregate_model_forecast(metric, horizon, max(0, int(top_k)), region)
+    if aggregate_forecast is not None:
+        return aggregate_forecast
+
+    top_k_parameter = bigquery.ScalarQueryParameter("top_k", "INT64", max(0, int(top_k)))
+
+    run_date = latest_run_date()
+    if run_date is not None:
+        sql = build_aggregated_forecast_query(stored_forecast_source())
+        query_parameters = stored_forecast_parameters(run_date, [metric], horizon, region=region) + [top_k_parameter]
+    else:
+        # Shards of another key (or a single fleet model) hold every region's instances
+        region_filter = bool(region) and SHARD_KEY != "region"
+        forecast_source = "\n        UNION ALL\n".join(
+            live_forecast_source(model, horizon, region_filter) for model in forecast_models(metric, region)
+        )
+        sql = build_aggregated_forecast_query(forecast_source)
+        query_parameters = [top_k_parameter]
+        if region_filter:
+            query_parameters.append(bigquery.ScalarQueryParameter("region", "STRING", region))
+
+    rows = to_records(query_arrow(sql, query_parameters))
+
+    daily_totals = sorted(((row["key"], row["value"]) for row in rows if row["kind"] == "day"))
+    top_instances = sorted(
+        ((row["key"], row["value"]) for row in rows if row["kind"] == "instance"),
+        key=lambda item: item[1], reverse=True
+    )
+    fleet = next((row for row in rows if row["kind"] == "fleet"), {})
+
+    return {
+        "metric": metric,
+        "horizon": horizon,
+        "region": region,
+        "instance_count": fleet.get("instance_count") or 0,
+        "fleet_total": fleet.get("value") or 0.0,
+        "daily_totals": dict(daily_totals),
+        "region_totals": {},
+        "top_instances": [{instance_id: value} for instance_id, value in top_instances],
+    }
@@ -0,0 +1,125 @@
+"""
+Reads the forecasts materialized by the daily scheduler job into `server_forecasts`.
+
+Every run writes the forecasts of all models at the maximum horizon into the run_date partition, so the
+tools slice the latest run by metric, instance, region and horizon instead of running ML.FORECAST live.
+`forecast()` reads any combination of metrics and instances in one parameterized table read.
+
+The region and fleet totals forecast by the aggregate models are in `server_aggregate_forecasts`;
+`read_aggregate_forecasts()` reads them for reports that only need totals.
+"""
+
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery
+from greenops_agent.bq_query_layer import query_arrow, to_records
+from .forecast_naming import AGGREGATE_MODEL_SPECS, MODEL_SPECS
+
+FORECAST_TABLE = "greenops-460813.gcp_server_details.server_forecasts"
+AGGREGATE_FORECAST_TABLE = "greenops-460813.gcp_server_details.server_aggregate_forecasts"
+FORECAST_METRICS = [metric for _, metric, _ in MODEL_SPECS]
+AGGREGATE_FORECAST_METRICS = [metric for _, metric, _ in AGGREGATE_MODEL_SPECS]
+
+# Must match MAX_FORECAST_HORIZON of the scheduler's forecast materialization
+MAX_FORECAST_HORIZON = 30
+
+STORED_FORECAST_FILTER = (
+    "run_date = @run_date AND metric IN UNNEST(@metrics) AND horizon_step <= @horizon "
+    "AND (ARRAY_LENGTH(@instance_ids) = 0 OR Instance_ID IN UNNEST(@instance_ids)) "
+    "AND (@region IS NULL OR region = @region)"
+)
+
+
+def latest_run_date(table: str = FORECAST_TABLE):
+    """
+    Returns the run_date of the latest materialized forecast, or None if nothing was materialized yet.
+    """
+    try:
+        rows = to_records(query_arrow(f"SELECT MAX(run_date) AS run_date FROM `{table}`"))
+    except NotFound:
+        return None
+    return rows[0]["run_date"] if rows else None
+
+
+def stored_forecast_parameters(run_date, metrics: list, horizon: int, instance_ids: list = None,
+                               region: str = None) -> list:
+    unknown = [metric for metric in metrics if metric not in FORECAST_METRICS]
+    if unknown or not metrics:
+        raise ValueError(f"Unknown metrics {unknown}. Available metrics: {FORECAST_METRICS}")
+    if not 1 <= int(horizon) <= MAX_FORECAST_HORIZON:
+        raise ValueError(f"Horizon must be between 1 and {MAX_FORECAST_HORIZON} days.")
+
+    return [
+        bigquery.ScalarQueryParameter("run_date", "DATE", run_date),
+        bigquery.ArrayQueryParameter("metrics", "STRING", sorted(set(metrics))),
+        bigquery.ScalarQueryParameter("horizon", "INT64", int(horizon)),
+        bigquery.ArrayQueryParameter("instance_ids", "STRING", sorted(set(instance_ids or []))),
+        bigquery.ScalarQueryParameter("region", "STRING", region or None),
+    ]
+
+
+def read_forecasts(metrics: list, horizon: int = 7, instance_ids: list = None, region: str = None,
+                   run_date=None, tool_name: str = None, state=None) -> list:
+    """
+    Returns metric, Instance_ID, forecast_timestamp and forecast_value rows of the latest run (or run_date).
+    Raises LookupError if no forecast has been materialized yet.
+    """
+    run_date = run_date or latest_run_date()
+    if run_date is None:
+        raise LookupError("No materialized forecasts found. Run the daily snapshot job first.")
+
+    sql = (
+        f"SELECT metric, Instance_ID, forecast_timestamp, forecast_value FROM `{FORECAST_TABLE}` "
+        f"WHERE {STORED_FORECAST_FILTER} ORDER BY metric, Instance_ID, forecast_timestamp"
+    )
+    parameters = stored_forecast_parameters(run_date, metrics, horizon, instance_ids, region)
+    return to_records(query_arrow(sql, parameters, tool_name=tool_name, state=state))
+
+
+def forecast(metrics: list, horizon: int = 7, instance_ids: list = None, region: str = None,
+             tool_name: str = None, state=None) -> dict:
+    """
+    Forecasts any combination of "cpu", "memory" and "carbon" for the given instances (all when empty),
+    optionally limited to one region, over the next `horizon` days.
+
+    Returns {"run_date", "horizon", "forecasts": {metric: {instance_id: {"YYYY-MM-DD": value}}}}.
+    """
+    run_date = latest_run_date()
+    rows = read_forecasts(metrics, horizon, instance_ids, region, run_date, tool_name, state)
+
+    forecasts = {metric: {} for metric in dict.fromkeys(metrics)}
+    for row in rows:
+        instance_forecast = forecasts[row["metric"]].setdefault(row["Instance_ID"], {})
+        instance_forecast[row["forecast_timestamp"].strftime("%Y-%m-%d")] = round(row["forecast_value"], 3)
+
+    return {
+        "run_date": run_date.isoformat(),
+        "horizon": int(horizon),
+        "forecasts": forecasts,
+    }
+
+
+def read_aggregate_forecasts(metric: str, horizon: int = 7, region: str = None, run_date=None) -> list:
+    """
+    Returns level ("fleet" or "region"), region, day and forecast_value rows of the latest aggregate run
+    (or run_date): the fleet series plus every region, or only the given region. Values are daily totals.
+    Empty if nothing was materialized yet or the metric has no aggregate model.
+    """
+    if metric not in AGGREGATE_FORECAST_METRICS:
+        return []
+
+    run_date = run_date or latest_run_date(AGGREGATE_FORECAST_TABLE)
+    if run_date is None:
+        return []
+
+    sql = f"""
+        SELECT level, region, CAST(DATE(forecast_timestamp) AS STRING) AS day, ROUND(forecast_value, 3) AS forecast_value
+        FROM `{AGGREGATE_FORECAST_TABLE}`
+        WHERE run_date = @run_date AND metric IN UNNEST(@metrics) AND horizon_step <= @horizon
+        AND (@region IS NULL OR region = @region)
+        ORDER BY level, region, day
+    """
+    parameters = [
+        parameter for parameter in stored_forecast_parameters(run_date, [metric], horizon, region=region)
+        if parameter.name != "instance_ids"
+    ]
+    return to_records(query_arrow(sql, parameters))
@@ -1,150 +1,7 @@
 from google.adk.agents import Agent
 from google.adk.tools.agent_tool import AgentTool
 from google.adk.tools import google_search
-import requests
-from bs4 import BeautifulSoup
-import re
-import os
-
-def format_region_for_climatiq(region: str) -> str:
-    """
-    Converts 'us-central1' → 'us_central_1' (Climatiq format).
-    """
-    match = re.match(r"([a-z]+)-([a-z]+)(\d)", region.lower())
-    if match:
-        return f"{match.group(1)}_{match.group(2)}_{match.group(3)}"
-    else:
-        return region.lower().replace("-", "_")
-
-
-def normalize_to_gcp_region(region: str) -> str:
-    """
-    Converts formats like 'us_east_1' or 'us-east-1' to standard GCP format like 'us-east1'.
-    
-    Examples:
-    - 'us_east_1' → 'us-east1'
-    - 'us-east-1' → 'us-east1'
-    """
-    if not region:
-        return ""
-    
-    region = region.lower().replace("_", "-")
-    match = re.match(r"([a-z]+)-([a-z]+)-(\d+)", region)
-    if match:
-        return f"{match.group(1)}-{match.group(2)}{match.group(3)}"
-    return region
-
-
-def get_on_demand_price(instance_type: str, region: str) -> dict:
-    print("Inside on demand region: ", region, " Instance type: ", instance_type)
-    region = normalize_to_gcp_region(region)
-
-    url = f"https://sparecores.com/server/gcp/{instance_type}?showDetails=true"
-    headers = {"User-Agent": "Mozilla/5.0"}
-
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, "html.parser")
-        table = soup.select_one("#availability > table")
-
-        if not table:
-            return {"error": "Could not find the pricing table on the page."}
-
-        rows = table.find_all("tr")
-
-        for row in rows:
-            cols = row.find_all("td")
-            if len(cols) >= 3:
-                region_cell = cols[0].text.strip()
-                if region in region_cell:
-                    on_demand_price = cols[2].text.strip()
-                    return {
-                        "instance_type": instance_type,
-                        "region": region,
-                        "on_demand_price": on_demand_price
-                    }
-
-        return {"error": f"No matching region '{region}' found for instance type '{instance_type}'."}
-
-    except Exception as e:
-        return {"error": str(e)}
-
-
-
-def get_carbon_emissions_per_hour(current_instance_type: str, current_region: str,
-                                   target_instance_type: str, target_region: str,
-                                   duration_hours: float = 24.0):
-
-    target_region = format_region_for_climatiq(target_region)
-    current_region = format_region_for_climatiq(current_region)
-
-    if not os.environ["CLIMATIQ_API_KEY"]:
-        raise ValueError("Please set the CLIMATIQ_API_KEY environment variable.")
-
-    # Define the API endpoint
-    endpoint = "https://api.climatiq.io/compute/v1/gcp/instance/batch"
-
-    # Prepare the payload for both instances
-    payload = [
-        {
-            "region": current_region,
-            "instance": current_instance_type,
-            "duration": duration_hours,
-            "duration_unit": "h"
-        },
-        {
-            "region": target_region,
-            "instance": target_instance_type,
-            "duration": duration_hours,
-            "duration_unit": "h"
-        }
-    ]
-
-    # Set up the headers with the API key
-    headers = {
-        "Authorization": "Bearer " + os.environ["CLIMATIQ_API_KEY"],
-        "Content-Type": "application/json"
-    }
-
-    # Send the POST request to the Climatiq API
-    response = requests.post(endpoint, json=payload, headers=headers)
-
-    # Raise an exception if the request was unsuccessful
-    if response.status_code != 200:
-        raise Exception(f"Climatiq API request failed with status code {response.status_code}: {response.text}")
-
-    # Parse the JSON response
-    results = response.json().get("results", [])
-
-    # print(results)
-
-    # Process the results for each instance
-    emissions_data = {}
-    instance_labels = [current_instance_type, target_instance_type]
-    for label, result in zip(instance_labels, results):
-        if "error" in result:
-            emissions_data[label] = {"error": result["error"]}
-            continue
-        
-        # print(result)
-
-        cpu_estimate = result.get("cpu_estimate", {}).get("co2e", 0.0)
-        memory_estimate = result.get("memory_estimate", {}).get("co2e", 0.0)
-        embodied_cpu_estimate = result.get("embodied_cpu_estimate", {}).get("co2e", 0.0)
-        total_emissions = result.get("total_co2e")
-
-        emissions_data[label] = {
-            "cpu_estimate": cpu_estimate,
-            "memory_estimate": memory_estimate,
-            "embodied_cpu_estimate": embodied_cpu_estimate,
-            "total_emissions": total_emissions
-        }
-
-    return emissions_data
-
-
+from . import async_tools
 
 impact_calculator_agent = Agent(
     name="impact_calculator_agent",
@@ -191,6 +48,10 @@ impact_calculator_agent = Agent(
     Compute:
     > **carbon_change_per_day = (target_total - current_total) × 24**
 
+    If the user wants to compare **many instances at once** (e.g., a whole fleet or several candidates), call
+    `estimate_carbon_emissions` once with a list of {"region", "instance", "duration_hours"} items instead of
+    calling `get_carbon_emissions_per_hour` repeatedly.
+
     ---
 
     ### FINAL RESPONSE
@@ -210,8 +71,9 @@ impact_calculator_agent = Agent(
 
     """,
     tools=[
-        get_on_demand_price,
-        get_carbon_emissions_per_hour,
+        async_tools.get_on_demand_price,
+        async_tools.get_carbon_emissions_per_hour,
+        async_tools.estimate_carbon_emissions,
         AgentTool(google_search)
     ]
 )
\ No newline at end of file
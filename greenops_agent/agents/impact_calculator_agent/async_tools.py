@@ -0,0 +1,158 @@
+"""
+Async versions of the impact calculator tools.
+
+All lookups go through the shared async HTTP client, and a semaphore bounds how many run at once. The
+current and target lookups, or any number of candidate pairs, are awaited together, so ADK can overlap
+them and one server process can serve many sessions without blocking threads on slow scrapes. The
+tools keep the names of their sync counterparts so prompts can reference them unchanged.
+"""
+
+import asyncio
+import weakref
+from greenops_agent.http_client import async_http_request
+from .climatiq_client import (
+    CLIMATIQ_BATCH_ENDPOINT, bulk_emission_keys, build_batch_payloads, climatiq_headers, map_bulk_emissions,
+    parse_emission_result
+)
+from .emission_factors import (
+    apply_emission_factors, emission_factor_key, get_cached_emission_factors, store_emission_factors
+)
+from .price_catalog import price_catalog
+from .regions import normalize_to_gcp_region
+from .tools import SPARECORES_URL, format_instance_emissions, lookup_local_price, parse_region_prices
+
+MAX_CONCURRENT_LOOKUPS = 8
+
+# Semaphores and tasks belong to one event loop, so both are kept per running loop
+_lookup_semaphores = weakref.WeakKeyDictionary()
+
+# Page loads in flight per loop and instance type, so concurrent lookups of the same type share one request
+_inflight_page_loads = weakref.WeakKeyDictionary()
+
+
+def get_lookup_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _lookup_semaphores:
+        _lookup_semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENT_LOOKUPS)
+    return _lookup_semaphores[loop]
+
+
+async def fetch_region_prices_async(instance_type: str):
+    async with get_lookup_semaphore():
+        response = await async_http_request(
+            "GET", SPARECORES_URL.format(instance_type=instance_type), headers={"User-Agent": "Mozilla/5.0"}, hedge=True
+        )
+        response.raise_for_status()
+
+    # Parsing is CPU bound, keep it off the event loop
+    region_prices = await asyncio.to_thread(parse_region_prices, response.text)
+    # put persists the catalog to disk, once per fetch whatever the number of waiters
+    await asyncio.to_thread(price_catalog.put, instance_type, region_prices)
+
+
+async def load_region_prices(instance_type: str):
+    inflight = _inflight_page_loads.setdefault(asyncio.get_running_loop(), {})
+    task = inflight.get(instance_type)
+    if task is None:
+        task = asyncio.ensure_future(fetch_region_prices_async(instance_type))
+        inflight[instance_type] = task
+        task.add_done_callback(lambda _: inflight.pop(instance_type, None))
+
+    await task
+
+
+async def get_on_demand_price(instance_type: str, region: str) -> dict:
+    """
+    Input: GCP instance type and region
+    Use: Returns the hourly on-demand price of the instance type in the region
+    Output: instance_type, region and on_demand_price, or an error
+    """
+    region = normalize_to_gcp_region(region)
+
+    try:
+        on_demand_price = lookup_local_price(instance_type, region)
+        if on_demand_price is None:
+            await load_region_prices(instance_type)
+            on_demand_price = price_catalog.lookup(instance_type, region)
+
+        return {
+            "instance_type": instance_type,
+            "region": region,
+            "on_demand_price": on_demand_price
+        }
+
+    except KeyError:
+        return {"error": f"No matching region '{region}' found for instance type '{instance_type}'."}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def get_on_demand_prices(pairs: list) -> list:
+    """
+    Looks up the price of many (instance_type, region) pairs concurrently. Results are in input order.
+    """
+    return await asyncio.gather(*(get_on_demand_price(instance_type, region) for instance_type, region in pairs))
+
+
+async def post_climatiq_batch_async(payload: list) -> list:
+    async with get_lookup_semaphore():
+        response = await async_http_request(
+            "POST", CLIMATIQ_BATCH_ENDPOINT, json=payload, headers=climatiq_headers(), idempotent=True
+        )
+
+    if response.status_code != 200:
+        raise Exception(f"Climatiq API request failed with status code {response.status_code}: {response.text}")
+
+    return response.json().get("results", [])
+
+
+async def get_bulk_carbon_emissions_async(items: list) -> list:
+    """
+    Async `get_bulk_carbon_emissions`: the batches of unique items are sent to Climatiq concurrently.
+    """
+    keys = bulk_emission_keys(items)
+    batches = build_batch_payloads(list(dict.fromkeys(keys)))
+    batch_results = await asyncio.gather(*(post_climatiq_batch_async(payload) for _, payload in batches))
+
+    emissions_by_key = {}
+    for (chunk, _), results in zip(batches, batch_results):
+        for key, result in zip(chunk, results):
+            emissions_by_key[key] = parse_emission_result(result)
+
+    return map_bulk_emissions(items, keys, emissions_by_key)
+
+
+async def estimate_carbon_emissions(items: list) -> list:
+    """
+    Input: List of {"region": <gcp region>, "instance": <instance type>, "duration_hours": <hours, default 24>}
+    Use: Estimates carbon emissions for many instances at once from the cached per-hour emission factors
+    Output: One emissions dict per input item, in the same order as the input
+    """
+    keys = list(dict.fromkeys(emission_factor_key(item["region"], item["instance"]) for item in items))
+
+    factors = get_cached_emission_factors(keys)
+    missing = [key for key in keys if key not in factors]
+    if missing:
+        results = await get_bulk_carbon_emissions_async([
+            {"region": region, "instance": instance, "duration_hours": 1.0}
+            for region, instance in missing
+        ])
+        factors.update(store_emission_factors(missing, results))
+
+    return apply_emission_factors(items, factors)
+
+
+async def get_carbon_emissions_per_hour(current_instance_type: str, current_region: str,
+                                        target_instance_type: str, target_region: str,
+                                        duration_hours: float = 24.0):
+    """
+    Input: Current and target instance types and regions, duration in hours (default 24)
+    Use: Estimates the carbon emissions of the current and the target instance over the duration
+    Output: cpu_estimate, memory_estimate, embodied_cpu_estimate and total_emissions per instance type
+    """
+    results = await estimate_carbon_emissions([
+        {"region": current_region, "instance": current_instance_type, "duration_hours": duration_hours},
+        {"region": target_region, "instance": target_instance_type, "duration_hours": duration_hours}
+    ])
+
+    return format_instance_emissions([current_instance_type, target_instance_type], results)
@@ -0,0 +1,107 @@
+import codecs
+from html.parser import HTMLParser
+
+
+class AvailabilityTableParser(HTMLParser):
+    """
+    Streaming parser for the availability table of a sparecores server page.
+
+    Consumes the page chunk by chunk without building a document tree. Every row of the first table
+    inside the element with id="availability" is collected, and `done` is set as soon as that table is
+    closed, or the element is closed without a table, so the caller can stop reading the rest of the page.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.region_prices = {}
+        self.found_table = False
+        self.done = False
+        # Tag of the availability element and how many tags of that name are open inside it, the scope
+        # ends with the end tag that brings the depth back to 0
+        self._scope_tag = None
+        self._scope_depth = 0
+        self._table_depth = 0
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+
+        if self._scope_tag is None:
+            if dict(attrs).get("id") == "availability":
+                self._scope_tag = tag
+                self._scope_depth = 1
+            return
+
+        if tag == self._scope_tag:
+            self._scope_depth += 1
+
+        if tag == "table":
+            self.found_table = True
+            self._table_depth += 1
+        elif self._table_depth == 1 and tag == "tr":
+            self._close_row()
+            self._row = []
+        elif self._table_depth == 1 and tag == "td" and self._row is not None:
+            self._close_cell()
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if self.done or self._scope_tag is None:
+            return
+
+        if tag == self._scope_tag:
+            self._scope_depth -= 1
+            if not self._scope_depth:
+                self._close_row()
+                self.done = True
+                return
+
+        if not self._table_depth:
+            return
+
+        if tag == "table":
+            self._table_depth -= 1
+            if not self._table_depth:
+                self._close_row()
+                self.done = True
+        elif self._table_depth == 1 and tag == "td":
+            self._close_cell()
+        elif self._table_depth == 1 and tag == "tr":
+            self._close_row()
+
+    def _close_cell(self):
+        if self._cell is not None:
+            self._row.append("".join(self._cell).strip())
+            self._cell = None
+
+    def _close_row(self):
+        # Cells and rows are also closed implicitly, like an HTML tree builder would
+        self._close_cell()
+        if self._row is not None and len(self._row) >= 3:
+            self.region_prices[self._row[0]] = self._row[2]
+        self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def parse_region_prices_stream(chunks) -> dict:
+    """
+    Parses {region_label: on_demand_price} from an iterable of HTML chunks (str or bytes), reading
+    only until the availability table has been closed.
+    """
+    parser = AvailabilityTableParser()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)
+        if parser.done:
+            break
+
+    if not parser.found_table or (not parser.done and not parser.region_prices):
+        raise ValueError("Could not find the pricing table on the page.")
+
+    return parser.region_prices
@@ -0,0 +1,107 @@
+import os
+from greenops_agent.http_client import http_post
+from .regions import format_region_for_climatiq
+
+CLIMATIQ_BATCH_ENDPOINT = "https://api.climatiq.io/compute/v1/gcp/instance/batch"
+
+# Maximum number of items the Climatiq batch endpoint accepts per request
+CLIMATIQ_BATCH_LIMIT = 100
+
+
+def parse_emission_result(result: dict) -> dict:
+    """
+    Extracts the CPU, memory, embodied and total CO2e estimates from one Climatiq batch result.
+    """
+    if "error" in result:
+        return {"error": result["error"]}
+
+    return {
+        "cpu_estimate": result.get("cpu_estimate", {}).get("co2e", 0.0),
+        "memory_estimate": result.get("memory_estimate", {}).get("co2e", 0.0),
+        "embodied_cpu_estimate": result.get("embodied_cpu_estimate", {}).get("co2e", 0.0),
+        "total_emissions": result.get("total_co2e")
+    }
+
+
+def climatiq_headers() -> dict:
+    if not os.environ["CLIMATIQ_API_KEY"]:
+        raise ValueError("Please set the CLIMATIQ_API_KEY environment variable.")
+
+    return {
+        "Authorization": "Bearer " + os.environ["CLIMATIQ_API_KEY"],
+        "Content-Type": "application/json"
+    }
+
+
+def build_batch_payloads(keys: list) -> list:
+    """
+    Splits unique (climatiq_region, instance, duration_hours) keys into batch payloads of at most
+    CLIMATIQ_BATCH_LIMIT items. Returns a list of (keys in chunk, payload).
+    """
+    batches = []
+    for start in range(0, len(keys), CLIMATIQ_BATCH_LIMIT):
+        chunk = keys[start:start + CLIMATIQ_BATCH_LIMIT]
+        payload = [
+            {
+                "region": region,
+                "instance": instance,
+                "duration": duration_hours,
+                "duration_unit": "h"
+            }
+            for region, instance, duration_hours in chunk
+        ]
+        batches.append((chunk, payload))
+    return batches
+
+
+def bulk_emission_keys(items: list) -> list:
+    return [
+        (format_region_for_climatiq(item["region"]), item["instance"], float(item.get("duration_hours", 24.0)))
+        for item in items
+    ]
+
+
+def map_bulk_emissions(items: list, keys: list, emissions_by_key: dict) -> list:
+    emissions = []
+    for item, key in zip(items, keys):
+        emissions.append({
+            "region": item["region"],
+            "instance": item["instance"],
+            "duration_hours": key[2],
+            **emissions_by_key.get(key, {"error": "No result returned by Climatiq"})
+        })
+
+    return emissions
+
+
+def post_climatiq_batch(payload: list) -> list:
+    """
+    Sends one batch (at most CLIMATIQ_BATCH_LIMIT items) to Climatiq and returns the raw results in order.
+    """
+    # Estimates have no side effects, so the POST is safe to retry
+    response = http_post(CLIMATIQ_BATCH_ENDPOINT, json=payload, headers=climatiq_headers(), idempotent=True)
+
+    if response.status_code != 200:
+        raise Exception(f"Climatiq API request failed with status code {response.status_code}: {response.text}")
+
+    return response.json().get("results", [])
+
+
+def get_bulk_carbon_emissions(items: list) -> list:
+    """
+    Input: List of {"region": <gcp region>, "instance": <instance type>, "duration_hours": <hours, default 24>}
+    Use: Estimates carbon emissions for many instances with as few Climatiq requests as possible.
+    Identical (region, instance, duration) items are sent once and the unique items are split into
+    chunks of CLIMATIQ_BATCH_LIMIT.
+    Output: One emissions dict per input item, in the same order as the input
+    """
+    keys = bulk_emission_keys(items)
+    unique_keys = list(dict.fromkeys(keys))
+
+    emissions_by_key = {}
+    for chunk, payload in build_batch_payloads(unique_keys):
+        results = post_climatiq_batch(payload)
+        for key, result in zip(chunk, results):
+            emissions_by_key[key] = parse_emission_result(result)
+
+    return map_bulk_emissions(items, keys, emissions_by_key)
@@ -0,0 +1,99 @@
+import os
+import threading
+from cachetools import TTLCache
+from .climatiq_client import get_bulk_carbon_emissions
+from .regions import format_region_for_climatiq
+
+EMISSION_FACTOR_CACHE_SIZE = int(os.environ.get("EMISSION_FACTOR_CACHE_SIZE", 4096))
+EMISSION_FACTOR_TTL_SECONDS = int(os.environ.get("EMISSION_FACTOR_TTL_SECONDS", 24 * 60 * 60))
+
+EMISSION_FIELDS = ["cpu_estimate", "memory_estimate", "embodied_cpu_estimate", "total_emissions"]
+
+# Per-hour CO2e factors keyed by (climatiq region, instance type), LRU evicted with a TTL
+_emission_factor_cache = TTLCache(maxsize=EMISSION_FACTOR_CACHE_SIZE, ttl=EMISSION_FACTOR_TTL_SECONDS)
+_emission_factor_lock = threading.Lock()
+
+
+def emission_factor_key(region: str, instance: str) -> tuple:
+    return (format_region_for_climatiq(region), instance)
+
+
+def get_cached_emission_factors(keys: list) -> dict:
+    with _emission_factor_lock:
+        return {key: _emission_factor_cache[key] for key in keys if key in _emission_factor_cache}
+
+
+def store_emission_factors(keys: list, results: list) -> dict:
+    """
+    Converts one-hour Climatiq results into factors and caches them. Errors are returned but never cached.
+    """
+    factors = {}
+    with _emission_factor_lock:
+        for key, result in zip(keys, results):
+            if "error" in result:
+                factors[key] = {"error": result["error"]}
+                continue
+
+            factors[key] = {field: result[field] for field in EMISSION_FIELDS}
+            _emission_factor_cache[key] = factors[key]
+
+    return factors
+
+
+def get_emission_factors(pairs: list) -> dict:
+    """
+    Returns the per-hour emission factors for every (region, instance_type) pair as
+    {(climatiq_region, instance_type): factors}. Only pairs missing from the cache are sent to Climatiq,
+    all of them in one bulk request for a duration of 1 hour.
+    """
+    keys = list(dict.fromkeys(emission_factor_key(region, instance) for region, instance in pairs))
+
+    factors = get_cached_emission_factors(keys)
+    missing = [key for key in keys if key not in factors]
+    if missing:
+        results = get_bulk_carbon_emissions([
+            {"region": region, "instance": instance, "duration_hours": 1.0}
+            for region, instance in missing
+        ])
+        factors.update(store_emission_factors(missing, results))
+
+    return factors
+
+
+def scale_emission_factors(factors: dict, duration_hours: float) -> dict:
+    """
+    Scales per-hour emission factors to the given duration. Climatiq estimates are linear in duration.
+    """
+    if "error" in factors:
+        return {"error": factors["error"]}
+
+    return {
+        field: (factors[field] * duration_hours if factors[field] is not None else None)
+        for field in EMISSION_FIELDS
+    }
+
+
+def estimate_carbon_emissions(items: list) -> list:
+    """
+    Input: List of {"region": <gcp region>, "instance": <instance type>, "duration_hours": <hours, default 24>}
+    Use: Estimates carbon emissions for many instances at once. Per-hour factors are cached per
+    (region, instance type) and scaled locally, so repeated or what-if durations never re-hit Climatiq.
+    Output: One emissions dict per input item, in the same order as the input
+    """
+    factors = get_emission_factors([(item["region"], item["instance"]) for item in items])
+    return apply_emission_factors(items, factors)
+
+
+def apply_emission_factors(items: list, factors: dict) -> list:
+    emissions = []
+    for item in items:
+        duration_hours = float(item.get("duration_hours", 24.0))
+        key = emission_factor_key(item["region"], item["instance"])
+        emissions.append({
+            "region": item["region"],
+            "instance": item["instance"],
+            "duration_hours": duration_hours,
+            **scale_emission_factors(factors[key], duration_hours)
+        })
+
+    return emissions
@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+import time
+from .regions import parse_region_id
+
+CACHE_DIR = os.environ.get("GREENOPS_CACHE_DIR", "cache/")
+PRICE_CATALOG_PATH = os.path.join(CACHE_DIR, "price_catalog.json")
+PRICE_CATALOG_TTL_SECONDS = int(os.environ.get("PRICE_CATALOG_TTL_SECONDS", 24 * 60 * 60))
+
+
+class PriceCatalog:
+    """
+    Region-wide on-demand price catalog keyed by instance type.
+
+    Every sparecores server page lists the price of the instance type in all regions,
+    so one page load fills the catalog for every region at once. Prices are keyed by the
+    region id parsed from the page's labels and looked up by equality, so `europe-west1`
+    never matches `europe-west10`. Entries expire after `ttl_seconds` and the catalog is
+    persisted to `path` so restarted workers stay warm.
+    """
+
+    def __init__(self, path=PRICE_CATALOG_PATH, ttl_seconds=PRICE_CATALOG_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+            # Catalogs written before the prices were keyed by region id still have the page labels
+            self._entries = {
+                instance_type: {**entry, "regions": self.by_region_id(entry["regions"])}
+                for instance_type, entry in entries.items()
+            }
+        except (OSError, ValueError, KeyError, AttributeError):
+            self._entries = {}
+
+    @staticmethod
+    def by_region_id(region_prices: dict) -> dict:
+        """
+        {region_label: price} → {region_id: price}. The first label of a region wins.
+        """
+        prices = {}
+        for region_label, price in region_prices.items():
+            prices.setdefault(parse_region_id(region_label), price)
+        return prices
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+    def get_regions(self, instance_type: str):
+        """
+        Returns {region_id: on_demand_price} for the instance type, or None if missing or expired.
+        """
+        entry = self._entries.get(instance_type)
+        if not entry or time.time() - entry["fetched_at"] > self.ttl_seconds:
+            return None
+        return entry["regions"]
+
+    def lookup(self, instance_type: str, region: str):
+        """
+        Returns the on-demand price for the region, None on a cache miss.
+        Raises KeyError when the instance type is cached but not offered in the region.
+        """
+        regions = self.get_regions(instance_type)
+        if regions is None:
+            return None
+
+        return regions[region]
+
+    def put(self, instance_type: str, regions: dict):
+        """
+        Stores the {region_label: on_demand_price} of a sparecores page for the instance type.
+        """
+        with self._lock:
+            self._entries[instance_type] = {
+                "fetched_at": time.time(),
+                "regions": self.by_region_id(regions)
+            }
+            try:
+                self._save()
+            except OSError as e:
+                print("Could not persist price catalog: ", e)
+
+
+price_catalog = PriceCatalog()
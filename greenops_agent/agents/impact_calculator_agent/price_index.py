@@ -0,0 +1,232 @@
+"""
+Offline on-demand price index for GCP instance types.
+
+Builds a compact on-disk hash table of (instance type, region) → hourly on-demand price from a bulk
+pricing dataset (the sparecores SQLite dump or a CSV file) and serves lookups from a memory-mapped
+copy of it, so a price lookup is a hash and a couple of slot reads with no network access.
+
+Build the index from this directory with:
+    python price_index.py sc-data-all.db
+    python price_index.py prices.csv --output cache/price_index.bin
+"""
+
+import argparse
+import csv
+import gzip
+import hashlib
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+
+try:
+    from .regions import normalize_to_gcp_region
+except ImportError:
+    # Running as a standalone build script
+    from regions import normalize_to_gcp_region
+
+CACHE_DIR = os.environ.get("GREENOPS_CACHE_DIR", "cache/")
+PRICE_INDEX_PATH = os.environ.get("PRICE_INDEX_PATH", os.path.join(CACHE_DIR, "price_index.bin"))
+
+INDEX_MAGIC = b"GOPI"
+INDEX_VERSION = 1
+HEADER = struct.Struct("<4sIQ")   # magic, version, slot count
+SLOT = struct.Struct("<Qd")       # key hash (0 = empty slot), hourly price
+
+SPARECORES_PRICE_QUERY = """
+    SELECT s.api_reference, r.api_reference, MIN(sp.price)
+    FROM server_price sp
+    JOIN server s ON s.vendor_id = sp.vendor_id AND s.server_id = sp.server_id
+    JOIN region r ON r.vendor_id = sp.vendor_id AND r.region_id = sp.region_id
+    WHERE sp.vendor_id = 'gcp' AND sp.allocation = 'ONDEMAND' AND sp.unit = 'HOUR'
+    GROUP BY s.api_reference, r.api_reference
+"""
+
+# Accepted header names for CSV price files
+CSV_INSTANCE_COLUMNS = ["instance_type", "server", "api_reference", "machine_type"]
+CSV_REGION_COLUMNS = ["region", "region_id", "location"]
+CSV_PRICE_COLUMNS = ["price", "on_demand_price", "hourly_price"]
+
+
+def hash_price_key(instance_type: str, region: str) -> int:
+    key = f"{instance_type.lower()}|{normalize_to_gcp_region(region)}".encode()
+    key_hash = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+    return key_hash or 1
+
+
+def read_sparecores_dump(path: str):
+    """
+    Yields (instance_type, region, hourly_price) for GCP on-demand prices in a sparecores SQLite dump.
+    """
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        for instance_type, region, price in connection.execute(SPARECORES_PRICE_QUERY):
+            if instance_type and region and price is not None:
+                yield instance_type, region, float(price)
+    finally:
+        connection.close()
+
+
+def read_price_csv(path: str):
+    """
+    Yields (instance_type, region, hourly_price) from a CSV (optionally gzipped) price file.
+    Rows with an `allocation` column other than ONDEMAND or a `vendor_id` other than gcp are skipped.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", newline="") as f:
+        reader = csv.DictReader(f)
+        fields = {name.lower(): name for name in reader.fieldnames or []}
+
+        def pick(candidates):
+            for candidate in candidates:
+                if candidate in fields:
+                    return fields[candidate]
+            raise ValueError(f"CSV file must contain one of the columns: {', '.join(candidates)}")
+
+        instance_column = pick(CSV_INSTANCE_COLUMNS)
+        region_column = pick(CSV_REGION_COLUMNS)
+        price_column = pick(CSV_PRICE_COLUMNS)
+
+        allocation_column = fields.get("allocation")
+        vendor_column = fields.get("vendor_id")
+
+        for row in reader:
+            if allocation_column and (row[allocation_column] or "").upper() != "ONDEMAND":
+                continue
+            if vendor_column and (row[vendor_column] or "").lower() != "gcp":
+                continue
+            try:
+                price = float(row[price_column].lstrip("$"))
+            except (TypeError, ValueError):
+                continue
+            yield row[instance_column], row[region_column], price
+
+
+def read_price_source(path: str):
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return read_sparecores_dump(path)
+    return read_price_csv(path)
+
+
+def build_price_index(source_path: str, index_path: str = PRICE_INDEX_PATH) -> int:
+    """
+    Builds the on-disk price index from a bulk pricing dataset. Returns the number of indexed prices.
+    When the same (instance type, region) appears more than once the lowest price is kept.
+    """
+    prices = {}
+    for instance_type, region, price in read_price_source(source_path):
+        key_hash = hash_price_key(instance_type, region)
+        prices[key_hash] = min(price, prices.get(key_hash, price))
+
+    # Power of two with a load factor of at most 0.5 keeps probe sequences short
+    slot_count = 1
+    while slot_count < 2 * max(len(prices), 1):
+        slot_count *= 2
+
+    table = bytearray(HEADER.size + slot_count * SLOT.size)
+    HEADER.pack_into(table, 0, INDEX_MAGIC, INDEX_VERSION, slot_count)
+    for key_hash, price in prices.items():
+        slot = key_hash & (slot_count - 1)
+        while SLOT.unpack_from(table, HEADER.size + slot * SLOT.size)[0]:
+            slot = (slot + 1) & (slot_count - 1)
+        SLOT.pack_into(table, HEADER.size + slot * SLOT.size, key_hash, price)
+
+    directory = os.path.dirname(index_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(table)
+    os.replace(tmp_path, index_path)
+
+    return len(prices)
+
+
+class PriceIndex:
+    """
+    Read-only, memory-mapped view of an index written by `build_price_index`.
+    """
+
+    def __init__(self, path: str = PRICE_INDEX_PATH):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < HEADER.size:
+            raise ValueError(f"{path} is truncated.")
+        magic, version, self.slot_count = HEADER.unpack_from(self._mmap, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"{path} is not a price index of version {INDEX_VERSION}.")
+        # A truncated or corrupt table would make lookups read past the end or probe forever
+        if self.slot_count & (self.slot_count - 1) or len(self._mmap) != HEADER.size + self.slot_count * SLOT.size:
+            raise ValueError(f"{path} is truncated or corrupt.")
+
+    def lookup(self, instance_type: str, region: str):
+        """
+        Returns the hourly on-demand price, or None if the index has no price for the pair.
+        """
+        key_hash = hash_price_key(instance_type, region)
+        slot = key_hash & (self.slot_count - 1)
+        while True:
+            slot_hash, price = SLOT.unpack_from(self._mmap, HEADER.size + slot * SLOT.size)
+            if slot_hash == key_hash:
+                return price
+            if slot_hash == 0:
+                return None
+            slot = (slot + 1) & (self.slot_count - 1)
+
+
+_price_index = None
+_price_index_stamp = None
+_price_index_lock = threading.Lock()
+
+
+def get_price_index():
+    """
+    Returns the shared price index, or None when no usable index has been built. The index is reopened
+    when the file is rebuilt (its mtime or size changes), an unreadable file is skipped until then.
+    """
+    global _price_index, _price_index_stamp
+
+    try:
+        stat = os.stat(PRICE_INDEX_PATH)
+    except OSError:
+        return None
+
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if stamp != _price_index_stamp:
+        with _price_index_lock:
+            if stamp != _price_index_stamp:
+                try:
+                    _price_index = PriceIndex(PRICE_INDEX_PATH)
+                except (OSError, ValueError, struct.error) as e:
+                    print("Could not open the price index, using live prices: ", e)
+                    _price_index = None
+                _price_index_stamp = stamp
+
+    return _price_index
+
+
+def lookup_indexed_price(instance_type: str, region: str):
+    """
+    Returns the hourly price from the offline index, or None when there is no usable index or no price.
+    """
+    price_index = get_price_index()
+    if price_index is None:
+        return None
+    try:
+        return price_index.lookup(instance_type, region)
+    except (OSError, ValueError, struct.error) as e:
+        print("Price index lookup failed, using live prices: ", e)
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline GCP on-demand price index.")
+    parser.add_argument("source", help="sparecores SQLite dump (.db) or CSV price file")
+    parser.add_argument("--output", default=PRICE_INDEX_PATH, help="Path of the index file to write")
+    args = parser.parse_args()
+
+    count = build_price_index(args.source, args.output)
+    print(f"Indexed {count} prices into {args.output}")
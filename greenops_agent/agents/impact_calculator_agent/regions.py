@@ -0,0 +1,44 @@
+import re
+
+def format_region_for_climatiq(region: str) -> str:
+    """
+    Converts 'us-central1' → 'us_central_1' (Climatiq format).
+    """
+    match = re.match(r"([a-z]+)-([a-z]+)(\d)", region.lower())
+    if match:
+        return f"{match.group(1)}_{match.group(2)}_{match.group(3)}"
+    else:
+        return region.lower().replace("-", "_")
+
+
+def normalize_to_gcp_region(region: str) -> str:
+    """
+    Converts formats like 'us_east_1' or 'us-east-1' to standard GCP format like 'us-east1'.
+    
+    Examples:
+    - 'us_east_1' → 'us-east1'
+    - 'us-east-1' → 'us-east1'
+    """
+    if not region:
+        return ""
+    
+    region = region.lower().replace("_", "-")
+    match = re.match(r"([a-z]+)-([a-z]+)-(\d+)", region)
+    if match:
+        return f"{match.group(1)}-{match.group(2)}{match.group(3)}"
+    return region
+
+
+GCP_REGION_PATTERN = re.compile(r"\b([a-z]+-[a-z]+\d+)\b")
+
+
+def parse_region_id(region_label: str) -> str:
+    """
+    Extracts the GCP region id from a sparecores availability label.
+
+    Examples:
+    - 'us-east1 (South Carolina)' → 'us-east1'
+    - 'europe-west10 (Berlin)' → 'europe-west10'
+    """
+    match = GCP_REGION_PATTERN.search(region_label.lower())
+    return match.group(1) if match else normalize_to_gcp_region(region_label.strip())
@@ -0,0 +1,121 @@
+import asyncio
+import re
+from typing import Optional
+from google.adk.tools import ToolContext
+from .async_tools import estimate_carbon_emissions, get_on_demand_prices
+
+HOURS_PER_MONTH = 24 * 30
+
+
+def parse_price(on_demand_price) -> float:
+    """
+    '$0.0670' → 0.067
+    """
+    if isinstance(on_demand_price, (int, float)):
+        return float(on_demand_price)
+
+    match = re.search(r"\d+(?:\.\d+)?", str(on_demand_price).replace(",", ""))
+    if not match:
+        raise ValueError(f"Could not parse price '{on_demand_price}'.")
+    return float(match.group())
+
+
+async def lookup_hourly_prices(pairs: list) -> dict:
+    """
+    Looks up the hourly on-demand price of every unique (instance_type, region) pair concurrently.
+    Returns {(instance_type, region): price or {"error": ...}}.
+    """
+    unique_pairs = list(dict.fromkeys(pairs))
+    results = await get_on_demand_prices(unique_pairs)
+
+    prices = {}
+    for pair, result in zip(unique_pairs, results):
+        if "error" in result:
+            prices[pair] = result
+            continue
+        try:
+            prices[pair] = parse_price(result["on_demand_price"])
+        except ValueError as e:
+            prices[pair] = {"error": str(e)}
+
+    return prices
+
+
+async def estimate_savings_for_candidates(candidates: list) -> list:
+    """
+    Computes monthly cost and carbon deltas for many (current type → target type) candidates.
+    Prices for every unique (type, region) are fetched concurrently, together with one bulk Climatiq
+    estimate for all hourly emissions.
+    """
+    price_pairs = []
+    emission_items = []
+    for candidate in candidates:
+        for instance_type in [candidate["current_instance_type"], candidate["target_instance_type"]]:
+            price_pairs.append((instance_type, candidate["region"]))
+            emission_items.append({"region": candidate["region"], "instance": instance_type, "duration_hours": 1.0})
+
+    prices, emissions = await asyncio.gather(
+        lookup_hourly_prices(price_pairs),
+        estimate_carbon_emissions(emission_items)
+    )
+
+    savings = []
+    for i, candidate in enumerate(candidates):
+        current_price = prices[(candidate["current_instance_type"], candidate["region"])]
+        target_price = prices[(candidate["target_instance_type"], candidate["region"])]
+        current_emissions, target_emissions = emissions[2 * i], emissions[2 * i + 1]
+
+        result = {
+            "instance_id": candidate.get("instance_id"),
+            "region": candidate["region"],
+            "current_instance_type": candidate["current_instance_type"],
+            "target_instance_type": candidate["target_instance_type"]
+        }
+
+        if isinstance(current_price, dict) or isinstance(target_price, dict):
+            result["cost_error"] = (current_price if isinstance(current_price, dict) else target_price)["error"]
+        else:
+            result["current_hourly_price"] = current_price
+            result["target_hourly_price"] = target_price
+            result["cost_savings_per_month"] = round((current_price - target_price) * HOURS_PER_MONTH, 2)
+
+        if "error" in current_emissions or "error" in target_emissions:
+            result["carbon_error"] = current_emissions.get("error") or target_emissions.get("error")
+        else:
+            result["current_hourly_emissions"] = current_emissions["total_emissions"]
+            result["target_hourly_emissions"] = target_emissions["total_emissions"]
+            result["carbon_savings_per_month"] = round(
+                (current_emissions["total_emissions"] - target_emissions["total_emissions"]) * HOURS_PER_MONTH, 3
+            )
+
+        savings.append(result)
+
+    return savings
+
+
+async def estimate_savings(tool_context: ToolContext, candidates: Optional[list[dict]] = None) -> dict:
+    """
+    Input: List of {"instance_id", "current_instance_type", "target_instance_type", "region"} candidates.
+    If omitted, the top candidates from the last `profile_fleet` call are used.
+    Use: Estimates monthly cost and carbon savings for all candidates in a single call
+    Output: Per candidate hourly prices, hourly emissions, cost_savings_per_month and carbon_savings_per_month
+    """
+    if not candidates:
+        candidates = [
+            candidate for candidate in tool_context.state.get("profiled_candidates", [])
+            if candidate.get("target_instance_type")
+        ]
+
+    if not candidates:
+        return {"status": "error", "error_message": "No candidates to estimate savings for."}
+
+    try:
+        savings = await estimate_savings_for_candidates(candidates)
+    except Exception as e:
+        return {"status": "error", "error_message": str(e)}
+
+    return {
+        "status": "success",
+        "row_count": len(savings),
+        "savings": savings
+    }
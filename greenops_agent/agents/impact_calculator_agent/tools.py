@@ -0,0 +1,121 @@
+from greenops_agent.http_client import http_get
+from .availability_parser import parse_region_prices_stream
+from .price_catalog import price_catalog
+from .price_index import lookup_indexed_price
+from .regions import normalize_to_gcp_region
+from .emission_factors import estimate_carbon_emissions
+
+SPARECORES_URL = "https://sparecores.com/server/gcp/{instance_type}?showDetails=true"
+
+# After the table, up to this much of the page is still read so the keep-alive connection goes back to the
+# pool. A longer remainder is cheaper to drop with the connection than to download.
+DRAIN_MAX_BYTES = 256 * 1024
+
+
+def fetch_region_prices(instance_type: str) -> dict:
+    """
+    Downloads the sparecores page of the instance type and returns the on-demand price of every region
+    listed in its availability table as {region_label: on_demand_price}.
+    """
+    url = SPARECORES_URL.format(instance_type=instance_type)
+    headers = {"User-Agent": "Mozilla/5.0"}
+
+    response = http_get(url, headers=headers, hedge=True, stream=True)
+    response.raise_for_status()
+
+    # Stop parsing as soon as the availability table has been read
+    with response:
+        chunks = response.iter_content(chunk_size=16 * 1024)
+        region_prices = parse_region_prices_stream(chunks)
+
+        drained = 0
+        for chunk in chunks:
+            drained += len(chunk)
+            if drained > DRAIN_MAX_BYTES:
+                break
+        return region_prices
+
+
+def parse_region_prices(html: str) -> dict:
+    """
+    Parses the availability table of a sparecores server page into {region_label: on_demand_price}.
+    """
+    return parse_region_prices_stream([html])
+
+
+def lookup_local_price(instance_type: str, region: str):
+    """
+    Looks the price up in the offline price index, then in the region-wide price catalog.
+    Returns None when neither has the instance type, raises KeyError when it is not offered in the region.
+    """
+    # The offline price index answers without any network access when it has been built
+    indexed_price = lookup_indexed_price(instance_type, region)
+    if indexed_price is not None:
+        return f"${indexed_price:.4f}"
+
+    return price_catalog.lookup(instance_type, region)
+
+
+def get_on_demand_price(instance_type: str, region: str) -> dict:
+    print("Inside on demand region: ", region, " Instance type: ", instance_type)
+    region = normalize_to_gcp_region(region)
+
+    try:
+        on_demand_price = lookup_local_price(instance_type, region)
+        if on_demand_price is None:
+            # A catalog miss loads the page once for all regions
+            price_catalog.put(instance_type, fetch_region_prices(instance_type))
+            on_demand_price = price_catalog.lookup(instance_type, region)
+
+        return {
+            "instance_type": instance_type,
+            "region": region,
+            "on_demand_price": on_demand_price
+        }
+
+    except KeyError:
+        return {"error": f"No matching region '{region}' found for instance type '{instance_type}'."}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+
+def get_carbon_emissions_per_hour(current_instance_type: str, current_region: str,
+                                   target_instance_type: str, target_region: str,
+                                   duration_hours: float = 24.0):
+
+    # Per-hour factors are cached, so only unseen instance types go out to Climatiq
+    results = estimate_carbon_emissions([
+        {
+            "region": current_region,
+            "instance": current_instance_type,
+            "duration_hours": duration_hours
+        },
+        {
+            "region": target_region,
+            "instance": target_instance_type,
+            "duration_hours": duration_hours
+        }
+    ])
+
+    return format_instance_emissions([current_instance_type, target_instance_type], results)
+
+
+def format_instance_emissions(instance_labels: list, results: list) -> dict:
+    """
+    Keys the emission estimates by instance type, the response shape of `get_carbon_emissions_per_hour`.
+    """
+    emissions_data = {}
+    for label, result in zip(instance_labels, results):
+        if "error" in result:
+            emissions_data[label] = {"error": result["error"]}
+            continue
+
+        emissions_data[label] = {
+            "cpu_estimate": result["cpu_estimate"],
+            "memory_estimate": result["memory_estimate"],
+            "embodied_cpu_estimate": result["embodied_cpu_estimate"],
+            "total_emissions": result["total_emissions"]
+        }
+
+    return emissions_data
@@ -1,30 +1,72 @@
 from google.adk.agents import LlmAgent
+from google.adk.tools import ToolContext
+from greenops_agent.bq_query_layer import query_arrow, to_records
+from .server_queries import (
+    DEFAULT_ACTIONABLE_LIMIT, build_actionable_query, build_excluded_summary_query, build_server_query,
+    profiler_rows, resolve_columns, server_query_parameters, threshold_query_parameters
+)
 from google.cloud import bigquery
+from typing import Optional
 import logging
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Instantiate BigQuery client
-bq_client = bigquery.Client()
+def fetch_servers(tool_context: ToolContext, region: Optional[str] = None, instance_type: Optional[str] = None,
+                  columns: Optional[list[str]] = None, actionable_only: bool = False,
+                  limit: int = DEFAULT_ACTIONABLE_LIMIT) -> dict:
+    """
+    Input: Optional Region (e.g. "us_west_1"), optional Instance_Type (e.g. "e2-standard-4"), optional list of columns,
+    actionable_only to return only underutilized or high-carbon servers, and their maximum count (default 100)
+    Use: Fetches the matching servers from server_metrics with a fixed parameterized query
+    Output: status, row_count and rows. With actionable_only, also excluded_summary describing the rows left out
+    """
+    try:
+        selected_columns = resolve_columns(columns)
+    except ValueError as e:
+        return {"status": "error", "error_message": str(e)}
 
-def execute_server_query(sql: str) -> dict:
-    """Executes a BigQuery SQL query"""
     try:
-        print(f"Executing SQL: {sql}")
-        query_job = bq_client.query(sql)
-        results = query_job.result()
-        data = [dict(row) for row in results]
+        parameters = server_query_parameters(region, instance_type)
+        if actionable_only:
+            sql = build_actionable_query(selected_columns)
+            parameters = parameters + threshold_query_parameters()
+            limit_parameter = bigquery.ScalarQueryParameter("limit", "INT64", max(1, int(limit)))
+        else:
+            sql = build_server_query(selected_columns)
+
+        data = to_records(query_arrow(
+            sql, parameters + [limit_parameter] if actionable_only else parameters,
+            tool_name="fetch_servers", state=tool_context.state
+        ))
+
+        excluded_summary = None
+        if actionable_only:
+            summary = to_records(query_arrow(
+                build_excluded_summary_query(), parameters, tool_name="fetch_servers", state=tool_context.state
+            ))[0]
+            summary["returned_rows"] = len(data)
+            summary["truncated_actionable_rows"] = summary["actionable_rows"] - len(data)
+            excluded_summary = summary
 
         if not data:
-            return {"status": "error", "error_message": "No matching records found"}
+            result = {"status": "error", "error_message": "No matching records found"}
+            if excluded_summary:
+                result["excluded_summary"] = excluded_summary
+            return result
+
+        # Compact rows for the profiler tools, so they never have to be passed back through the LLM
+        tool_context.state["infra_rows"] = profiler_rows(data)
 
-        return {
+        result = {
             "status": "success",
             "row_count": len(data),
             "rows": data
         }
+        if excluded_summary:
+            result["excluded_summary"] = excluded_summary
+        return result
     except Exception as e:
         logger.error(f"Query execution error: {e}")
         return {"status": "error", "error_message": str(e)}
@@ -39,35 +81,40 @@ infra_scout_agent = LlmAgent(
     `greenops-460813.gcp_server_details.server_metrics`.
 
     You must:
-    1. Extract only the **filters** (such as Region, Instance_Type) from the user query.
-    2. Ignore any intent like "optimize", "recommend", or "analyze". You do **not** provide interpretations or recommendations.
-    3. Generate a SQL query that returns all rows matching those filters (e.g., Region = 'us_west_1').
-    4. Call the `execute_server_query` tool with the generated SQL.
-    5. Assign the tool result directly to `infra_data` and RETURN that as the final answer.
+    1. Extract only the **filters** (Region, Instance_Type) from the user query.
+    2. Do **not** provide interpretations or recommendations. An intent like "optimize", "recommend", or "analyze"
+       only decides whether to pass `actionable_only=True` (see below).
+    3. Call the `fetch_servers` tool with those filters. Do NOT write SQL.
+    4. Assign the tool result directly to `infra_data` and RETURN that as the final answer.
 
     Important rules:
-    - If the user query mentions a region (e.g., "us_west_1"), filter the SQL by Region.
-    - If the user doesn't provide filters, return all rows.
+    - If the user query mentions a region (e.g., "us_west_1"), pass it as `region`.
+    - If the user query mentions an instance type (e.g., "e2-standard-4"), pass it as `instance_type`.
+    - If the user doesn't provide filters, call `fetch_servers` without arguments to return all rows.
+    - If the user asks to optimize, rightsize or reduce cost/carbon, pass `actionable_only=True` so only
+      underutilized or high-carbon servers are returned, together with an `excluded_summary` of the rest.
+    - Only pass `columns` when the user explicitly asks for other metrics (e.g. Disk_IOPS, Network_IOPS);
+      they are added to the default columns, which the downstream analysis always needs.
 
     Example:
     User: "Give me server data for us_west_1"
-    → You generate:
-    SELECT Instance_ID, Average_CPU_Utilization, Instance_Type, Memory_Utilization, Region, Total_Carbon_Emission_in_kg 
-    FROM `greenops-460813.gcp_server_details.server_metrics` 
-    WHERE Region = 'us_west_1'
+    → You call: fetch_servers(region="us_west_1")
+
+    User: "Optimize my servers in us_west_1"
+    → You call: fetch_servers(region="us_west_1", actionable_only=True)
 
-    - Don't just return the query — execute the query using the `execute_server_query` tool
     - Wrap the final output like this:
 
     {
         "infra_data": {
             "status": "success",
             "row_count": X,
-            "rows": [ ... ]
+            "rows": [ ... ],
+            "excluded_summary": { ... }  (only when actionable_only was used)
         }
     }
     """,
-    tools=[execute_server_query],
+    tools=[fetch_servers],
     output_key="infra_data"
 )
 
@@ -0,0 +1,141 @@
+"""
+Fixed, parameterized queries against `server_metrics`.
+
+The agent only extracts filters and the tool maps them to one of these queries, so the same question
+always produces the same SQL text and both BigQuery's result cache and the local query cache hit.
+
+In actionable mode the workload profiler's thresholds, the ordering and the LIMIT are pushed down into
+BigQuery, so only rows the profiler would flag leave the warehouse, plus a one-row summary of the rest.
+"""
+
+from decimal import Decimal
+from numbers import Number
+
+from google.cloud import bigquery
+from ...thresholds import (
+    CPU_UNDERUTILIZATION_THRESHOLD, HIGH_CARBON_THRESHOLD_KG, MAX_FLAGGED_INSTANCES, MEMORY_UNDERUTILIZATION_THRESHOLD
+)
+
+SERVER_METRICS_TABLE = "greenops-460813.gcp_server_details.server_metrics"
+
+# All columns of server_metrics, in table order. Projections are always emitted in this order.
+SERVER_COLUMNS = [
+    "Instance_ID",
+    "Instance_Type",
+    "Region",
+    "Average_CPU_Utilization",
+    "Memory_Utilization",
+    "Disk_IOPS",
+    "Network_IOPS",
+    "Total_Carbon_Emission_in_kg",
+]
+
+DEFAULT_ACTIONABLE_LIMIT = MAX_FLAGGED_INSTANCES
+
+SERVER_FILTER = (
+    "(@region IS NULL OR Region = @region) "
+    "AND (@instance_type IS NULL OR Instance_Type = @instance_type)"
+)
+
+# Same rule as the workload profiler: any of the three thresholds flags the instance
+ACTIONABLE_FILTER = (
+    "(Average_CPU_Utilization < @cpu_threshold "
+    "OR Memory_Utilization < @memory_threshold "
+    "OR Total_Carbon_Emission_in_kg > @carbon_threshold)"
+)
+
+# Columns the workload profiler and the rightsizing tools read from every fetched row
+REQUIRED_SERVER_COLUMNS = [
+    "Instance_ID",
+    "Instance_Type",
+    "Region",
+    "Average_CPU_Utilization",
+    "Memory_Utilization",
+    "Total_Carbon_Emission_in_kg",
+]
+
+DEFAULT_SERVER_COLUMNS = REQUIRED_SERVER_COLUMNS
+
+
+def resolve_columns(columns: list = None) -> list:
+    """
+    Returns the requested columns in canonical order, always including the required columns, so custom
+    columns can only add to what the profiler needs.
+    Raises ValueError for columns that are not in server_metrics.
+    """
+    if not columns:
+        return DEFAULT_SERVER_COLUMNS
+
+    by_lower_name = {column.lower(): column for column in SERVER_COLUMNS}
+    unknown = [column for column in columns if column.lower() not in by_lower_name]
+    if unknown:
+        raise ValueError(f"Unknown columns {unknown}. Available columns: {SERVER_COLUMNS}")
+
+    requested = {by_lower_name[column.lower()] for column in columns} | set(REQUIRED_SERVER_COLUMNS)
+    return [column for column in SERVER_COLUMNS if column in requested]
+
+
+def build_server_query(columns: list) -> str:
+    return f"SELECT {', '.join(columns)} FROM `{SERVER_METRICS_TABLE}` WHERE {SERVER_FILTER} ORDER BY Instance_ID"
+
+
+def build_actionable_query(columns: list) -> str:
+    # Highest emitters first, the profiler ranks by carbon times the capacity a rightsizing frees
+    return (
+        f"SELECT {', '.join(columns)} FROM `{SERVER_METRICS_TABLE}` "
+        f"WHERE {SERVER_FILTER} AND {ACTIONABLE_FILTER} "
+        "ORDER BY Total_Carbon_Emission_in_kg DESC, Instance_ID "
+        "LIMIT @limit"
+    )
+
+
+def build_excluded_summary_query() -> str:
+    return f"""
+    WITH servers AS (
+        SELECT *, {ACTIONABLE_FILTER} AS actionable
+        FROM `{SERVER_METRICS_TABLE}`
+        WHERE {SERVER_FILTER}
+    )
+    SELECT
+        COUNT(*) AS total_rows,
+        COUNTIF(actionable) AS actionable_rows,
+        COUNTIF(Average_CPU_Utilization < @cpu_threshold) AS cpu_underutilized,
+        COUNTIF(Memory_Utilization < @memory_threshold) AS memory_underutilized,
+        COUNTIF(Total_Carbon_Emission_in_kg > @carbon_threshold) AS high_carbon,
+        COUNTIF(actionable IS NOT TRUE) AS excluded_rows,
+        ROUND(AVG(IF(actionable IS NOT TRUE, Average_CPU_Utilization, NULL)), 2) AS excluded_avg_cpu_utilization,
+        ROUND(AVG(IF(actionable IS NOT TRUE, Memory_Utilization, NULL)), 2) AS excluded_avg_memory_utilization,
+        ROUND(SUM(IF(actionable IS NOT TRUE, Total_Carbon_Emission_in_kg, NULL)), 3) AS excluded_total_carbon_kg
+    FROM servers
+    """
+
+
+def server_query_parameters(region: str = None, instance_type: str = None) -> list:
+    return [
+        bigquery.ScalarQueryParameter("region", "STRING", region or None),
+        bigquery.ScalarQueryParameter("instance_type", "STRING", instance_type or None),
+    ]
+
+
+def threshold_query_parameters() -> list:
+    return [
+        bigquery.ScalarQueryParameter("cpu_threshold", "FLOAT64", CPU_UNDERUTILIZATION_THRESHOLD),
+        bigquery.ScalarQueryParameter("memory_threshold", "FLOAT64", MEMORY_UNDERUTILIZATION_THRESHOLD),
+        bigquery.ScalarQueryParameter("carbon_threshold", "FLOAT64", HIGH_CARBON_THRESHOLD_KG),
+    ]
+
+
+def json_safe(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (Decimal, Number)):
+        return float(value)
+    return str(value)
+
+
+def profiler_rows(rows: list) -> list:
+    """
+    Projects fetched rows onto the columns the profiler tools read, with JSON-safe values, so they can
+    be kept in the session state.
+    """
+    return [{column: json_safe(row.get(column)) for column in REQUIRED_SERVER_COLUMNS} for row in rows]
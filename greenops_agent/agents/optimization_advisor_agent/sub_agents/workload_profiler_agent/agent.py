@@ -1,5 +1,8 @@
 from google.adk.agents import LlmAgent
-from greenops_agent.agents.impact_calculator_agent.agent import get_on_demand_price, get_carbon_emissions_per_hour
+from greenops_agent.agents.impact_calculator_agent.async_tools import get_on_demand_price, get_carbon_emissions_per_hour
+from greenops_agent.agents.impact_calculator_agent.savings import estimate_savings
+from .rightsizing import get_rightsizing_candidates
+from .fleet_profiler import profile_fleet
 
 workload_profiler_agent = LlmAgent(
     name="workload_profiler",
@@ -32,24 +35,31 @@ workload_profiler_agent = LlmAgent(
     - **Current Instance Type**: `<e.g., n1-standard-8>`
     - **Recommendation**: Always recommend a specific target instance (never leave it blank).
         - Choose a smaller instance if CPU < 30% or Memory < 40%.
-        - If unsure, estimate using a 50% downsizing rule (e.g., n1-standard-8 → n1-standard-4).
+        - Use the `target_instance_type` returned by `profile_fleet()` for that instance. For alternatives, use the ranked `candidates` from `get_rightsizing_candidates()`.
+        - If the instance has no target type, do not invent one for it.
         - Never repeat the current instance as the recommendation.
         - Clearly explain your reasoning for the downgrade (e.g., “only 17% CPU usage, so a smaller instance will suffice”).
 
     
     - **Potential Savings**:
-    - **Cost Savings/Month**: Use `get_on_demand_price()` for both instances and compute `(current_hourly - target_hourly) * 24 * 30`
-    - **Carbon Savings/Month**: Use `get_carbon_emissions_per_hour()` and compute `(current_total - target_total) * 24 * 30`
+    - **Cost Savings/Month**: `cost_savings_per_month` returned by `estimate_savings()`
+    - **Carbon Savings/Month**: `carbon_savings_per_month` returned by `estimate_savings()`
 
     ---
 
     🔁 Process:
-    - Loop through each row in `{infra_data}`
-    - Check utilization and carbon thresholds
+    - Call `profile_fleet()` ONCE. It checks the utilization and carbon thresholds for every row of the fleet
+      and returns the flagged instances, their reasons and `top_candidates` ranked by potential savings
+    - Do NOT loop through `{infra_data}` yourself; work only from the `top_candidates` returned by the tool
+    - If `{infra_data}` has an `excluded_summary`, the servers left out were already checked in BigQuery and are
+      within all thresholds; use the summary only to report how many servers were checked in total
+    - Call `get_rightsizing_candidates()` only if you need alternative target types
     - You must provide both:
         - A target instance type
         - A target region (same as current unless specified)
-    - If actionable, invoke both tools:
+    - Call `estimate_savings()` ONCE for all actionable candidates. Without arguments it uses the `top_candidates`
+      from `profile_fleet()`; otherwise pass a list of {"instance_id", "current_instance_type", "target_instance_type", "region"}
+    - Only if `estimate_savings()` fails, fall back to the single-instance tools:
     - `get_on_demand_price(current_instance_type, region)` (Always make sure to pass the region)
     - `get_carbon_emissions_per_hour(current_instance_type, region, target_instance_type, region)`
     - Use the returned data for concrete recommendations
@@ -71,5 +81,5 @@ workload_profiler_agent = LlmAgent(
     You are a professional GCP infra analyst—be specific, justified, and useful in all recommendations.
     """,
     output_key="analysis_results",
-    tools=[get_on_demand_price, get_carbon_emissions_per_hour]
+    tools=[profile_fleet, get_rightsizing_candidates, estimate_savings, get_on_demand_price, get_carbon_emissions_per_hour]
 )
@@ -0,0 +1,111 @@
+import heapq
+import numpy as np
+import pandas as pd
+from google.adk.tools import ToolContext
+from ...thresholds import (
+    CPU_UNDERUTILIZATION_THRESHOLD, HIGH_CARBON_THRESHOLD_KG, MAX_FLAGGED_INSTANCES, MEMORY_UNDERUTILIZATION_THRESHOLD
+)
+from .rightsizing import rank_rightsizing_candidates
+
+# server_metrics / server_metrics_timeseries column names → profiler column names
+COLUMN_ALIASES = {
+    "Instance_ID": "instance_id",
+    "Instance_Type": "instance_type",
+    "Region": "region",
+    "Average_CPU_Utilization": "cpu_util",
+    "average_cpu_utilization": "cpu_util",
+    "Memory_Utilization": "memory_util",
+    "average_memory_utilization": "memory_util",
+    "Total_Carbon_Emission_in_kg": "total_carbon",
+    "total_carbon_emission_kg": "total_carbon",
+}
+
+
+def load_fleet_frame(rows: list) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(rows).rename(columns=COLUMN_ALIASES)
+    for column in ["cpu_util", "memory_util", "total_carbon"]:
+        df[column] = pd.to_numeric(df[column], errors="coerce") if column in df else np.nan
+    return df
+
+
+def profile_fleet_rows(rows: list, top_k: int = 10) -> dict:
+    """
+    Applies the underutilization and carbon thresholds to the whole fleet at once and ranks the flagged
+    instances by potential carbon savings: the instance's emissions times the share of capacity freed by
+    its best rightsizing candidate. Only the top K survive the heap, so the ranking stays bounded in memory.
+    """
+    df = load_fleet_frame(rows)
+
+    cpu_low = (df["cpu_util"] < CPU_UNDERUTILIZATION_THRESHOLD).to_numpy()
+    memory_low = (df["memory_util"] < MEMORY_UNDERUTILIZATION_THRESHOLD).to_numpy()
+    high_carbon = (df["total_carbon"] > HIGH_CARBON_THRESHOLD_KG).to_numpy()
+    flagged = cpu_low | memory_low | high_carbon
+
+    reasons = pd.Series("", index=df.index)
+    reasons = reasons.where(~cpu_low, reasons + "CPU underutilized at " + df["cpu_util"].round(1).astype(str) + "%; ")
+    reasons = reasons.where(~memory_low, reasons + "Memory underutilized at " + df["memory_util"].round(1).astype(str) + "%; ")
+    reasons = reasons.where(~high_carbon, reasons + "High carbon emitter at " + df["total_carbon"].round(3).astype(str) + " kg/day; ")
+    reasons = reasons.str.rstrip("; ")
+
+    flagged_df = df[flagged].assign(reasons=reasons[flagged])
+    flagged_rows = [rows[i] for i in np.flatnonzero(flagged)]
+    best_targets = rank_rightsizing_candidates(flagged_rows, max_candidates=1) if flagged_rows else []
+
+    def ranked_entries():
+        for record, target in zip(flagged_df.itertuples(index=False), best_targets):
+            candidate = target["candidates"][0] if target["candidates"] else None
+            carbon = 0.0 if pd.isna(record.total_carbon) else float(record.total_carbon)
+            savings_score = carbon * (1 - candidate["capacity_ratio"]) if candidate else 0.0
+            yield savings_score, record, candidate
+
+    top = heapq.nlargest(top_k, ranked_entries(), key=lambda entry: entry[0])
+
+    return {
+        "status": "success",
+        "row_count": len(df),
+        "flagged_count": int(flagged.sum()),
+        "flagged_by_reason": {
+            "cpu_underutilized": int(cpu_low.sum()),
+            "memory_underutilized": int(memory_low.sum()),
+            "high_carbon": int(high_carbon.sum())
+        },
+        "flagged_instances": [
+            {"instance_id": instance_id, "reasons": instance_reasons}
+            for instance_id, instance_reasons in zip(
+                flagged_df["instance_id"][:MAX_FLAGGED_INSTANCES], flagged_df["reasons"][:MAX_FLAGGED_INSTANCES]
+            )
+        ],
+        "flagged_truncated": len(flagged_df) > MAX_FLAGGED_INSTANCES,
+        "top_candidates": [
+            {
+                "instance_id": record.instance_id,
+                "region": record.region,
+                "current_instance_type": record.instance_type,
+                "cpu_util": None if pd.isna(record.cpu_util) else float(record.cpu_util),
+                "memory_util": None if pd.isna(record.memory_util) else float(record.memory_util),
+                "total_carbon_kg": None if pd.isna(record.total_carbon) else float(record.total_carbon),
+                "reasons": record.reasons,
+                "target_instance_type": candidate["instance_type"] if candidate else None,
+                "estimated_carbon_savings_kg": round(savings_score, 3)
+            }
+            for savings_score, record, candidate in top
+        ]
+    }
+
+
+def profile_fleet(tool_context: ToolContext, top_k: int = 10) -> dict:
+    """
+    Input: Number of top candidates to return (default 10)
+    Use: Profiles every instance fetched by the infra scout in this session against the thresholds
+    (CPU < 30%, Memory < 40%, Carbon > 1 kg/day) in one vectorized pass.
+    Output:
+    - flagged instance count per reason and the flagged instances with their reasons
+    - top_candidates: top K flagged instances ranked by potential carbon savings, with the best valid target type
+    """
+    rows = tool_context.state.get("infra_rows")
+    if not rows:
+        return {"status": "error", "error_message": "No infrastructure data found. Fetch server data first."}
+
+    result = profile_fleet_rows(rows, top_k)
+    tool_context.state["profiled_candidates"] = result["top_candidates"]
+    return result
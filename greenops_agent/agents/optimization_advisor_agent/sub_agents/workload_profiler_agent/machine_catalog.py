@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+from google.cloud import compute_v1
+
+# PROJECT_ID = os.environ["GOOGLE_CLOUD_PROJECT"]
+PROJECT_ID = "greenops-460813"
+
+CACHE_DIR = os.environ.get("GREENOPS_CACHE_DIR", "cache/")
+MACHINE_CATALOG_PATH = os.path.join(CACHE_DIR, "machine_catalog.json")
+MACHINE_CATALOG_TTL_SECONDS = int(os.environ.get("MACHINE_CATALOG_TTL_SECONDS", 7 * 24 * 60 * 60))
+
+# Fallback specs used when the Compute Engine API is not reachable:
+# (series, class) → (vCPU counts, memory GB per vCPU)
+STATIC_MACHINE_SPECS = {
+    ("e2", "standard"): ([2, 4, 8, 16, 32], 4),
+    ("e2", "highmem"): ([2, 4, 8, 16], 8),
+    ("e2", "highcpu"): ([2, 4, 8, 16, 32], 1),
+    ("n1", "standard"): ([1, 2, 4, 8, 16, 32, 64, 96], 3.75),
+    ("n1", "highmem"): ([2, 4, 8, 16, 32, 64, 96], 6.5),
+    ("n1", "highcpu"): ([2, 4, 8, 16, 32, 64, 96], 0.9),
+    ("n2", "standard"): ([2, 4, 8, 16, 32, 48, 64, 80, 96, 128], 4),
+    ("n2", "highmem"): ([2, 4, 8, 16, 32, 48, 64, 80, 96, 128], 8),
+    ("n2", "highcpu"): ([2, 4, 8, 16, 32, 48, 64, 80, 96], 1),
+    ("n2d", "standard"): ([2, 4, 8, 16, 32, 48, 64, 80, 96, 128, 224], 4),
+    ("n2d", "highmem"): ([2, 4, 8, 16, 32, 48, 64, 80, 96], 8),
+    ("n2d", "highcpu"): ([2, 4, 8, 16, 32, 48, 64, 80, 96, 128, 224], 1),
+    ("n4", "standard"): ([2, 4, 8, 16, 32, 48, 64, 80], 4),
+    ("n4", "highmem"): ([2, 4, 8, 16, 32, 48, 64, 80], 8),
+    ("n4", "highcpu"): ([2, 4, 8, 16, 32, 48, 64, 80], 2),
+    ("c2", "standard"): ([4, 8, 16, 30, 60], 4),
+    ("c2d", "standard"): ([2, 4, 8, 16, 32, 56, 112], 4),
+    ("c2d", "highmem"): ([2, 4, 8, 16, 32, 56, 112], 8),
+    ("c2d", "highcpu"): ([2, 4, 8, 16, 32, 56, 112], 2),
+    ("c3", "standard"): ([4, 8, 22, 44, 88, 176], 4),
+    ("c3", "highmem"): ([4, 8, 22, 44, 88, 176], 8),
+    ("c3", "highcpu"): ([4, 8, 22, 44, 88, 176], 2),
+    ("t2d", "standard"): ([1, 2, 4, 8, 16, 32, 48, 60], 4),
+}
+
+STATIC_SHARED_CORE_SPECS = [
+    ("e2-micro", 2, 1),
+    ("e2-small", 2, 2),
+    ("e2-medium", 2, 4),
+]
+
+
+def get_machine_family(machine_type: str) -> str:
+    """
+    'n2-standard-8' → 'n2'
+    """
+    return machine_type.split("-")[0]
+
+
+def static_machine_types() -> list:
+    machine_types = [
+        {"name": name, "vcpus": vcpus, "memory_gb": memory_gb, "regions": []}
+        for name, vcpus, memory_gb in STATIC_SHARED_CORE_SPECS
+    ]
+    for (series, machine_class), (vcpu_counts, memory_per_vcpu) in STATIC_MACHINE_SPECS.items():
+        for vcpus in vcpu_counts:
+            machine_types.append({
+                "name": f"{series}-{machine_class}-{vcpus}",
+                "vcpus": vcpus,
+                "memory_gb": vcpus * memory_per_vcpu,
+                "regions": []
+            })
+    return machine_types
+
+
+def fetch_machine_types(project_id: str = PROJECT_ID) -> list:
+    """
+    Lists every machine type of the project with the regions it is offered in, using the Compute Engine API.
+    """
+    client = compute_v1.MachineTypesClient()
+    machine_types = {}
+
+    for zone, response in client.aggregated_list(request=compute_v1.AggregatedListMachineTypesRequest(project=project_id)):
+        region = zone.split("/")[-1].rsplit("-", 1)[0]
+        for machine_type in response.machine_types or []:
+            entry = machine_types.setdefault(machine_type.name, {
+                "name": machine_type.name,
+                "vcpus": machine_type.guest_cpus,
+                "memory_gb": machine_type.memory_mb / 1024,
+                "regions": set()
+            })
+            entry["regions"].add(region)
+
+    return [{**entry, "regions": sorted(entry["regions"])} for entry in machine_types.values()]
+
+
+class MachineCatalog:
+    """
+    Array-backed GCP machine type catalog.
+
+    Specs are stored column-wise in NumPy arrays (one element per machine type) and availability as a
+    boolean (region × machine type) matrix, so the rightsizing engine can filter the whole catalog for
+    many instances with a few vectorized comparisons. A catalog without regions is treated as
+    available everywhere.
+    """
+
+    def __init__(self, machine_types: list):
+        self.names = np.array([machine_type["name"] for machine_type in machine_types])
+        self.family_names = sorted({get_machine_family(name) for name in self.names})
+        self.family_index = {family: code for code, family in enumerate(self.family_names)}
+
+        self.families = np.array([self.family_index[get_machine_family(name)] for name in self.names], dtype=np.int16)
+        self.vcpus = np.array([machine_type["vcpus"] for machine_type in machine_types], dtype=np.float32)
+        self.memory_gb = np.array([machine_type["memory_gb"] for machine_type in machine_types], dtype=np.float32)
+
+        self.type_index = {name: i for i, name in enumerate(self.names)}
+        self.region_names = sorted({region for machine_type in machine_types for region in machine_type["regions"]})
+        self.region_index = {region: i for i, region in enumerate(self.region_names)}
+
+        self.availability = np.zeros((len(self.region_names), len(self.names)), dtype=bool)
+        for i, machine_type in enumerate(machine_types):
+            for region in machine_type["regions"]:
+                self.availability[self.region_index[region], i] = True
+
+    def available_in(self, region_indices: np.ndarray) -> np.ndarray:
+        """
+        Returns a (len(region_indices) × machine type) availability mask. Regions unknown to the
+        catalog (index -1) are treated as offering every machine type.
+        """
+        if not self.region_names:
+            return np.ones((len(region_indices), len(self.names)), dtype=bool)
+
+        mask = self.availability[np.maximum(region_indices, 0)]
+        mask[region_indices < 0] = True
+        return mask
+
+
+_machine_catalog = None
+_machine_catalog_lock = threading.Lock()
+
+
+def load_machine_catalog() -> MachineCatalog:
+    """
+    Loads the catalog from the local cache, refreshing it from the Compute Engine API when it is
+    missing or older than MACHINE_CATALOG_TTL_SECONDS. Falls back to the static specs.
+    """
+    if os.path.exists(MACHINE_CATALOG_PATH) and time.time() - os.path.getmtime(MACHINE_CATALOG_PATH) < MACHINE_CATALOG_TTL_SECONDS:
+        try:
+            with open(MACHINE_CATALOG_PATH) as f:
+                return MachineCatalog(json.load(f))
+        except (OSError, ValueError, KeyError):
+            pass
+
+    try:
+        machine_types = fetch_machine_types()
+    except Exception as e:
+        print("Could not list machine types, using static specs: ", e)
+        return MachineCatalog(static_machine_types())
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(MACHINE_CATALOG_PATH, "w") as f:
+            json.dump(machine_types, f)
+    except OSError as e:
+        print("Could not persist machine catalog: ", e)
+
+    return MachineCatalog(machine_types)
+
+
+def get_machine_catalog() -> MachineCatalog:
+    """
+    Returns the shared machine catalog, loading it once per process.
+    """
+    global _machine_catalog
+
+    if _machine_catalog is None:
+        with _machine_catalog_lock:
+            if _machine_catalog is None:
+                _machine_catalog = load_machine_catalog()
+
+    return _machine_catalog
@@ -0,0 +1,120 @@
+import numpy as np
+from google.adk.tools import ToolContext
+from greenops_agent.agents.impact_calculator_agent.regions import normalize_to_gcp_region
+from .machine_catalog import get_machine_catalog, get_machine_family
+
+# Utilization the target instance should run at after rightsizing (percent)
+TARGET_CPU_UTILIZATION = 60.0
+TARGET_MEMORY_UTILIZATION = 70.0
+
+# Rows are matched against the whole catalog in chunks to bound the size of the (rows × types) masks
+RIGHTSIZING_CHUNK_SIZE = 2048
+
+
+def row_value(row: dict, *names, default=None):
+    """
+    Reads a column from a server_metrics (Instance_ID) or server_metrics_timeseries (instance_id) row.
+    """
+    for name in names:
+        if row.get(name) is not None:
+            return row[name]
+    return default
+
+
+def rank_rightsizing_candidates(rows: list, max_candidates: int = 3) -> list:
+    """
+    Finds smaller machine types of the same family for every row in one vectorized pass over the
+    machine catalog. A candidate must be offered in the instance's region, be smaller than the current
+    type in vCPU or memory and keep the observed load under the target utilization. Candidates are ranked
+    by remaining capacity relative to the current type, smallest (largest savings) first.
+    """
+    if not rows:
+        return []
+
+    catalog = get_machine_catalog()
+
+    instance_types = [row_value(row, "Instance_Type", "instance_type", default="") for row in rows]
+    current = np.array([catalog.type_index.get(instance_type, -1) for instance_type in instance_types], dtype=np.intp)
+    families = np.array([catalog.family_index.get(get_machine_family(instance_type), -1) for instance_type in instance_types])
+    regions = np.array([
+        catalog.region_index.get(normalize_to_gcp_region(row_value(row, "Region", "region", default="")), -1)
+        for row in rows
+    ], dtype=np.intp)
+    cpu_util = np.array([row_value(row, "Average_CPU_Utilization", "average_cpu_utilization", "cpu_util", default=100.0) for row in rows], dtype=np.float32)
+    mem_util = np.array([row_value(row, "Memory_Utilization", "average_memory_utilization", "memory_util", default=100.0) for row in rows], dtype=np.float32)
+
+    known = current >= 0
+    current_vcpus = np.where(known, catalog.vcpus[np.maximum(current, 0)], 0)
+    current_memory = np.where(known, catalog.memory_gb[np.maximum(current, 0)], 0)
+    required_vcpus = current_vcpus * cpu_util / TARGET_CPU_UTILIZATION
+    required_memory = current_memory * mem_util / TARGET_MEMORY_UTILIZATION
+
+    results = []
+    for start in range(0, len(rows), RIGHTSIZING_CHUNK_SIZE):
+        chunk = slice(start, start + RIGHTSIZING_CHUNK_SIZE)
+
+        vcpus = catalog.vcpus[None, :]
+        memory = catalog.memory_gb[None, :]
+        valid = (
+            known[chunk, None]
+            & (catalog.families[None, :] == families[chunk, None])
+            & catalog.available_in(regions[chunk])
+            & (vcpus >= required_vcpus[chunk, None])
+            & (memory >= required_memory[chunk, None])
+            & (vcpus <= current_vcpus[chunk, None])
+            & (memory <= current_memory[chunk, None])
+            & ((vcpus < current_vcpus[chunk, None]) | (memory < current_memory[chunk, None]))
+        )
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            capacity_ratio = (vcpus / current_vcpus[chunk, None] + memory / current_memory[chunk, None]) / 2
+        score = np.where(valid, capacity_ratio, np.inf)
+        ranked = np.argsort(score, axis=1, kind="stable")[:, :max_candidates]
+
+        for offset, row in enumerate(rows[chunk]):
+            i = start + offset
+            candidates = [
+                {
+                    "instance_type": str(catalog.names[t]),
+                    "vcpus": float(catalog.vcpus[t]),
+                    "memory_gb": round(float(catalog.memory_gb[t]), 2),
+                    "capacity_ratio": round(float(capacity_ratio[offset, t]), 3)
+                }
+                for t in ranked[offset]
+                if valid[offset, t]
+            ]
+            results.append({
+                "instance_id": row_value(row, "Instance_ID", "instance_id"),
+                "region": row_value(row, "Region", "region"),
+                "current_instance_type": instance_types[i],
+                "current_vcpus": float(current_vcpus[i]) if known[i] else None,
+                "current_memory_gb": round(float(current_memory[i]), 2) if known[i] else None,
+                "candidates": candidates
+            })
+
+    return results
+
+
+def get_rightsizing_candidates(tool_context: ToolContext, max_candidates: int = 3) -> dict:
+    """
+    Input: Maximum number of candidates per instance (default 3)
+    Use: Returns valid smaller machine types in the same family, ranked by savings, for every instance
+    fetched by the infra scout in this session. Only existing machine types offered in the instance's
+    region are returned.
+    Output:
+    - recommendations: instance id, current type and ranked candidate target types
+    - instances without any valid smaller target
+    """
+    rows = tool_context.state.get("infra_rows")
+    if not rows:
+        return {"status": "error", "error_message": "No infrastructure data found. Fetch server data first."}
+
+    ranked = rank_rightsizing_candidates(rows, max_candidates)
+    recommendations = [result for result in ranked if result["candidates"]]
+
+    return {
+        "status": "success",
+        "row_count": len(recommendations),
+        "recommendations": recommendations,
+        "instances_without_candidates": [result["instance_id"] for result in ranked if not result["candidates"]]
+    }
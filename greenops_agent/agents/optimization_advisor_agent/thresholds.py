@@ -0,0 +1,10 @@
+"""
+Thresholds shared by the infra scout, which pushes them down into BigQuery, and the workload profiler,
+which applies them to the fetched rows. Kept free of heavy imports so either agent can use them alone.
+"""
+
+CPU_UNDERUTILIZATION_THRESHOLD = 30.0
+MEMORY_UNDERUTILIZATION_THRESHOLD = 40.0
+HIGH_CARBON_THRESHOLD_KG = 1.0
+
+MAX_FLAGGED_INSTANCES = 100
@@ -2,7 +2,7 @@ from pptx import Presentation
 from pptx.util import Pt
 from pptx.dml.color import RGBColor
 from io import BytesIO
-import requests
+from greenops_agent.http_client import http_get
 from lxml import etree
 from google.adk.tools import ToolContext
 from googleapiclient.discovery import build
@@ -58,7 +58,7 @@ def create_presentation(content: dict, tool_context: ToolContext):
     content["top_recommendations"]["chart_image_uri"] = CHART_IMAGE_MAP["[[chart_region_utilization]]"]
     content["instance_behavior_insights"]["chart_image_uri"] = CHART_IMAGE_MAP["[[chart_cpu_vs_carbon]]"]
 
-    response_template = requests.get("https://storage.googleapis.com/presentation-templates/custom_template.pptx")
+    response_template = http_get("https://storage.googleapis.com/presentation-templates/custom_template.pptx", hedge=True)
 
     prs = Presentation(BytesIO(response_template.content))
 
@@ -83,7 +83,7 @@ def create_presentation(content: dict, tool_context: ToolContext):
     image_url = content["forecast_overview"]["chart_image_uri"]
 
     if image_shape:
-        response = requests.get(image_url)
+        response = http_get(image_url, hedge=True)
         if response.status_code == 200:
             image_data = BytesIO(response.content)
             picture = image_shape.insert_picture(image_data)
@@ -103,7 +103,7 @@ def create_presentation(content: dict, tool_context: ToolContext):
     image_url = content["regional_utilization"]["chart_image_uri"]
 
     if image_shape:
-        response = requests.get(image_url)
+        response = http_get(image_url, hedge=True)
         if response.status_code == 200:
             image_data = BytesIO(response.content)
             picture = image_shape.insert_picture(image_data)
@@ -124,7 +124,7 @@ def create_presentation(content: dict, tool_context: ToolContext):
     image_url = content["top_recommendations"]["chart_image_uri"]
 
     if image_shape:
-        response = requests.get(image_url)
+        response = http_get(image_url, hedge=True)
         if response.status_code == 200:
             image_data = BytesIO(response.content)
             picture = image_shape.insert_picture(image_data)
@@ -145,7 +145,7 @@ def create_presentation(content: dict, tool_context: ToolContext):
     image_url = content["instance_behavior_insights"]["chart_image_uri"]
 
     if image_shape:
-        response = requests.get(image_url)
+        response = http_get(image_url, hedge=True)
         if response.status_code == 200:
             image_data = BytesIO(response.content)
             picture = image_shape.insert_picture(image_data)
@@ -1,6 +1,6 @@
 from google.cloud import compute_v1
 import time
-from greenops_agent.agents.forecaster_agent.agent import execute_forecast_query
+from greenops_agent.agents.forecaster_agent.forecast_store import forecast
 
 # PROJECT_ID = os.environ["GOOGLE_CLOUD_PROJECT"]
 PROJECT_ID = "greenops-460813"
@@ -74,30 +74,14 @@ def get_forecast_information(instance_id: str):
     - forecast data for memory
     """
 
-    query1 = f"""
-    SELECT Instance_ID, forecast_timestamp, forecast_value
-    FROM ML.FORECAST(
-    MODEL `greenops-460813.gcp_server_details.server_cpu_forecast_model`,
-    STRUCT(7 AS horizon, 0.8 AS confidence_level)
-    )
-    WHERE Instance_ID="{instance_id}"
-    """
-
-    query2 = f"""
-    SELECT Instance_ID, forecast_timestamp, forecast_value
-    FROM ML.FORECAST(
-    MODEL `greenops-460813.gcp_server_details.server_mem_forecast_model`,
-    STRUCT(7 AS horizon, 0.8 AS confidence_level)
-    )
-    WHERE Instance_ID="{instance_id}"
-    """
-
-    cpu_rows = execute_forecast_query(query1)["rows"]
-    mem_rows = execute_forecast_query(query2)["rows"]
+    try:
+        forecasts = forecast(["cpu", "memory"], horizon=7, instance_ids=[instance_id])["forecasts"]
+    except Exception as e:
+        return {"error": str(e)}
 
     return {
-        "CPU Forecast": cpu_rows,
-        "Memory Forecast": mem_rows
+        "CPU Forecast": forecasts["cpu"].get(instance_id, {}),
+        "Memory Forecast": forecasts["memory"].get(instance_id, {})
     }
 
     
\ No newline at end of file
@@ -53,6 +53,7 @@ You are the Weekly Summary Agent for GreenOps. Your task is to generate a comple
 - Use get_forecast_information output to summarize:
   - Projected total emission for next 7 days
   - Date with highest projected emission
+  - Projected emission per region
   - 1–2 top carbon-emitting instances from forecast
 
 ### 4. Optimization Recommendations
@@ -6,16 +6,18 @@ from google.oauth2 import service_account
 import shutil
 import os
 import json
+from datetime import date, datetime, timedelta, timezone
 
 from google.cloud import bigquery
-from datetime import datetime
+from greenops_agent.bq_query_layer import query_arrow, to_dataframe
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 
 from googleapiclient.http import MediaFileUpload
 from greenops_agent.agents.summary_generator_agent.markdown_formater import convert_to_google_docs
 
-from greenops_agent.agents.forecaster_agent.agent import execute_forecast_query
+from greenops_agent.agents.forecaster_agent.forecast_queries import get_aggregated_forecast
+from greenops_agent.agents.forecaster_agent.forecast_store import read_aggregate_forecasts
 from google.adk.tools import ToolContext
 
 
@@ -64,7 +66,7 @@ def create_google_doc(title: str, body_content: str, tool_context: ToolContext)
 
     print("Building Charts...")
 
-    chart_paths = build_charts()
+    chart_paths = build_charts(current_report_date(tool_context))
 
     print("Charts built sucessfully! ")
     
@@ -146,26 +148,54 @@ def create_google_doc(title: str, body_content: str, tool_context: ToolContext)
     shutil.rmtree("charts/")
 
     tool_context.state['chart_links'] = chart_to_links
+    # The report is done, the next one resolves its own date
+    tool_context.state[REPORT_DATE_KEY] = None
 
     return {
         "message": f"Your weekly GreenOps report has been created: {google_docs_url}",
     }
 
 
-def run_query(sql):
-    client = bigquery.Client()
-    query_job = client.query(sql)
-    df = query_job.result().to_dataframe()
-    return df
+REPORT_DATE_KEY = "report_date"
 
-def get_weekly_data() -> dict:
-    df_wk_data = run_query("""
-    SELECT instance_id,instance_type, region, ROUND(AVG(cpu_util),3) as average_cpu_utilization, ROUND(AVG(memory_util),3) as average_memory_utilization, ROUND(SUM(total_carbon),3) as total_carbon_emission_kg FROM `greenops-460813.gcp_server_details.server_metrics_timeseries` WHERE DATE(date) BETWEEN DATE_SUB(CURRENT_DATE(), INTERVAL 7 DAY) AND DATE_SUB(CURRENT_DATE(), INTERVAL 1 DAY) group by instance_id,instance_type, region
-    """)
+# Filters on the partition column itself so BigQuery only reads last week's partitions. The week ends
+# the day before @report_date, which is a query parameter so that BigQuery can serve repeated runs from cache.
+LAST_WEEK_FILTER = "date >= TIMESTAMP(DATE_SUB(@report_date, INTERVAL 7 DAY)) AND date < TIMESTAMP(@report_date)"
+
+
+def start_report(tool_context: ToolContext) -> date:
+    """
+    Starts a new report: resolves its date to today's UTC date and overwrites the one of any earlier
+    report in the session, so every query of this report covers the same week.
+    """
+    report_date = datetime.now(timezone.utc).date()
+    tool_context.state[REPORT_DATE_KEY] = report_date.isoformat()
+    return report_date
+
+
+def current_report_date(tool_context: ToolContext) -> date:
+    """
+    Returns the date of the report in progress, or starts a new report if there is none.
+    """
+    if not tool_context.state.get(REPORT_DATE_KEY):
+        return start_report(tool_context)
+    return date.fromisoformat(tool_context.state[REPORT_DATE_KEY])
+
+
+def run_query(sql, report_date: date = None):
+    query_parameters = None
+    if report_date is not None:
+        query_parameters = [bigquery.ScalarQueryParameter("report_date", "DATE", report_date)]
+    return to_dataframe(query_arrow(sql, query_parameters))
+
+def get_weekly_data(tool_context: ToolContext) -> dict:
+    df_wk_data = run_query(f"""
+    SELECT instance_id,instance_type, region, ROUND(AVG(cpu_util),3) as average_cpu_utilization, ROUND(AVG(memory_util),3) as average_memory_utilization, ROUND(SUM(total_carbon),3) as total_carbon_emission_kg FROM `greenops-460813.gcp_server_details.server_metrics_timeseries` WHERE {LAST_WEEK_FILTER} group by instance_id,instance_type, region
+    """, start_report(tool_context))
 
     return df_wk_data.to_dict("records")
 
-def build_charts() -> dict:
+def build_charts(report_date: date) -> dict:
     chart_paths = {}
 
     if not os.path.exists("charts/"):
@@ -173,11 +203,22 @@ def build_charts() -> dict:
 
     # Chart 1: Time Series
     df_ts = run_query(f"""
-        SELECT date, round(sum(total_carbon),2) as value FROM `greenops-460813.gcp_server_details.server_metrics_timeseries` where date < '{datetime.now().strftime('%Y-%m-%d')}' group by date order by date desc limit 7
-    """)
+        SELECT date, round(sum(total_carbon),2) as value FROM `greenops-460813.gcp_server_details.server_metrics_timeseries` WHERE {LAST_WEEK_FILTER} group by date order by date desc limit 7
+    """, report_date)
+    # The fleet total forecast by the aggregate carbon model from the last day of the charted week, so it
+    # continues the actuals at report_date. No overlay if that day's run was not materialized.
+    carbon_forecast = {
+        row["day"]: row["forecast_value"]
+        for row in read_aggregate_forecasts("carbon", horizon=7, run_date=report_date - timedelta(days=1))
+        if row["level"] == "fleet"
+    }
     path1 = "charts/chart1_timeseries.png"
     plt.figure(figsize=(10, 5))
-    plt.plot(df_ts['date'], df_ts['value'], marker='o')
+    plt.plot(df_ts['date'], df_ts['value'], marker='o', label='Actual')
+    if carbon_forecast:
+        forecast_days = [datetime.fromisoformat(day).replace(tzinfo=timezone.utc) for day in carbon_forecast]
+        plt.plot(forecast_days, list(carbon_forecast.values()), marker='o', linestyle='--', label='Forecast')
+        plt.legend()
     plt.title("Time Series: Carbon Emissions")
     plt.xlabel("Date")
     plt.ylabel("Emission (kg)")
@@ -188,9 +229,9 @@ def build_charts() -> dict:
     plt.close()
 
     # Chart 2: Bar Chart
-    df_bar = run_query("""
-        SELECT region, round(avg(cpu_util),2) as cpu_util, round(avg(memory_util),2) as memory_util FROM `greenops-460813.gcp_server_details.server_metrics_timeseries` WHERE DATE(date) BETWEEN DATE_SUB(CURRENT_DATE(), INTERVAL 7 DAY) AND DATE_SUB(CURRENT_DATE(), INTERVAL 1 DAY) group by region
-    """)
+    df_bar = run_query(f"""
+        SELECT region, round(avg(cpu_util),2) as cpu_util, round(avg(memory_util),2) as memory_util FROM `greenops-460813.gcp_server_details.server_metrics_timeseries` WHERE {LAST_WEEK_FILTER} group by region
+    """, report_date)
     path2 = "charts/chart2_bar.png"
     x = df_bar['region']
     cpu = df_bar['cpu_util']
@@ -210,9 +251,9 @@ def build_charts() -> dict:
     plt.close()
 
     # Chart 3: Scatter Plot
-    df_scatter = run_query("""
-        SELECT instance_id, round(avg(cpu_util),2) as cpu_util, round(sum(total_carbon),2) as total_carbon FROM `greenops-460813.gcp_server_details.server_metrics_timeseries` WHERE DATE(date) BETWEEN DATE_SUB(CURRENT_DATE(), INTERVAL 7 DAY) AND DATE_SUB(CURRENT_DATE(), INTERVAL 1 DAY) group by instance_id
-    """)
+    df_scatter = run_query(f"""
+        SELECT instance_id, round(avg(cpu_util),2) as cpu_util, round(sum(total_carbon),2) as total_carbon FROM `greenops-460813.gcp_server_details.server_metrics_timeseries` WHERE {LAST_WEEK_FILTER} group by instance_id
+    """, report_date)
     path3 = "charts/chart3_scatter.png"
     plt.figure(figsize=(8, 6))
     plt.scatter(df_scatter['cpu_util'], df_scatter['total_carbon'], alpha=0.7, c='green')
@@ -226,9 +267,9 @@ def build_charts() -> dict:
     plt.close()
 
     # Chart 4: Underutilization Rate (Area)
-    df_area = run_query("""
-        SELECT DATE(date) AS day, COUNTIF(cpu_util < 30 OR memory_util < 40) * 100.0 / COUNT(*) AS underutilization_rate FROM `greenops-460813.gcp_server_details.server_metrics_timeseries` WHERE DATE(date) BETWEEN DATE_SUB(CURRENT_DATE(), INTERVAL 7 DAY) AND DATE_SUB(CURRENT_DATE(), INTERVAL 1 DAY) GROUP BY day ORDER BY day
-    """)
+    df_area = run_query(f"""
+        SELECT DATE(date) AS day, COUNTIF(cpu_util < 30 OR memory_util < 40) * 100.0 / COUNT(*) AS underutilization_rate FROM `greenops-460813.gcp_server_details.server_metrics_timeseries` WHERE {LAST_WEEK_FILTER} GROUP BY day ORDER BY day
+    """, report_date)
     path4 = "charts/chart4_underutilization.png"
     plt.figure(figsize=(10, 5))
     plt.fill_between(df_area['day'], df_area['underutilization_rate'], color='skyblue', alpha=0.6)
@@ -255,42 +296,21 @@ def get_forecast_information():
     - Total carbon emissions for the week
     - date with highest projected carbon emission
     - Top carbon emitting emissions
+    - Carbon emissions for the week per region
     """
 
-    query = """
-    SELECT Instance_ID, forecast_timestamp, forecast_value
-    FROM ML.FORECAST(
-    MODEL `greenops-460813.gcp_server_details.server_carbon_forecast_model`,
-    STRUCT(7 AS horizon, 0.8 AS confidence_level)
-    )
-    """
+    forecast = get_aggregated_forecast(metric="carbon", horizon=7, top_k=2)
+    daily_totals = forecast["daily_totals"]
 
-    rows = execute_forecast_query(query)["rows"]
-
-    date_to_emissions = {}
-    instance_to_emissions = {}
-    total_emission = 0
-
-    for row in rows:
-        instance_id = row["Instance_ID"]
-        instance_emission = 0
-        for date in row:
-            if date != "Instance_ID":
-                if not date_to_emissions.get(date):
-                    date_to_emissions[date] = 0
-                date_to_emissions[date] += row[date]
-                instance_emission += row[date]
-        instance_to_emissions[instance_id] = instance_emission
-        total_emission += instance_emission
-    
-    date_with_highest = sorted(date_to_emissions.items(), key=lambda item: item[1], reverse=True)
-    instance_with_highest = sorted(instance_to_emissions.items(), key=lambda item: item[1], reverse=True)
+    if not daily_totals:
+        return {"status": "error", "error_message": "No carbon forecast available."}
+
+    date_with_highest = max(daily_totals.items(), key=lambda item: item[1])
 
     return {
-        "Total Carbon Emissions for the week" : round(total_emission, 3),
-        "Date with Highest Emission" : {date_with_highest[0][0] : round(date_with_highest[0][1],3)},
-        "Top 2 Carbon Emitting instances" : [
-            {instance_with_highest[0][0] : round(instance_with_highest[0][1],3)},
-            {instance_with_highest[1][0] : round(instance_with_highest[1][1],3)}
-        ]
+        "Total Carbon Emissions for the week" : forecast["fleet_total"],
+        "Date with Highest Emission" : {date_with_highest[0] : date_with_highest[1]},
+        "Top 2 Carbon Emitting instances" : forecast["top_instances"],
+        "Daily Carbon Emissions" : daily_totals,
+        "Carbon Emissions for the week by Region" : forecast["region_totals"]
     }
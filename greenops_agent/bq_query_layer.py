@@ -0,0 +1,133 @@
+"""
+Shared BigQuery query layer for the GreenOps tools.
+
+Query results are downloaded as Arrow record batches through the BigQuery Storage Read API instead of
+row by row over REST, and kept in a compact columnar form while cached:
+- low-cardinality string columns (Region, Instance_Type, ...) are dictionary encoded
+- integer columns are downcast to the smallest type that holds their range
+
+Tools convert to Python objects (`to_records`) or pandas (`to_dataframe`) only at the edge, where
+integers are widened back to int64 and dictionaries decoded to plain strings, so callers never see
+the compact types (no int8 overflow, no categoricals in groupby/pivot). Float columns stay float64. Results
+are cached by `query_cache` until the tables or models they read are modified. Queries issued on
+behalf of an agent tool (`tool_name`) go through `query_guard` on a cache miss.
+"""
+
+import threading
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from google.cloud import bigquery
+from google.cloud import bigquery_storage
+from greenops_agent.query_cache import query_cache
+from greenops_agent.query_guard import QueryGuard
+
+DICTIONARY_MAX_CARDINALITY_RATIO = 0.5
+DICTIONARY_MIN_ROWS = 16
+
+INTEGER_TYPES = [pa.int8(), pa.int16(), pa.int32()]
+
+bq_client = bigquery.Client()
+query_guard = QueryGuard(bq_client)
+
+_bqstorage_client = None
+_bqstorage_lock = threading.Lock()
+
+
+def get_bqstorage_client() -> bigquery_storage.BigQueryReadClient:
+    global _bqstorage_client
+
+    if _bqstorage_client is None:
+        with _bqstorage_lock:
+            if _bqstorage_client is None:
+                _bqstorage_client = bigquery_storage.BigQueryReadClient()
+    return _bqstorage_client
+
+
+def compact_column(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    if len(column) == 0:
+        return column
+
+    if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+        if len(column) >= DICTIONARY_MIN_ROWS and pc.count_distinct(column).as_py() <= DICTIONARY_MAX_CARDINALITY_RATIO * len(column):
+            return column.dictionary_encode()
+        return column
+
+    if pa.types.is_integer(column.type):
+        min_max = pc.min_max(column).as_py()
+        if min_max["min"] is None:
+            return column
+        for integer_type in INTEGER_TYPES:
+            info = np.iinfo(integer_type.to_pandas_dtype())
+            if info.min <= min_max["min"] and min_max["max"] <= info.max:
+                return column.cast(integer_type)
+        return column
+
+    return column
+
+
+def compact_arrow_table(table: pa.Table) -> pa.Table:
+    return pa.table({name: compact_column(table.column(name)) for name in table.column_names})
+
+
+def query_arrow(sql: str, query_parameters: list = None, job_config: bigquery.QueryJobConfig = None,
+                use_cache: bool = True, tool_name: str = None, state=None) -> pa.Table:
+    """
+    Runs the query and returns its result as a compact Arrow table read through the Storage Read API.
+    Results are served from the query cache until one of the referenced tables or models changes.
+    With a tool_name the query is dry-run and budgeted by the query guard first; state is the ADK
+    session state that holds the session's byte budget.
+    """
+    key = None
+    if use_cache:
+        version = query_cache.snapshot_version(sql, bq_client)
+        if version is not None:
+            key = query_cache.make_key(sql, query_parameters, version)
+            table = query_cache.get(key)
+            if table is not None:
+                return table
+
+    guarded = None
+    if tool_name:
+        guarded = query_guard.check(sql, tool_name, state, query_parameters, job_config)
+        sql, job_config = guarded.sql, guarded.job_config
+    else:
+        job_config = job_config or bigquery.QueryJobConfig()
+        if query_parameters:
+            job_config.query_parameters = query_parameters
+
+    query_job = bq_client.query(sql, job_config=job_config)
+    table = query_job.result().to_arrow(bqstorage_client=get_bqstorage_client(), create_bqstorage_client=False)
+    table = compact_arrow_table(table)
+
+    if guarded is not None:
+        query_guard.record(tool_name, guarded, query_job, state)
+    if key is not None:
+        query_cache.put(key, table)
+    return table
+
+
+def edge_column(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    if pa.types.is_dictionary(column.type):
+        return column.cast(column.type.value_type)
+    if pa.types.is_integer(column.type) and column.type != pa.int64():
+        return column.cast(pa.int64())
+    return column
+
+
+def edge_table(table: pa.Table) -> pa.Table:
+    return pa.table({name: edge_column(table.column(name)) for name in table.column_names})
+
+
+def to_records(table: pa.Table) -> list:
+    """
+    Converts the table to a list of plain Python dicts, one per row.
+    """
+    return edge_table(table).to_pylist()
+
+
+def to_dataframe(table: pa.Table):
+    """
+    Converts the table to a pandas DataFrame with int64 integers and plain string columns.
+    """
+    return edge_table(table).to_pandas()
@@ -0,0 +1,308 @@
+"""
+Shared outbound HTTP layer for GreenOps.
+
+Every outbound call to sparecores, Climatiq or Cloud Storage goes through here instead of calling
+`requests` directly. The layer provides:
+- pooled keep-alive connections (one `requests.Session` and one `httpx.AsyncClient` per process)
+- per-host connect/read timeouts
+- retries with exponential backoff and jitter on connection errors, 429 and 5xx, for idempotent calls only
+- optional hedged requests: if a GET has not answered within the host's p95 latency, a second
+  identical request is sent and whichever answers first wins
+- per-host latency metrics, exposed through `get_http_metrics()`
+"""
+
+import asyncio
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 20)
+HOST_TIMEOUTS = {
+    "sparecores.com": (3.05, 10),
+    "api.climatiq.io": (3.05, 30),
+    "storage.googleapis.com": (3.05, 30),
+    "drive.google.com": (3.05, 30),
+}
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+
+# Hedge after the host's p95 latency once enough samples exist, otherwise after this delay
+HEDGE_DELAY_SECONDS = 1.0
+HEDGE_MIN_SAMPLES = 20
+
+POOL_SIZE = 32
+LATENCY_SAMPLES = 512
+
+
+class HostMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def percentile(self, q: float):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def host_of(url: str) -> str:
+    host = urlparse(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def host_metrics(host: str) -> HostMetrics:
+    with _metrics_lock:
+        return _metrics.setdefault(host, HostMetrics())
+
+
+def record_request(host: str, seconds: float, error: bool = False):
+    metrics = host_metrics(host)
+    with _metrics_lock:
+        metrics.requests += 1
+        if error:
+            metrics.errors += 1
+        else:
+            metrics.latencies.append(seconds)
+
+
+def increment(host: str, counter: str):
+    metrics = host_metrics(host)
+    with _metrics_lock:
+        setattr(metrics, counter, getattr(metrics, counter) + 1)
+
+
+def get_http_metrics() -> dict:
+    """
+    Returns request, error, retry and hedge counts and p50/p95/max latency (ms) per host.
+    """
+    with _metrics_lock:
+        snapshot = {host: metrics for host, metrics in _metrics.items()}
+
+    return {
+        host: {
+            "requests": metrics.requests,
+            "errors": metrics.errors,
+            "retries": metrics.retries,
+            "hedges": metrics.hedges,
+            "p50_ms": round(metrics.percentile(0.5) * 1000, 1) if metrics.latencies else None,
+            "p95_ms": round(metrics.percentile(0.95) * 1000, 1) if metrics.latencies else None,
+            "max_ms": round(max(metrics.latencies) * 1000, 1) if metrics.latencies else None,
+        }
+        for host, metrics in snapshot.items()
+    }
+
+
+def get_timeout(url: str) -> tuple:
+    return HOST_TIMEOUTS.get(host_of(url), DEFAULT_TIMEOUT)
+
+
+def hedge_delay(host: str) -> float:
+    metrics = host_metrics(host)
+    if len(metrics.latencies) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DELAY_SECONDS
+    return metrics.percentile(0.95)
+
+
+def backoff_delay(attempt: int, retry_after=None) -> float:
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+    return min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def is_idempotent(method: str, idempotent=None) -> bool:
+    return method.upper() in IDEMPOTENT_METHODS if idempotent is None else idempotent
+
+
+# Sync client ==========================================================================================
+
+_session = None
+_session_lock = threading.Lock()
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="http-hedge")
+
+
+def get_session() -> requests.Session:
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _send(method: str, url: str, **kwargs) -> requests.Response:
+    host = host_of(url)
+    start = time.perf_counter()
+    try:
+        response = get_session().request(method, url, **kwargs)
+    except requests.RequestException:
+        record_request(host, time.perf_counter() - start, error=True)
+        raise
+    record_request(host, time.perf_counter() - start, error=response.status_code >= 500)
+    return response
+
+
+def _hedged_send(method: str, url: str, **kwargs) -> requests.Response:
+    host = host_of(url)
+    first = _hedge_executor.submit(_send, method, url, **kwargs)
+    done, _ = wait([first], timeout=hedge_delay(host))
+    if done:
+        return first.result()
+
+    increment(host, "hedges")
+    second = _hedge_executor.submit(_send, method, url, **kwargs)
+    done, pending = wait([first, second], return_when=FIRST_COMPLETED)
+    winner = done.pop()
+    if winner.exception() is not None and pending:
+        return pending.pop().result()
+
+    # Release the loser's connection back to the pool once it answers (matters for streamed responses)
+    for future in pending:
+        future.add_done_callback(lambda f: f.exception() is None and f.result().close())
+    return winner.result()
+
+
+def http_request(method: str, url: str, retries: int = MAX_RETRIES, idempotent: bool = None,
+                 hedge: bool = False, **kwargs) -> requests.Response:
+    """
+    Sends a request through the shared session. Retries with backoff apply only to idempotent calls
+    (pass idempotent=True for side-effect free POSTs), and hedging only to GETs.
+    """
+    kwargs.setdefault("timeout", get_timeout(url))
+    attempts = retries + 1 if is_idempotent(method, idempotent) else 1
+    send = _hedged_send if hedge and method.upper() == "GET" else _send
+
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+        try:
+            response = send(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if last_attempt:
+                raise
+            increment(host_of(url), "retries")
+            time.sleep(backoff_delay(attempt))
+            continue
+
+        if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+            increment(host_of(url), "retries")
+            # A streamed response holds its pooled connection until it is closed
+            response.close()
+            time.sleep(backoff_delay(attempt, response.headers.get("Retry-After")))
+            continue
+
+        return response
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    return http_request("GET", url, **kwargs)
+
+
+def http_post(url: str, **kwargs) -> requests.Response:
+    return http_request("POST", url, **kwargs)
+
+
+# Async client =========================================================================================
+
+# An httpx.AsyncClient's pool is bound to the event loop it was first used on, so there is one client per
+# running loop. A client is dropped together with its loop.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE // 2)
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def _async_send(method: str, url: str, **kwargs) -> httpx.Response:
+    host = host_of(url)
+    start = time.perf_counter()
+    try:
+        response = await get_async_client().request(method, url, **kwargs)
+    except httpx.HTTPError:
+        record_request(host, time.perf_counter() - start, error=True)
+        raise
+    record_request(host, time.perf_counter() - start, error=response.status_code >= 500)
+    return response
+
+
+async def _async_hedged_send(method: str, url: str, **kwargs) -> httpx.Response:
+    host = host_of(url)
+    first = asyncio.ensure_future(_async_send(method, url, **kwargs))
+    done, _ = await asyncio.wait({first}, timeout=hedge_delay(host))
+    if done:
+        return first.result()
+
+    increment(host, "hedges")
+    second = asyncio.ensure_future(_async_send(method, url, **kwargs))
+    done, pending = await asyncio.wait({first, second}, return_when=asyncio.FIRST_COMPLETED)
+    winner = done.pop()
+    if winner.exception() is not None and pending:
+        return await pending.pop()
+
+    for task in pending:
+        task.cancel()
+    return winner.result()
+
+
+async def async_http_request(method: str, url: str, retries: int = MAX_RETRIES, idempotent: bool = None,
+                             hedge: bool = False, **kwargs) -> httpx.Response:
+    """
+    Async `http_request` on the shared `httpx.AsyncClient`, with the same timeout, retry and hedging rules.
+    """
+    connect_timeout, read_timeout = get_timeout(url)
+    kwargs.setdefault("timeout", httpx.Timeout(read_timeout, connect=connect_timeout))
+    attempts = retries + 1 if is_idempotent(method, idempotent) else 1
+    send = _async_hedged_send if hedge and method.upper() == "GET" else _async_send
+
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+        try:
+            response = await send(method, url, **kwargs)
+        except httpx.TransportError:
+            if last_attempt:
+                raise
+            increment(host_of(url), "retries")
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+
+        if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+            increment(host_of(url), "retries")
+            await response.aclose()
+            await asyncio.sleep(backoff_delay(attempt, response.headers.get("Retry-After")))
+            continue
+
+        return response
@@ -0,0 +1,194 @@
+"""
+Result cache for the BigQuery tool queries.
+
+The daily Cloud Scheduler job is the only writer of the snapshot tables and the forecast models, so
+between two runs the same query always returns the same rows. Results are kept in process and on disk
+(Arrow IPC files), keyed on the normalized SQL, its query parameters and the `modified` timestamp of
+every table or model the query references. When a new snapshot lands the timestamps change, the keys
+no longer match and the old entries simply age out of the LRU.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import pyarrow as pa
+from cachetools import TTLCache
+
+CACHE_DIR = os.environ.get("GREENOPS_CACHE_DIR", "cache/")
+QUERY_CACHE_DIR = os.path.join(CACHE_DIR, "query_results")
+QUERY_CACHE_MEMORY_BYTES = int(os.environ.get("QUERY_CACHE_MEMORY_BYTES", 256 * 1024 * 1024))
+QUERY_CACHE_DISK_BYTES = int(os.environ.get("QUERY_CACHE_DISK_BYTES", 2 * 1024 * 1024 * 1024))
+
+# How long a looked up table/model version is trusted before asking BigQuery again
+VERSION_CHECK_SECONDS = int(os.environ.get("QUERY_CACHE_VERSION_CHECK_SECONDS", 60))
+
+# String literals and backtick identifiers keep their case, everything else is lowercased
+SQL_TOKEN_PATTERN = re.compile(r"('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`)")
+REFERENCE_PATTERN = re.compile(r"(\bMODEL\s+)?`([^`]+)`", re.IGNORECASE)
+CURRENT_TIME_PATTERN = re.compile(r"\bcurrent_(date|datetime|timestamp|time)\b")
+
+
+def normalize_sql(sql: str) -> str:
+    parts = SQL_TOKEN_PATTERN.split(sql.strip().rstrip(";"))
+    return "".join(
+        part if index % 2 else re.sub(r"\s+", " ", part).lower()
+        for index, part in enumerate(parts)
+    ).strip()
+
+
+def referenced_objects(sql: str) -> list:
+    """
+    Returns [(kind, reference)] for every backtick-quoted table or model in the query.
+    """
+    return sorted({
+        ("model" if model_keyword else "table", reference)
+        for model_keyword, reference in REFERENCE_PATTERN.findall(sql)
+    })
+
+
+class QueryResultCache:
+    """
+    Two-level LRU cache of query results as Arrow tables.
+
+    The memory level is bounded by `memory_bytes` of Arrow buffers, the disk level by `disk_bytes`
+    of IPC files in `directory`. A disk hit is promoted back into memory.
+    """
+
+    def __init__(self, directory=QUERY_CACHE_DIR, memory_bytes=QUERY_CACHE_MEMORY_BYTES,
+                 disk_bytes=QUERY_CACHE_DISK_BYTES):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._versions = TTLCache(maxsize=256, ttl=VERSION_CHECK_SECONDS)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def snapshot_version(self, sql: str, client):
+        """
+        Returns the `modified` timestamps of the tables and models the query reads, or None when the
+        query cannot be cached (no references, or one of them cannot be looked up).
+        """
+        objects = referenced_objects(sql)
+        if not objects:
+            return None
+
+        versions = []
+        for kind, reference in objects:
+            with self._lock:
+                modified = self._versions.get((kind, reference))
+            if modified is None:
+                try:
+                    target = client.get_model(reference) if kind == "model" else client.get_table(reference)
+                except Exception as e:
+                    print(f"Query cache: cannot look up {kind} {reference}: {e}")
+                    return None
+                modified = target.modified.isoformat() if target.modified else "unknown"
+                with self._lock:
+                    self._versions[(kind, reference)] = modified
+            versions.append(f"{reference}@{modified}")
+
+        return versions
+
+    def make_key(self, sql: str, query_parameters: list, version: list) -> str:
+        normalized = normalize_sql(sql)
+        parts = [normalized, json.dumps([p.to_api_repr() for p in query_parameters or []], sort_keys=True)]
+        parts.extend(version)
+        # Relative dates give a different answer tomorrow even if no new snapshot has landed
+        if CURRENT_TIME_PATTERN.search(normalized):
+            parts.append(datetime.now(timezone.utc).date().isoformat())
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.arrow")
+
+    def get(self, key: str):
+        with self._lock:
+            table = self._entries.get(key)
+            if table is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return table
+
+        table = self._read_disk(key)
+        with self._lock:
+            if table is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._put_memory(key, table)
+        return table
+
+    def put(self, key: str, table: pa.Table):
+        self._put_memory(key, table)
+        try:
+            self._write_disk(key, table)
+        except OSError as e:
+            print(f"Query cache: cannot write {key}: {e}")
+
+    def _put_memory(self, key: str, table: pa.Table):
+        if table.nbytes > self.memory_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous.nbytes
+            self._entries[key] = table
+            self._size += table.nbytes
+            while self._size > self.memory_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.nbytes
+
+    def _read_disk(self, key: str):
+        path = self._path(key)
+        try:
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+            os.utime(path)
+            return table
+        except (OSError, pa.ArrowInvalid):
+            return None
+
+    def _write_disk(self, key: str, table: pa.Table):
+        os.makedirs(self.directory, exist_ok=True)
+
+        tmp_path = f"{self._path(key)}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, self._path(key))
+        self._evict_disk()
+
+    def _evict_disk(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".arrow"):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._versions.clear()
+
+
+query_cache = QueryResultCache()
@@ -0,0 +1,191 @@
+"""
+Dry-run cost guard for the BigQuery queries issued by the agent tools.
+
+Before a query runs it is dry-run to get `total_bytes_processed`. The guard then
+- rewrites `SELECT *` on a known table to that table's default columns when the query is over budget
+- rejects the query with `QueryBudgetExceeded` if it is still over the tool's or the session's budget
+- caps the real job with `maximum_bytes_billed`, so a wrong estimate cannot scan past the budget
+- records the bytes processed, bytes billed and on-demand cost of every query it let through
+
+Session totals are kept in the ADK session state. The client is injected, so the guard can be exercised
+offline against a stub whose `query(sql, job_config=...)` returns an object with `total_bytes_processed`.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+
+from google.cloud import bigquery
+
+CACHE_DIR = os.environ.get("GREENOPS_CACHE_DIR", "cache/")
+QUERY_COST_LOG_PATH = os.environ.get("QUERY_COST_LOG_PATH", os.path.join(CACHE_DIR, "query_costs.jsonl"))
+
+MIB = 1024 * 1024
+GIB = 1024 * MIB
+
+DEFAULT_TOOL_BUDGET_BYTES = int(os.environ.get("GREENOPS_TOOL_BYTES_BUDGET", 512 * MIB))
+SESSION_BUDGET_BYTES = int(os.environ.get("GREENOPS_SESSION_BYTES_BUDGET", 5 * GIB))
+
+TOOL_BUDGET_BYTES = {
+    "fetch_servers": 1 * GIB,
+    "get_forecast": 1 * GIB,
+}
+
+# BigQuery bills at least 10 MB per query, a lower maximum_bytes_billed would fail every query
+MIN_BYTES_BILLED = 10 * MIB
+
+ON_DEMAND_USD_PER_TIB = 6.25
+
+# Columns a `SELECT *` is narrowed to when it goes over budget
+DEFAULT_COLUMNS = {
+    "greenops-460813.gcp_server_details.server_metrics": [
+        "Instance_ID", "Instance_Type", "Region", "Average_CPU_Utilization", "Memory_Utilization",
+        "Total_Carbon_Emission_in_kg"
+    ],
+    "greenops-460813.gcp_server_details.server_metrics_timeseries": [
+        "date", "instance_id", "instance_type", "region", "cpu_util", "memory_util", "total_carbon"
+    ],
+}
+
+SELECT_STAR_PATTERN = re.compile(r"\bSELECT\s+\*\s+FROM\s+`([^`]+)`", re.IGNORECASE)
+
+SESSION_BYTES_KEY = "bq_bytes_billed"
+SESSION_COSTS_KEY = "bq_query_costs"
+# Only the latest per-query entries are kept in the session state, the full history is in the cost log
+MAX_SESSION_COST_ENTRIES = int(os.environ.get("GREENOPS_SESSION_COST_ENTRIES", 20))
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class GuardedQuery:
+    def __init__(self, sql: str, job_config: bigquery.QueryJobConfig, estimated_bytes: int, rewritten: bool):
+        self.sql = sql
+        self.job_config = job_config
+        self.estimated_bytes = estimated_bytes
+        self.rewritten = rewritten
+
+
+def billable_bytes(total_bytes: int) -> int:
+    return max(total_bytes or 0, MIN_BYTES_BILLED)
+
+
+def cost_usd(total_bytes: int) -> float:
+    return round((total_bytes or 0) / (1024 * GIB) * ON_DEMAND_USD_PER_TIB, 6)
+
+
+def parameter_values(query_parameters: list) -> dict:
+    """
+    Scalar and array query parameters as {name: value}, for the cost log.
+    """
+    return {
+        parameter.name: getattr(parameter, "value", getattr(parameter, "values", None))
+        for parameter in query_parameters or []
+    }
+
+
+def rewrite_select_star(sql: str):
+    """
+    Replaces `SELECT * FROM `table`` with the table's default columns. Returns None if nothing to rewrite.
+    """
+    def replace(match):
+        columns = DEFAULT_COLUMNS.get(match.group(1))
+        if not columns:
+            return match.group(0)
+        return f"SELECT {', '.join(columns)} FROM `{match.group(1)}`"
+
+    rewritten = SELECT_STAR_PATTERN.sub(replace, sql)
+    return rewritten if rewritten != sql else None
+
+
+class QueryGuard:
+    def __init__(self, client, tool_budgets: dict = None, default_tool_budget: int = DEFAULT_TOOL_BUDGET_BYTES,
+                 session_budget: int = SESSION_BUDGET_BYTES, cost_log_path: str = QUERY_COST_LOG_PATH):
+        self.client = client
+        self.tool_budgets = TOOL_BUDGET_BYTES if tool_budgets is None else tool_budgets
+        self.default_tool_budget = default_tool_budget
+        self.session_budget = session_budget
+        self.cost_log_path = cost_log_path
+        self._log_lock = threading.Lock()
+
+    def tool_budget(self, tool_name: str) -> int:
+        return self.tool_budgets.get(tool_name, self.default_tool_budget)
+
+    def dry_run(self, sql: str, query_parameters: list = None) -> int:
+        job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+        if query_parameters:
+            job_config.query_parameters = query_parameters
+        return self.client.query(sql, job_config=job_config).total_bytes_processed or 0
+
+    def check(self, sql: str, tool_name: str, state=None, query_parameters: list = None,
+              job_config: bigquery.QueryJobConfig = None) -> GuardedQuery:
+        """
+        Dry-runs the query and returns the SQL and job config to run it with.
+        Raises QueryBudgetExceeded if the query does not fit the tool's or the session's remaining budget.
+        """
+        session_used = state.get(SESSION_BYTES_KEY, 0) if state is not None else 0
+        budget = min(self.tool_budget(tool_name), self.session_budget - session_used)
+        if budget < MIN_BYTES_BILLED:
+            raise QueryBudgetExceeded(
+                f"The BigQuery budget of this session is used up ({session_used} of {self.session_budget} bytes)."
+            )
+
+        estimated_bytes = self.dry_run(sql, query_parameters)
+        rewritten = False
+        if billable_bytes(estimated_bytes) > budget:
+            narrowed_sql = rewrite_select_star(sql)
+            if narrowed_sql is not None:
+                narrowed_bytes = self.dry_run(narrowed_sql, query_parameters)
+                print(f"Query guard: SELECT * would scan {estimated_bytes} bytes, narrowed query scans {narrowed_bytes}")
+                sql, estimated_bytes, rewritten = narrowed_sql, narrowed_bytes, True
+
+        if billable_bytes(estimated_bytes) > budget:
+            raise QueryBudgetExceeded(
+                f"Query would scan {estimated_bytes} bytes, over the budget of {budget} bytes for {tool_name}. "
+                "Add filters on Region, Instance_ID or a date range, or select fewer columns."
+            )
+
+        job_config = job_config or bigquery.QueryJobConfig()
+        job_config.maximum_bytes_billed = budget
+        if query_parameters:
+            job_config.query_parameters = query_parameters
+        return GuardedQuery(sql, job_config, estimated_bytes, rewritten)
+
+    def record(self, tool_name: str, guarded: GuardedQuery, query_job, state=None) -> dict:
+        bytes_billed = query_job.total_bytes_billed or 0
+        entry = {
+            "timestamp": time.time(),
+            "tool": tool_name,
+            "estimated_bytes": guarded.estimated_bytes,
+            "bytes_processed": query_job.total_bytes_processed or 0,
+            "bytes_billed": bytes_billed,
+            "cost_usd": cost_usd(bytes_billed),
+            "cache_hit": bool(getattr(query_job, "cache_hit", False)),
+            "rewritten": guarded.rewritten,
+            "sql": guarded.sql,
+            "parameters": parameter_values(guarded.job_config.query_parameters),
+        }
+
+        if state is not None:
+            state[SESSION_BYTES_KEY] = state.get(SESSION_BYTES_KEY, 0) + bytes_billed
+            state[SESSION_COSTS_KEY] = (state.get(SESSION_COSTS_KEY, []) + [
+                {key: entry[key] for key in ("tool", "bytes_billed", "cost_usd", "rewritten")}
+            ])[-MAX_SESSION_COST_ENTRIES:]
+
+        self._append_log(entry)
+        return entry
+
+    def _append_log(self, entry: dict):
+        if not self.cost_log_path:
+            return
+        try:
+            directory = os.path.dirname(self.cost_log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._log_lock, open(self.cost_log_path, "a") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+        except OSError as e:
+            print(f"Query guard: cannot write cost log: {e}")
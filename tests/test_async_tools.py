@@ -0,0 +1,30 @@
+"""
+Offline tests of the async impact calculator lookups, with the HTTP client and the price catalog replaced.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from greenops_agent.agents.impact_calculator_agent import async_tools
+
+
+def test_concurrent_lookups_of_a_type_fetch_and_persist_once(monkeypatch):
+    requests, stored = [], []
+
+    async def fake_request(method, url, **kwargs):
+        requests.append(url)
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(text="<page>", raise_for_status=lambda: None)
+
+    monkeypatch.setattr(async_tools, "async_http_request", fake_request)
+    monkeypatch.setattr(async_tools, "parse_region_prices", lambda html: {"us-west1": "$0.1"})
+    monkeypatch.setattr(async_tools.price_catalog, "put",
+                        lambda instance_type, region_prices: stored.append((instance_type, region_prices)))
+
+    async def load_concurrently():
+        await asyncio.gather(*(async_tools.load_region_prices("n2-standard-8") for _ in range(5)))
+
+    asyncio.run(load_concurrently())
+
+    assert len(requests) == 1
+    assert stored == [("n2-standard-8", {"us-west1": "$0.1"})]
@@ -0,0 +1,90 @@
+"""
+Offline tests of the streaming sparecores availability-table parser.
+"""
+
+import pytest
+
+from greenops_agent.agents.impact_calculator_agent.availability_parser import parse_region_prices_stream
+
+TABLE = (
+    "<table><tr><th>Region</th><th>Zones</th><th>Price</th></tr>"
+    "<tr><td>us-west1 (Oregon)</td><td>3 zones</td><td>$0.3885</td></tr>"
+    "<tr><td>europe-west10 (Berlin)</td><td>3 zones</td><td>$0.4630</td></tr>"
+    "</table>"
+)
+
+
+def page(body: str) -> str:
+    return f"<html><body><div class='card'><table><tr><td>a</td><td>b</td><td>c</td></tr></table></div>{body}</body></html>"
+
+
+def chunked(text: str, size: int):
+    data = text.encode()
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_rows_of_the_availability_table_only():
+    html = page(f"<div id='availability'>{TABLE}</div>")
+
+    assert parse_region_prices_stream([html]) == {
+        "us-west1 (Oregon)": "$0.3885", "europe-west10 (Berlin)": "$0.4630"
+    }
+
+
+def test_small_chunks_split_inside_tags_and_multibyte_characters():
+    html = page(f"<div id='availability'>{TABLE.replace('Berlin', 'Zürich')}</div>")
+
+    assert parse_region_prices_stream(chunked(html, 7)) == {
+        "us-west1 (Oregon)": "$0.3885", "europe-west10 (Zürich)": "$0.4630"
+    }
+
+
+def test_reading_stops_after_the_table():
+    chunks = [page(f"<div id='availability'>{TABLE}</div>"), "<p>never read</p>"]
+    consumed = []
+
+    def tracking():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    parse_region_prices_stream(tracking())
+    assert consumed == chunks[:1]
+
+
+def test_unclosed_cells_and_rows_are_closed_implicitly():
+    html = page(
+        "<div id='availability'><table>"
+        "<tr><td>us-west1 (Oregon)<td>3 zones<td>$0.3885"
+        "<tr><td>us-east1 (South Carolina)<td>3 zones<td>$0.3885"
+        "</table></div>"
+    )
+
+    assert parse_region_prices_stream([html]) == {
+        "us-west1 (Oregon)": "$0.3885", "us-east1 (South Carolina)": "$0.3885"
+    }
+
+
+def test_nested_tables_and_elements_stay_in_scope():
+    nested = (
+        "<div id='availability'><div><span>Prices</span></div><table>"
+        "<tr><td>us-west1 (Oregon)</td><td><table><tr><td>x</td><td>y</td><td>z</td></tr></table></td>"
+        "<td>$0.3885</td></tr></table></div>"
+    )
+
+    assert parse_region_prices_stream([page(nested)]) == {"us-west1 (Oregon)": "$0.3885"}
+
+
+def test_availability_element_without_a_table_is_an_error():
+    with pytest.raises(ValueError):
+        parse_region_prices_stream([page("<div id='availability'><p>No prices</p></div><table>" + TABLE[7:])])
+
+
+def test_page_without_availability_element_is_an_error():
+    with pytest.raises(ValueError):
+        parse_region_prices_stream([page(TABLE)])
+
+
+def test_empty_input_is_an_error():
+    with pytest.raises(ValueError):
+        parse_region_prices_stream([])
@@ -0,0 +1,65 @@
+"""
+Offline tests of the bulk Climatiq client, with the batch request replaced by canned results.
+"""
+
+from greenops_agent.agents.impact_calculator_agent import climatiq_client
+from greenops_agent.agents.impact_calculator_agent.climatiq_client import (
+    CLIMATIQ_BATCH_LIMIT, build_batch_payloads, get_bulk_carbon_emissions
+)
+
+
+def canned_result(item: dict) -> dict:
+    return {
+        "cpu_estimate": {"co2e": 0.5 * item["duration"]},
+        "memory_estimate": {"co2e": 0.25 * item["duration"]},
+        "embodied_cpu_estimate": {"co2e": 0.1 * item["duration"]},
+        "total_co2e": 0.85 * item["duration"],
+    }
+
+
+def test_payloads_are_chunked_at_the_batch_limit():
+    keys = [("us_west_1", f"n2-standard-{i}", 24.0) for i in range(2 * CLIMATIQ_BATCH_LIMIT + 1)]
+
+    batches = build_batch_payloads(keys)
+
+    assert [len(payload) for _, payload in batches] == [CLIMATIQ_BATCH_LIMIT, CLIMATIQ_BATCH_LIMIT, 1]
+    assert [key for chunk, _ in batches for key in chunk] == keys
+    assert batches[0][1][0] == {"region": "us_west_1", "instance": "n2-standard-0", "duration": 24.0, "duration_unit": "h"}
+
+
+def test_duplicates_are_sent_once_and_results_follow_the_input_order(monkeypatch):
+    payloads = []
+
+    def post(payload):
+        payloads.append(payload)
+        return [canned_result(item) for item in payload]
+
+    monkeypatch.setattr(climatiq_client, "post_climatiq_batch", post)
+    items = [
+        {"region": "us-west1", "instance": "n2-standard-8"},
+        {"region": "europe-west1", "instance": "e2-standard-2", "duration_hours": 1},
+        {"region": "us-west1", "instance": "n2-standard-8"},
+    ]
+
+    emissions = get_bulk_carbon_emissions(items)
+
+    assert len(payloads) == 1
+    assert [(item["region"], item["instance"]) for item in payloads[0]] == [
+        ("us_west_1", "n2-standard-8"), ("europe_west_1", "e2-standard-2")
+    ]
+    assert [(emission["instance"], emission["duration_hours"]) for emission in emissions] == [
+        ("n2-standard-8", 24.0), ("e2-standard-2", 1.0), ("n2-standard-8", 24.0)
+    ]
+    assert emissions[0]["total_emissions"] == emissions[2]["total_emissions"] == 0.85 * 24
+
+
+def test_item_errors_and_missing_results_are_reported_per_item(monkeypatch):
+    monkeypatch.setattr(climatiq_client, "post_climatiq_batch", lambda payload: [{"error": "unknown instance"}])
+
+    emissions = get_bulk_carbon_emissions([
+        {"region": "us-west1", "instance": "x9-custom-3"},
+        {"region": "us-west1", "instance": "n2-standard-8"},
+    ])
+
+    assert emissions[0]["error"] == "unknown instance"
+    assert emissions[1]["error"] == "No result returned by Climatiq"
@@ -0,0 +1,78 @@
+"""
+Offline tests of the per-hour emission factor cache, with Climatiq replaced by canned results.
+"""
+
+import pytest
+from cachetools import TTLCache
+
+from greenops_agent.agents.impact_calculator_agent import emission_factors
+from greenops_agent.agents.impact_calculator_agent.emission_factors import estimate_carbon_emissions
+
+TTL_SECONDS = 60
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(emission_factors, "_emission_factor_cache", TTLCache(maxsize=16, ttl=TTL_SECONDS, timer=clock))
+    return clock
+
+
+@pytest.fixture
+def climatiq(monkeypatch):
+    requests = []
+
+    def get_bulk_carbon_emissions(items):
+        requests.append(items)
+        return [
+            {"error": "unknown instance"} if item["instance"].startswith("x9") else {
+                "cpu_estimate": 0.5, "memory_estimate": 0.25, "embodied_cpu_estimate": 0.1, "total_emissions": 0.85
+            }
+            for item in items
+        ]
+
+    monkeypatch.setattr(emission_factors, "get_bulk_carbon_emissions", get_bulk_carbon_emissions)
+    return requests
+
+
+def test_factors_are_fetched_per_hour_and_scaled_locally(clock, climatiq):
+    emissions = estimate_carbon_emissions([
+        {"region": "us-west1", "instance": "n2-standard-8"},
+        {"region": "us-west1", "instance": "n2-standard-8", "duration_hours": 2},
+    ])
+
+    assert climatiq == [[{"region": "us_west_1", "instance": "n2-standard-8", "duration_hours": 1.0}]]
+    assert emissions[0]["total_emissions"] == pytest.approx(0.85 * 24)
+    assert emissions[1]["total_emissions"] == pytest.approx(0.85 * 2)
+    assert emissions[1]["cpu_estimate"] == pytest.approx(1.0)
+
+
+def test_cached_factors_expire_after_the_ttl(clock, climatiq):
+    item = {"region": "us-west1", "instance": "n2-standard-8", "duration_hours": 1}
+
+    estimate_carbon_emissions([item])
+    clock.now = TTL_SECONDS - 1
+    estimate_carbon_emissions([item])
+    assert len(climatiq) == 1
+
+    clock.now = TTL_SECONDS + 1
+    estimate_carbon_emissions([item])
+    assert len(climatiq) == 2
+
+
+def test_errors_are_returned_but_not_cached(clock, climatiq):
+    item = {"region": "us-west1", "instance": "x9-custom-3"}
+
+    assert estimate_carbon_emissions([item])[0] == {
+        "region": "us-west1", "instance": "x9-custom-3", "duration_hours": 24.0, "error": "unknown instance"
+    }
+    estimate_carbon_emissions([item])
+    assert len(climatiq) == 2
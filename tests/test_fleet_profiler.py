@@ -0,0 +1,58 @@
+"""
+Offline tests of the vectorized fleet profiler against the static machine specs.
+"""
+
+import pytest
+
+pytest.importorskip("google.adk")
+pytest.importorskip("google.cloud.compute_v1")
+
+from greenops_agent.agents.optimization_advisor_agent.sub_agents.workload_profiler_agent import (  # noqa: E402
+    machine_catalog
+)
+from greenops_agent.agents.optimization_advisor_agent.sub_agents.workload_profiler_agent.fleet_profiler import (  # noqa: E402
+    profile_fleet_rows
+)
+
+
+@pytest.fixture(autouse=True)
+def static_catalog(monkeypatch):
+    monkeypatch.setattr(
+        machine_catalog, "_machine_catalog", machine_catalog.MachineCatalog(machine_catalog.static_machine_types())
+    )
+
+
+def server(instance_id, instance_type, cpu_util, memory_util, total_carbon):
+    return {
+        "Instance_ID": instance_id, "Instance_Type": instance_type, "Region": "us_west_1",
+        "Average_CPU_Utilization": cpu_util, "Memory_Utilization": memory_util,
+        "Total_Carbon_Emission_in_kg": total_carbon
+    }
+
+
+def test_healthy_fleet_flags_nothing():
+    result = profile_fleet_rows([
+        server("busy-1", "n2-standard-8", 80.0, 75.0, 0.4),
+        server("busy-2", "e2-standard-4", 65.0, 60.0, 0.2),
+    ])
+
+    assert result["status"] == "success"
+    assert result["row_count"] == 2
+    assert result["flagged_count"] == 0
+    assert result["flagged_instances"] == []
+    assert result["top_candidates"] == []
+
+
+def test_flagged_instances_are_ranked_by_carbon_savings():
+    result = profile_fleet_rows([
+        server("busy", "n2-standard-8", 80.0, 75.0, 0.4),
+        server("idle-small", "n2-standard-8", 10.0, 20.0, 0.5),
+        server("idle-large", "n2-standard-8", 10.0, 20.0, 3.0),
+    ], top_k=2)
+
+    assert result["flagged_count"] == 2
+    assert result["flagged_by_reason"] == {"cpu_underutilized": 2, "memory_underutilized": 2, "high_carbon": 1}
+    top = result["top_candidates"]
+    assert [candidate["instance_id"] for candidate in top] == ["idle-large", "idle-small"]
+    assert all(candidate["target_instance_type"].startswith("n2-") for candidate in top)
+    assert "High carbon emitter" in top[0]["reasons"]
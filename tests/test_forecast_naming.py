@@ -0,0 +1,21 @@
+"""
+Offline tests of the model naming scheme shared by the scheduler job and the forecaster tools.
+"""
+
+import os
+
+from greenops_agent.agents.forecaster_agent import forecast_naming
+
+SCHEDULER_DIR = os.path.join(os.path.dirname(__file__), "..", "Cloud Scheduler", "Daily_Data_Snapshot_Model_Training")
+
+
+def test_shard_model_names():
+    assert forecast_naming.shard_model_name("server_cpu_forecast_model", "us-west1") == "server_cpu_forecast_model__us_west1"
+    assert forecast_naming.shard_model_name("server_cpu_forecast_model", "e2-standard-4") == (
+        "server_cpu_forecast_model__e2_standard_4"
+    )
+    assert forecast_naming.shard_model_name("server_cpu_forecast_model") == "server_cpu_forecast_model"
+
+
+def test_scheduler_uses_the_same_module():
+    assert os.path.samefile(os.path.join(SCHEDULER_DIR, "forecast_naming.py"), forecast_naming.__file__)
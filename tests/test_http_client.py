@@ -0,0 +1,59 @@
+"""
+Offline tests of the retry loop of the shared HTTP client, with the transport replaced by canned responses.
+"""
+
+import asyncio
+
+import pytest
+
+from greenops_agent import http_client
+
+
+class CannedResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def responses(monkeypatch):
+    canned = [CannedResponse(503), CannedResponse(429), CannedResponse(200)]
+    pending = list(canned)
+
+    def send(method, url, **kwargs):
+        return pending.pop(0)
+
+    async def async_send(method, url, **kwargs):
+        return pending.pop(0)
+
+    async def no_sleep(delay):
+        pass
+
+    monkeypatch.setattr(http_client, "_send", send)
+    monkeypatch.setattr(http_client, "_async_send", async_send)
+    monkeypatch.setattr(http_client.time, "sleep", lambda delay: None)
+    monkeypatch.setattr(http_client.asyncio, "sleep", no_sleep)
+    return canned
+
+
+def test_retried_responses_are_closed(responses):
+    response = http_client.http_get("https://sparecores.com/server/gcp/n2-standard-8", stream=True)
+
+    assert response is responses[-1]
+    assert [canned.closed for canned in responses] == [True, True, False]
+
+
+def test_async_retried_responses_are_closed(responses):
+    response = asyncio.run(
+        http_client.async_http_request("GET", "https://sparecores.com/server/gcp/n2-standard-8")
+    )
+
+    assert response is responses[-1]
+    assert [canned.closed for canned in responses] == [True, True, False]
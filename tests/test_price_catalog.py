@@ -0,0 +1,47 @@
+"""
+Offline tests of the region-wide price catalog.
+"""
+
+import json
+
+import pytest
+
+from greenops_agent.agents.impact_calculator_agent.price_catalog import PriceCatalog
+
+REGION_PRICES = {
+    "europe-west10 (Berlin)": "$0.4210",
+    "europe-west1 (Belgium)": "$0.3880",
+    "us-west1 (Oregon)": "$0.3790",
+}
+
+
+def test_region_is_matched_exactly(tmp_path):
+    catalog = PriceCatalog(path=str(tmp_path / "price_catalog.json"))
+    catalog.put("n2-standard-8", REGION_PRICES)
+
+    assert catalog.lookup("n2-standard-8", "europe-west1") == "$0.3880"
+    assert catalog.lookup("n2-standard-8", "europe-west10") == "$0.4210"
+    with pytest.raises(KeyError):
+        catalog.lookup("n2-standard-8", "europe-west")
+
+
+def test_miss_and_expired_entries_return_none(tmp_path):
+    catalog = PriceCatalog(path=str(tmp_path / "price_catalog.json"), ttl_seconds=-1)
+    assert catalog.lookup("n2-standard-8", "us-west1") is None
+
+    catalog.put("n2-standard-8", REGION_PRICES)
+    assert catalog.lookup("n2-standard-8", "us-west1") is None
+
+
+def test_catalog_with_page_labels_is_rekeyed_on_load(tmp_path):
+    path = tmp_path / "price_catalog.json"
+    path.write_text(json.dumps({"n2-standard-8": {"fetched_at": 1e12, "regions": REGION_PRICES}}))
+
+    catalog = PriceCatalog(path=str(path))
+
+    assert catalog.get_regions("n2-standard-8") == {
+        "europe-west10": "$0.4210", "europe-west1": "$0.3880", "us-west1": "$0.3790"
+    }
+    # Persisted and reloaded by a fresh worker
+    catalog.put("e2-standard-2", {"us-west1 (Oregon)": "$0.0670"})
+    assert PriceCatalog(path=str(path)).lookup("e2-standard-2", "us-west1") == "$0.0670"
@@ -0,0 +1,104 @@
+"""
+Offline tests of the memory-mapped price index: building, lookups and rejecting bad files.
+"""
+
+import sqlite3
+
+import pytest
+
+from greenops_agent.agents.impact_calculator_agent import price_index
+from greenops_agent.agents.impact_calculator_agent.price_index import (
+    HEADER, INDEX_MAGIC, INDEX_VERSION, PriceIndex, build_price_index
+)
+
+PRICE_CSV = """vendor_id,server,region,allocation,price
+gcp,n2-standard-8,us-west1,ONDEMAND,0.3885
+gcp,n2-standard-8,us-west1,ONDEMAND,0.4100
+gcp,n2-standard-8,europe-west1,ONDEMAND,0.4274
+gcp,n2-standard-8,europe-west10,ONDEMAND,0.4630
+gcp,n2-standard-8,us-west1,SPOT,0.0950
+aws,m5.2xlarge,us-west-1,ONDEMAND,0.4480
+gcp,e2-standard-2,us-central1,ONDEMAND,not-a-price
+"""
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    source = tmp_path / "prices.csv"
+    source.write_text(PRICE_CSV)
+    path = tmp_path / "price_index.bin"
+    assert build_price_index(str(source), str(path)) == 3
+    return path
+
+
+def test_csv_index_keeps_the_lowest_on_demand_gcp_price(index_path):
+    index = PriceIndex(str(index_path))
+
+    assert index.lookup("n2-standard-8", "us-west1") == pytest.approx(0.3885)
+    # Region formats are normalized like the tools do
+    assert index.lookup("N2-STANDARD-8", "us_west_1") == pytest.approx(0.3885)
+    assert index.lookup("n2-standard-8", "europe-west1") == pytest.approx(0.4274)
+    assert index.lookup("n2-standard-8", "europe-west10") == pytest.approx(0.4630)
+    assert index.lookup("n2-standard-8", "asia-east1") is None
+    assert index.lookup("m5.2xlarge", "us-west-1") is None
+    assert index.lookup("e2-standard-2", "us-central1") is None
+
+
+def test_sparecores_dump_is_indexed(tmp_path):
+    dump = tmp_path / "sc-data-all.db"
+    connection = sqlite3.connect(dump)
+    connection.executescript("""
+        CREATE TABLE server (vendor_id TEXT, server_id TEXT, api_reference TEXT);
+        CREATE TABLE region (vendor_id TEXT, region_id TEXT, api_reference TEXT);
+        CREATE TABLE server_price (vendor_id TEXT, server_id TEXT, region_id TEXT, allocation TEXT, unit TEXT, price REAL);
+        INSERT INTO server VALUES ('gcp', 's1', 'e2-standard-2');
+        INSERT INTO region VALUES ('gcp', 'r1', 'us-central1');
+        INSERT INTO server_price VALUES ('gcp', 's1', 'r1', 'ONDEMAND', 'HOUR', 0.067);
+        INSERT INTO server_price VALUES ('gcp', 's1', 'r1', 'ONDEMAND', 'HOUR', 0.071);
+        INSERT INTO server_price VALUES ('gcp', 's1', 'r1', 'SPOT', 'HOUR', 0.02);
+    """)
+    connection.commit()
+    connection.close()
+
+    path = tmp_path / "price_index.bin"
+    assert build_price_index(str(dump), str(path)) == 1
+    assert PriceIndex(str(path)).lookup("e2-standard-2", "us-central1") == pytest.approx(0.067)
+
+
+def test_bad_files_are_rejected(index_path, tmp_path):
+    data = index_path.read_bytes()
+
+    truncated = tmp_path / "truncated.bin"
+    truncated.write_bytes(data[:-8])
+    with pytest.raises(ValueError):
+        PriceIndex(str(truncated))
+
+    wrong_magic = tmp_path / "wrong_magic.bin"
+    wrong_magic.write_bytes(b"XXXX" + data[4:])
+    with pytest.raises(ValueError):
+        PriceIndex(str(wrong_magic))
+
+    # A slot count that is not a power of two would break the probe mask
+    bad_slot_count = tmp_path / "bad_slot_count.bin"
+    bad_slot_count.write_bytes(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 3) + data[HEADER.size:])
+    with pytest.raises(ValueError):
+        PriceIndex(str(bad_slot_count))
+
+    header_only = tmp_path / "header_only.bin"
+    header_only.write_bytes(data[:HEADER.size - 1])
+    with pytest.raises(ValueError):
+        PriceIndex(str(header_only))
+
+
+def test_lookup_falls_back_without_a_usable_index_and_reloads_a_rebuilt_one(index_path, monkeypatch):
+    monkeypatch.setattr(price_index, "PRICE_INDEX_PATH", str(index_path))
+    monkeypatch.setattr(price_index, "_price_index", None)
+    monkeypatch.setattr(price_index, "_price_index_stamp", None)
+
+    assert price_index.lookup_indexed_price("n2-standard-8", "us-west1") == pytest.approx(0.3885)
+
+    index_path.write_bytes(b"corrupt")
+    assert price_index.lookup_indexed_price("n2-standard-8", "us-west1") is None
+
+    index_path.unlink()
+    assert price_index.lookup_indexed_price("n2-standard-8", "us-west1") is None
@@ -0,0 +1,121 @@
+"""
+Offline tests of the query result cache keys, with BigQuery replaced by a stub client.
+"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pyarrow as pa
+import pytest
+
+from greenops_agent.query_cache import QueryResultCache, normalize_sql, referenced_objects
+
+METRICS_TABLE = "greenops-460813.gcp_server_details.server_metrics"
+CPU_MODEL = "greenops-460813.gcp_server_details.server_cpu_forecast_model__us_west1"
+
+QUERY = f"""
+    SELECT instance_id, region
+    FROM `{METRICS_TABLE}`
+    WHERE region = 'US-West1'
+"""
+
+
+class StubParameter:
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def to_api_repr(self):
+        return {"name": self.name, "parameterValue": {"value": self.value}}
+
+
+class StubClient:
+    """
+    Answers table and model lookups with the `modified` timestamp in `modified`, raises for anything else.
+    """
+
+    def __init__(self, modified: dict):
+        self.modified = modified
+        self.lookups = []
+
+    def _lookup(self, reference):
+        self.lookups.append(reference)
+        if reference not in self.modified:
+            raise LookupError(f"Not found: {reference}")
+        return SimpleNamespace(modified=self.modified[reference])
+
+    get_table = _lookup
+    get_model = _lookup
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return QueryResultCache(directory=str(tmp_path), memory_bytes=1024 * 1024, disk_bytes=1024 * 1024)
+
+
+def modified_at(day: int):
+    return datetime(2025, 6, day, tzinfo=timezone.utc)
+
+
+def test_normalize_sql_ignores_layout_and_keyword_case():
+    assert normalize_sql(QUERY) == normalize_sql(
+        f"select instance_id,   region FROM `{METRICS_TABLE}`\n where REGION = 'US-West1';"
+    )
+
+
+def test_normalize_sql_keeps_literals_and_identifiers():
+    normalized = normalize_sql(f"SELECT * FROM `{METRICS_TABLE.upper()}` WHERE region = 'US-West1'")
+
+    assert f"`{METRICS_TABLE.upper()}`" in normalized
+    assert "'US-West1'" in normalized
+    assert normalize_sql("SELECT 'A'") != normalize_sql("SELECT 'a'")
+
+
+def test_referenced_objects_tells_models_from_tables():
+    sql = f"SELECT * FROM ML.FORECAST(MODEL `{CPU_MODEL}`) JOIN `{METRICS_TABLE}` USING (instance_id)"
+
+    assert referenced_objects(sql) == [("model", CPU_MODEL), ("table", METRICS_TABLE)]
+
+
+def test_snapshot_version_changes_with_the_table(cache):
+    client = StubClient({METRICS_TABLE: modified_at(1)})
+    version = cache.snapshot_version(QUERY, client)
+    assert version == [f"{METRICS_TABLE}@{modified_at(1).isoformat()}"]
+
+    # The looked up version is trusted until it is checked again
+    client.modified[METRICS_TABLE] = modified_at(2)
+    assert cache.snapshot_version(QUERY, client) == version
+    assert client.lookups == [METRICS_TABLE]
+
+    cache.clear()
+    new_version = cache.snapshot_version(QUERY, client)
+    assert cache.make_key(QUERY, [], new_version) != cache.make_key(QUERY, [], version)
+
+
+def test_snapshot_version_is_none_when_not_cacheable(cache):
+    client = StubClient({})
+
+    assert cache.snapshot_version("SELECT 1", client) is None
+    assert cache.snapshot_version(QUERY, client) is None
+
+
+def test_make_key_covers_the_query_parameters(cache):
+    version = [f"{METRICS_TABLE}@{modified_at(1).isoformat()}"]
+
+    key = cache.make_key(QUERY, [StubParameter("region", "us-west1")], version)
+
+    assert key == cache.make_key(" ".join(QUERY.split()), [StubParameter("region", "us-west1")], version)
+    assert key != cache.make_key(QUERY, [StubParameter("region", "us-east1")], version)
+    assert key != cache.make_key(QUERY, [], version)
+
+
+def test_disk_entries_survive_the_memory_level(cache, tmp_path):
+    key = cache.make_key(QUERY, [], [f"{METRICS_TABLE}@{modified_at(1).isoformat()}"])
+    table = pa.table({"instance_id": ["a", "b"], "region": ["us-west1", "us-west1"]})
+    cache.put(key, table)
+
+    reopened = QueryResultCache(directory=str(tmp_path))
+
+    assert reopened.get(key).equals(table)
+    assert reopened.get("missing") is None
+    assert (reopened.hits, reopened.misses) == (1, 1)
@@ -0,0 +1,116 @@
+"""
+Offline tests of the query cost guard against a stub BigQuery client.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+bigquery = pytest.importorskip("google.cloud.bigquery")
+
+# Imported directly, importing the greenops_agent package would build every agent and its BigQuery client
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "greenops_agent"))
+
+from query_guard import (  # noqa: E402
+    MAX_SESSION_COST_ENTRIES, MIB, SESSION_BYTES_KEY, SESSION_COSTS_KEY, QueryBudgetExceeded, QueryGuard
+)
+
+METRICS_TABLE = "greenops-460813.gcp_server_details.server_metrics"
+
+
+class StubClient:
+    """
+    Answers every dry run with the bytes of the first matching SQL fragment in `bytes_by_fragment`.
+    """
+
+    def __init__(self, bytes_by_fragment: dict):
+        self.bytes_by_fragment = bytes_by_fragment
+        self.queries = []
+
+    def query(self, sql, job_config=None):
+        self.queries.append((sql, job_config))
+        total_bytes = next(
+            (total for fragment, total in self.bytes_by_fragment.items() if fragment in sql), 0
+        )
+        return SimpleNamespace(total_bytes_processed=total_bytes)
+
+
+def make_guard(client, tool_budget=100 * MIB, session_budget=1000 * MIB):
+    return QueryGuard(client, tool_budgets={"fetch_servers": tool_budget}, session_budget=session_budget,
+                      cost_log_path=None)
+
+
+def test_query_under_budget_is_capped_at_the_budget():
+    client = StubClient({"SELECT": 20 * MIB})
+    guard = make_guard(client)
+
+    guarded = guard.check(f"SELECT Instance_ID FROM `{METRICS_TABLE}`", "fetch_servers", state={})
+
+    assert guarded.estimated_bytes == 20 * MIB
+    assert not guarded.rewritten
+    assert guarded.job_config.maximum_bytes_billed == 100 * MIB
+    assert client.queries[0][1].dry_run
+
+
+def test_select_star_over_budget_is_narrowed_to_default_columns():
+    client = StubClient({"SELECT *": 500 * MIB, "SELECT Instance_ID": 30 * MIB})
+    guard = make_guard(client)
+
+    guarded = guard.check(f"SELECT * FROM `{METRICS_TABLE}` WHERE Region = 'us-west1'", "fetch_servers")
+
+    assert guarded.rewritten
+    assert guarded.sql.startswith("SELECT Instance_ID, Instance_Type, Region,")
+    assert guarded.sql.endswith("WHERE Region = 'us-west1'")
+    assert guarded.estimated_bytes == 30 * MIB
+
+
+def test_query_still_over_budget_is_rejected():
+    client = StubClient({"SELECT": 500 * MIB})
+    guard = make_guard(client)
+
+    with pytest.raises(QueryBudgetExceeded):
+        guard.check(f"SELECT * FROM `{METRICS_TABLE}`", "fetch_servers")
+
+
+def test_remaining_session_budget_limits_the_query():
+    client = StubClient({"SELECT": 50 * MIB})
+    guard = make_guard(client, session_budget=200 * MIB)
+
+    guarded = guard.check("SELECT 1", "fetch_servers", state={SESSION_BYTES_KEY: 120 * MIB})
+    assert guarded.job_config.maximum_bytes_billed == 80 * MIB
+
+    with pytest.raises(QueryBudgetExceeded):
+        guard.check("SELECT 1", "fetch_servers", state={SESSION_BYTES_KEY: 195 * MIB})
+    # An exhausted session is rejected without a dry run
+    assert len(client.queries) == 1
+
+
+def test_record_keeps_a_bounded_cost_list_in_the_session():
+    client = StubClient({"SELECT": 20 * MIB})
+    guard = make_guard(client)
+    state = {}
+    guarded = guard.check("SELECT 1", "fetch_servers", state)
+    job = SimpleNamespace(total_bytes_billed=20 * MIB, total_bytes_processed=20 * MIB, cache_hit=False)
+
+    for _ in range(MAX_SESSION_COST_ENTRIES + 5):
+        guard.record("fetch_servers", guarded, job, state)
+
+    assert state[SESSION_BYTES_KEY] == (MAX_SESSION_COST_ENTRIES + 5) * 20 * MIB
+    assert len(state[SESSION_COSTS_KEY]) == MAX_SESSION_COST_ENTRIES
+
+
+def test_record_logs_the_query_parameters():
+    client = StubClient({"SELECT": 20 * MIB})
+    guard = make_guard(client)
+    parameters = [bigquery.ScalarQueryParameter("region", "STRING", "us-west1")]
+    guarded = guard.check("SELECT 1", "fetch_servers", query_parameters=parameters)
+    job = SimpleNamespace(total_bytes_billed=20 * MIB, total_bytes_processed=20 * MIB, cache_hit=False)
+
+    entry = guard.record("fetch_servers", guarded, job)
+
+    assert entry["parameters"] == {"region": "us-west1"}
@@ -0,0 +1,61 @@
+"""
+Offline tests of the vectorized rightsizing engine against the static machine specs.
+"""
+
+import pytest
+
+pytest.importorskip("google.adk")
+pytest.importorskip("google.cloud.compute_v1")
+
+from greenops_agent.agents.optimization_advisor_agent.sub_agents.workload_profiler_agent import (  # noqa: E402
+    machine_catalog
+)
+from greenops_agent.agents.optimization_advisor_agent.sub_agents.workload_profiler_agent.rightsizing import (  # noqa: E402
+    rank_rightsizing_candidates
+)
+
+
+@pytest.fixture(autouse=True)
+def static_catalog(monkeypatch):
+    monkeypatch.setattr(
+        machine_catalog, "_machine_catalog", machine_catalog.MachineCatalog(machine_catalog.static_machine_types())
+    )
+
+
+def server(instance_type, cpu_util, memory_util, instance_id="instance-1", region="us_west_1"):
+    return {
+        "Instance_ID": instance_id, "Instance_Type": instance_type, "Region": region,
+        "Average_CPU_Utilization": cpu_util, "Memory_Utilization": memory_util
+    }
+
+
+def test_empty_input_has_no_candidates():
+    assert rank_rightsizing_candidates([]) == []
+
+
+def test_idle_server_gets_smaller_types_of_its_family_ranked_by_savings():
+    [result] = rank_rightsizing_candidates([server("n2-standard-8", 10.0, 20.0)])
+
+    assert result["current_vcpus"] == 8.0
+    assert result["current_memory_gb"] == 32.0
+    candidates = result["candidates"]
+    assert candidates
+    assert all(candidate["instance_type"].startswith("n2-") for candidate in candidates)
+    assert all(candidate["capacity_ratio"] < 1 for candidate in candidates)
+    assert [candidate["capacity_ratio"] for candidate in candidates] == sorted(
+        candidate["capacity_ratio"] for candidate in candidates
+    )
+    # The observed load must still fit under the target utilization
+    assert all(candidate["vcpus"] >= 8 * 10.0 / 60.0 for candidate in candidates)
+    assert all(candidate["memory_gb"] >= 32 * 20.0 / 70.0 for candidate in candidates)
+
+
+def test_busy_server_and_unknown_type_have_no_candidates():
+    busy, unknown = rank_rightsizing_candidates([
+        server("n2-standard-8", 95.0, 90.0, instance_id="busy"),
+        server("x9-custom-3", 5.0, 5.0, instance_id="unknown"),
+    ])
+
+    assert busy["candidates"] == []
+    assert unknown["candidates"] == []
+    assert unknown["current_vcpus"] is None